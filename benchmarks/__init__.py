@@ -0,0 +1,13 @@
+"""
+Бенчмарки производительности.
+
+Запуск из корня проекта: `python -m benchmarks.<модуль> --help`.
+"""
+import os
+
+
+def setup_django() -> None:
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todolist.settings')
+    django.setup()
@@ -0,0 +1,99 @@
+"""
+Пропускная способность бота: последовательный цикл runbot против `runbot --async`.
+
+Апдейты отдает локальный фейковый Telegram (benchmarks.fake_telegram) с задержкой
+на sendMessage; обработчик отправляет `--replies` сообщений на апдейт и в БД не ходит.
+
+    python -m benchmarks.bot_runtime --updates 500 --chats 50 --latency 0.02
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from benchmarks import setup_django
+from benchmarks.fake_telegram import FakeTelegramServer, make_updates
+
+
+def make_handler(tg_client, replies: int):
+    def handler(message) -> None:
+        for i in range(replies):
+            tg_client.send_message(chat_id=message.chat.id, text=f'{message.text} #{i}')
+    return handler
+
+
+def run_sync(tg_client, handler, total: int) -> None:
+    """Тот же цикл, что в Command.handle без --async"""
+    offset = processed = 0
+    while processed < total:
+        for item in tg_client.get_updates(offset=offset, timeout=1).result:
+            offset = item.update_id + 1
+            if item.message:
+                handler(item.message)
+                processed += 1
+
+
+def run_async(tg_client, handler, total: int, concurrency: int) -> None:
+    from bot.tg.runtime import PollingRunner, UpdateDispatcher
+
+    dispatcher = UpdateDispatcher(handler, concurrency=concurrency)
+    processed = 0
+    lock = threading.Lock()
+
+    def counting_handler(message) -> None:
+        nonlocal processed
+        handler(message)
+        with lock:
+            processed += 1
+
+    dispatcher.handler = counting_handler
+
+    async def main() -> None:
+        stop = asyncio.Event()
+        runner = asyncio.create_task(PollingRunner(tg_client, dispatcher, poll_timeout=1).run(stop))
+        while processed < total:
+            await asyncio.sleep(0.01)
+        stop.set()
+        await runner
+
+    try:
+        asyncio.run(main())
+    finally:
+        dispatcher.close()
+
+
+def measure(mode: str, args) -> float:
+    from bot.tg.client import TgClient
+
+    updates = make_updates(args.updates, args.chats)
+    with FakeTelegramServer(updates, send_latency=args.latency) as server:
+        tg_client = TgClient(token='benchmark', api_url=server.url)
+        handler = make_handler(tg_client, args.replies)
+        started = time.perf_counter()
+        if mode == 'sync':
+            run_sync(tg_client, handler, args.updates)
+        else:
+            run_async(tg_client, handler, args.updates, args.concurrency)
+        elapsed = time.perf_counter() - started
+        assert len(server.sent) == args.updates * args.replies, f'{mode}: отправлено {len(server.sent)} сообщений'
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=500)
+    parser.add_argument('--chats', type=int, default=50)
+    parser.add_argument('--replies', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.02, help='задержка sendMessage, секунды')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    setup_django()
+    print(f'{"mode":<10}{"seconds":>10}{"updates/s":>12}')
+    for mode in ('sync', 'async'):
+        elapsed = measure(mode, args)
+        print(f'{mode:<10}{elapsed:>10.2f}{args.updates / elapsed:>12,.1f}')
+
+
+if __name__ == '__main__':
+    main()
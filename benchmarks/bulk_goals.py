@@ -0,0 +1,91 @@
+"""
+Импорт целей: goal/create по одной против goal/bulk_create пакетами по GOALS_BULK_MAX_ITEMS.
+
+Запросы идут прямо во view (APIRequestFactory), без HTTP-сервера. Бенчмарк создает в текущей
+БД доску «benchmark-bulk» и удаляет ее цели перед каждым запуском:
+
+    python -m benchmarks.bulk_goals --goals 10000 --single 1000
+"""
+import argparse
+import time
+
+from benchmarks import setup_django
+
+BOARD_TITLE = 'benchmark-bulk'
+
+
+def prepare():
+    from django.utils import timezone
+
+    from core.models import User
+    from goals.models import Board, BoardParticipant, Goal, GoalCategory
+
+    user, _ = User.objects.get_or_create(username='benchmark-bulk')
+    now = timezone.now()
+    board = Board.objects.filter(title=BOARD_TITLE).first()
+    if board is None:
+        board = Board.objects.create(title=BOARD_TITLE, created=now, updated=now)
+        BoardParticipant.objects.create(board=board, user=user, created=now, updated=now)
+        GoalCategory.objects.create(board=board, user=user, title='Импорт', created=now, updated=now)
+    category = board.categories.get()
+    Goal.objects.filter(category=category).delete()
+    return user, category
+
+
+def items(category, count: int, start: int = 0) -> list[dict]:
+    return [{'category': category.id, 'title': f'Цель {i}', 'priority': i % 4 + 1,
+             'due_date': f'2030-{i % 12 + 1:02}-{i % 28 + 1:02}'} for i in range(start, start + count)]
+
+
+def run_single(user, category, count: int) -> float:
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from goals.views import GoalCreateView
+
+    view, factory = GoalCreateView.as_view(), APIRequestFactory()
+    started = time.perf_counter()
+    for item in items(category, count):
+        request = factory.post('/goals/goal/create', item, format='json')
+        force_authenticate(request, user)
+        assert view(request).status_code == 201
+    return time.perf_counter() - started
+
+
+def run_bulk(user, category, count: int) -> float:
+    from django.conf import settings
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from goals.views import GoalBulkCreateView
+
+    view, factory = GoalBulkCreateView.as_view(), APIRequestFactory()
+    started = time.perf_counter()
+    for start in range(0, count, settings.GOALS_BULK_MAX_ITEMS):
+        batch = items(category, min(settings.GOALS_BULK_MAX_ITEMS, count - start), start)
+        request = factory.post('/goals/goal/bulk_create', batch, format='json')
+        force_authenticate(request, user)
+        response = view(request)
+        assert response.status_code == 201, response.data
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--goals', type=int, default=10000, help='Сколько целей импортировать пакетами')
+    parser.add_argument('--single', type=int, default=1000,
+                        help='Сколько целей создать по одной (время на --goals экстраполируется)')
+    args = parser.parse_args()
+
+    setup_django()
+    user, category = prepare()
+
+    single = run_single(user, category, args.single)
+    bulk = run_bulk(user, category, args.goals)
+    single_total = single / args.single * args.goals
+    print(f'{"mode":<12}{"goals/s":>12}{f"{args.goals} goals, s":>20}')
+    print(f'{"single":<12}{args.single / single:>12,.0f}{single_total:>20.1f}')
+    print(f'{"bulk":<12}{args.goals / bulk:>12,.0f}{bulk:>20.1f}')
+    print(f'speedup: {single_total / bulk:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Накладные расходы на соединение с БД в запросе goal/<pk>: без постоянных соединений
+(DB_CONN_MAX_AGE=0), с постоянными (DB_CONN_MAX_AGE) и с пулом (DB_POOL=1).
+
+Каждый режим запускается в отдельном процессе со своими переменными окружения. Запросы
+проходят через WSGIHandler целиком, включая сигналы начала и конца запроса, которые
+закрывают соединение или возвращают его в пул. Использует доску «benchmark-load»:
+
+    python -m benchmarks.db_connections --requests 2000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks import setup_django
+
+MODES = {
+    'close': {'DB_CONN_MAX_AGE': '0', 'DB_POOL': '0'},
+    'persistent': {'DB_CONN_MAX_AGE': '60', 'DB_POOL': '0'},
+    'pool': {'DB_POOL': '1'},
+}
+
+
+def measure(requests: int) -> dict:
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+    from django.test import RequestFactory
+
+    from benchmarks.load_test import BOARD_TITLE, prepare
+    from goals.models import Goal
+
+    cookie = prepare(1)
+    goal_id = Goal.objects.filter(category__board__title=BOARD_TITLE).values_list('pk', flat=True).first()
+    connection.close()
+
+    # при пуле connection_created срабатывает и для соединения из пула, поэтому считаются процессы сервера
+    backend_pids = set()
+    connection_created.connect(
+        lambda sender, connection, **kwargs: backend_pids.add(connection.connection.get_backend_pid()), weak=False
+    )
+    handler, environ = WSGIHandler(), RequestFactory().get(f'/goals/goal/{goal_id}', HTTP_COOKIE=cookie).environ
+
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = handler(dict(environ), lambda status, headers: None)
+        assert response.status_code == 200, response.status_code
+        b''.join(response)
+        response.close()
+        latencies.append(time.perf_counter() - started)
+
+    connections = len(backend_pids)
+    connect = []
+    for _ in range(20):
+        connection.close()
+        started = time.perf_counter()
+        connection.connect()
+        connect.append(time.perf_counter() - started)
+    connection.close()
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {'mean': statistics.mean(latencies), 'p50': percentiles[49], 'p95': percentiles[94],
+            'connections': connections, 'connect': statistics.median(connect)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help='Запросов в каждом режиме')
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        setup_django()
+        print(json.dumps(measure(args.requests)))
+        return
+
+    results = {}
+    for mode in args.modes:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.db_connections', '--measure', '--requests', str(args.requests)],
+            env={**os.environ, **MODES[mode], 'DEBUG': ''}, check=True, capture_output=True, text=True,
+        ).stdout
+        results[mode] = json.loads(output.splitlines()[-1])
+
+    print(f'{"mode":<12}{"mean, ms":>10}{"p50, ms":>10}{"p95, ms":>10}{"connects":>10}')
+    for mode, result in results.items():
+        print(f'{mode:<12}{result["mean"] * 1000:>10.2f}{result["p50"] * 1000:>10.2f}'
+              f'{result["p95"] * 1000:>10.2f}{result["connections"]:>10}')
+    if 'close' in results:
+        print(f'connect handshake: {results["close"]["connect"] * 1000:.2f} ms')
+        for mode in [mode for mode in results if mode != 'close']:
+            saved = results['close']['mean'] - results[mode]['mean']
+            print(f'{mode}: {saved * 1000:.2f} ms saved per request')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Локальный фейковый сервер Telegram Bot API для бенчмарков бота.
+
+Отдает заранее заготовленные апдейты через getUpdates и отвечает на sendMessage
+с настраиваемой задержкой. Клиенту достаточно передать `api_url=server.url`.
+Через `fail_next` можно подставить ошибочные ответы (429, 5xx) перед успешными.
+"""
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+
+def make_updates(count: int, chats: int, start_id: int = 1) -> list[dict]:
+    """`count` текстовых апдейтов, равномерно распределенных по `chats` чатам"""
+    return [
+        {
+            'update_id': start_id + i,
+            'message': {'chat': {'id': 1000 + i % chats, 'username': f'chat{i % chats}'}, 'text': f'/goals {i}'},
+        }
+        for i in range(count)
+    ]
+
+
+class FakeTelegramServer:
+    def __init__(self, updates: Optional[list[dict]] = None, send_latency: float = 0.0, port: int = 0) -> None:
+        self.updates = list(updates or [])
+        self.send_latency = send_latency
+        self.sent: list[tuple[int, str]] = []
+        self.requests = 0
+        self.connections = 0
+        self.failures: list[tuple[int, dict]] = []
+        self._lock = threading.Lock()
+        self._new_updates = threading.Condition(self._lock)
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def add_updates(self, updates: list[dict]) -> None:
+        with self._new_updates:
+            self.updates.extend(updates)
+            self._new_updates.notify_all()
+
+    def fail_next(self, status: int, count: int = 1, retry_after: Optional[int] = None) -> None:
+        """Следующие `count` запросов получат ошибку `status` (для 429 — с parameters.retry_after)"""
+        payload = {'ok': False, 'error_code': status, 'description': 'Fake error'}
+        if retry_after is not None:
+            payload['parameters'] = {'retry_after': retry_after}
+        with self._lock:
+            self.failures.extend([(status, payload)] * count)
+
+    def start(self) -> 'FakeTelegramServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> 'FakeTelegramServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def get_updates(self, offset: int, timeout: float) -> dict:
+        deadline = time.monotonic() + min(timeout, 1.0)
+        with self._new_updates:
+            while True:
+                result = [update for update in self.updates if update['update_id'] >= offset][:100]
+                remaining = deadline - time.monotonic()
+                if result or remaining <= 0:
+                    return {'ok': True, 'result': result}
+                self._new_updates.wait(remaining)
+
+    def send_message(self, chat_id: int, text: str) -> dict:
+        if self.send_latency:
+            time.sleep(self.send_latency)
+        with self._lock:
+            self.sent.append((chat_id, text))
+        return {'ok': True, 'result': {'chat': {'id': chat_id}, 'text': text}}
+
+    def handle(self, method: str, params: dict) -> tuple[int, dict]:
+        with self._lock:
+            self.requests += 1
+            if self.failures:
+                return self.failures.pop(0)
+        if method == 'getUpdates':
+            return 200, self.get_updates(int(params.get('offset', 0)), float(params.get('timeout', 0)))
+        if method == 'sendMessage':
+            return 200, self.send_message(int(params['chat_id']), params.get('text', ''))
+        return 404, {'ok': False, 'error_code': 404, 'description': 'Not Found'}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self) -> None:
+                super().setup()
+                # заголовки и тело уходят разными send(); без TCP_NODELAY keep-alive упирается в delayed ACK
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with server._lock:
+                    server.connections += 1
+
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                self._respond(url.path, {key: values[-1] for key, values in parse_qs(url.query).items()})
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode() if length else ''
+                if self.headers.get('Content-Type', '').startswith('application/json'):
+                    params = json.loads(body or '{}')
+                else:
+                    params = {key: values[-1] for key, values in parse_qs(body).items()}
+                self._respond(urlparse(self.path).path, params)
+
+            def _respond(self, path: str, params: dict) -> None:
+                status, payload = server.handle(path.rsplit('/', 1)[-1], params)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                try:
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # клиент не дождался ответа (таймаут чтения)
+                    self.close_connection = True
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
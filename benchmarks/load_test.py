@@ -0,0 +1,154 @@
+"""
+Нагрузочный тест goal/list под профилями gunicorn (todolist/gunicorn.conf.py).
+
+Для каждого профиля запускается gunicorn на свободном порту с текущими настройками БД,
+после прогрева --concurrency клиентов с keep-alive в течение --duration секунд запрашивают
+список целей. Печатаются запросы в секунду и перцентили задержки. Бенчмарк создает в текущей
+БД доску «benchmark-load» с --goals целями:
+
+    python -m benchmarks.load_test --profiles sync gthread asgi --workers 4 --concurrency 32
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks import setup_django
+
+BOARD_TITLE = 'benchmark-load'
+PATH = '/goals/goal/list?limit=50'
+
+
+def prepare(goals: int) -> str:
+    """Доска с целями и сессия ее владельца; возвращает значение cookie сессии"""
+    from django.conf import settings
+    from django.test import Client
+    from django.utils import timezone
+
+    from core.models import User
+    from goals.models import Board, BoardParticipant, Goal, GoalCategory
+
+    user, _ = User.objects.get_or_create(username='benchmark-load')
+    now = timezone.now()
+    board = Board.objects.filter(title=BOARD_TITLE).first()
+    if board is None:
+        board = Board.objects.create(title=BOARD_TITLE, created=now, updated=now)
+        BoardParticipant.objects.create(board=board, user=user, created=now, updated=now)
+        GoalCategory.objects.create(board=board, user=user, title='Нагрузка', created=now, updated=now)
+    category = board.categories.get()
+    existing = Goal.objects.filter(category=category).count()
+    if existing < goals:
+        Goal.objects.bulk_create_and_notify([
+            Goal(category=category, user=user, title=f'Цель {i}', priority=i % 4 + 1)
+            for i in range(existing, goals)
+        ])
+
+    client = Client()
+    client.force_login(user)
+    return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(profile: str, port: int, workers: int, threads: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        'SERVER_PROFILE': profile,
+        'GUNICORN_BIND': f'127.0.0.1:{port}',
+        'WEB_CONCURRENCY': str(workers),
+        'GUNICORN_THREADS': str(threads),
+        'GUNICORN_LOG_LEVEL': 'warning',
+        'DEBUG': '',
+    }
+    return subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'todolist/gunicorn.conf.py'], env=env)
+
+
+def wait_ready(port: int, cookie: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', PATH, headers={'Cookie': cookie})
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'Server on port {port} did not start in {timeout}s')
+
+
+def load(port: int, cookie: str, concurrency: int, duration: float) -> tuple[list[float], int]:
+    """Задержки успешных запросов в секундах и число ошибок"""
+    latencies, errors, lock = [], [0], threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client() -> None:
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        own_latencies, own_errors = [], 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request('GET', PATH, headers={'Cookie': cookie})
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                ok = False
+            if ok:
+                own_latencies.append(time.perf_counter() - started)
+            else:
+                own_errors += 1
+        with lock:
+            latencies.extend(own_latencies)
+            errors[0] += own_errors
+
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return latencies, errors[0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', default=['sync', 'gthread', 'asgi'], help='Профили SERVER_PROFILE')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='WEB_CONCURRENCY')
+    parser.add_argument('--threads', type=int, default=4, help='GUNICORN_THREADS для gthread')
+    parser.add_argument('--concurrency', type=int, default=16, help='Одновременных клиентов')
+    parser.add_argument('--duration', type=float, default=15, help='Длительность замера, секунд')
+    parser.add_argument('--warmup', type=float, default=3, help='Прогрев перед замером, секунд')
+    parser.add_argument('--goals', type=int, default=500, help='Целей на доске')
+    args = parser.parse_args()
+
+    setup_django()
+    cookie = prepare(args.goals)
+
+    print(f'{"profile":<10}{"req/s":>10}{"p50, ms":>10}{"p95, ms":>10}{"p99, ms":>10}{"errors":>8}')
+    for profile in args.profiles:
+        port = free_port()
+        server = start_server(profile, port, args.workers, args.threads)
+        try:
+            wait_ready(port, cookie)
+            load(port, cookie, args.concurrency, args.warmup)
+            latencies, errors = load(port, cookie, args.concurrency, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+        percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0] * 99
+        print(f'{profile:<10}{len(latencies) / args.duration:>10,.0f}{percentiles[49] * 1000:>10.1f}'
+              f'{percentiles[94] * 1000:>10.1f}{percentiles[98] * 1000:>10.1f}{errors:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Поиск целей: SearchFilter (ILIKE '%term%') против FullTextSearchFilter (tsvector + GIN).
+
+Нужен PostgreSQL. Бенчмарк создает в текущей БД доску «benchmark-search» с `--goals` целями
+(повторный запуск с тем же числом целей переиспользует данные), поэтому запускайте его
+на отдельной базе:
+
+    DB_NAME=todolist_bench python -m benchmarks.search --goals 1000000
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import setup_django
+
+BOARD_TITLE = 'benchmark-search'
+WORDS = [
+    'купить', 'молоко', 'хлеб', 'прочитать', 'книгу', 'выучить', 'английский', 'бегать', 'утром', 'программа',
+    'тренировок', 'отчет', 'квартал', 'позвонить', 'маме', 'ремонт', 'кухни', 'отпуск', 'билеты', 'проект',
+    'buy', 'milk', 'read', 'book', 'learn', 'python', 'running', 'morning', 'report', 'release',
+    'deploy', 'review', 'meeting', 'budget', 'travel', 'tickets', 'garden', 'homework', 'invoice', 'backup',
+]
+QUERIES = ['молоко', 'программа тренировок', 'python', 'deploy release', 'трен', 'invoice']
+
+
+def seed(goals: int):
+    """Доска пользователя с `goals` целями из случайных слов; вставка одним INSERT ... SELECT"""
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    from core.models import User
+    from goals.models import Board, BoardParticipant, Goal, GoalCategory
+
+    user, _ = User.objects.get_or_create(username='benchmark-search')
+    board = Board.objects.filter(title=BOARD_TITLE).first()
+    if board and Goal.objects.filter(category__board=board).count() == goals:
+        return user
+    now = timezone.now()
+    with transaction.atomic():
+        if board:
+            Goal.objects.filter(category__board=board).delete()
+        else:
+            board = Board.objects.create(title=BOARD_TITLE, created=now, updated=now)
+            BoardParticipant.objects.create(board=board, user=user, created=now, updated=now)
+        categories = GoalCategory.objects.bulk_create([
+            GoalCategory(board=board, user=user, title=f'Категория {i}', created=now, updated=now) for i in range(20)
+        ])
+        words = 'ARRAY[' + ', '.join(f"'{word}'" for word in WORDS) + ']'
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO goals_goal (user_id, category_id, title, description, status, priority, created, updated)
+                SELECT %s, (%s::bigint[])[1 + i %% %s],
+                       w[1 + (random() * 39)::int] || ' ' || w[1 + (random() * 39)::int] || ' ' || i,
+                       CASE WHEN i %% 3 = 0 THEN NULL
+                            ELSE w[1 + (random() * 39)::int] || ' ' || w[1 + (random() * 39)::int] || ' '
+                                 || w[1 + (random() * 39)::int] || ' ' || w[1 + (random() * 39)::int] END,
+                       1 + i %% 3, 1 + i %% 4, %s, %s
+                FROM generate_series(1, %s) AS i, (SELECT {words} AS w) AS vocabulary
+            """, [user.id, [category.id for category in categories], len(categories), now, now, goals])
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE goals_goal')
+    return user
+
+
+def measure(view, user, query: str, repeat: int) -> list[float]:
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    factory = APIRequestFactory()
+    samples = []
+    for _ in range(repeat):
+        request = factory.get('/goals/goal/list', {'search': query, 'limit': 20})
+        force_authenticate(request, user)
+        started = time.perf_counter()
+        response = view(request)
+        response.render()
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.content
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--goals', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django_filters.rest_framework import DjangoFilterBackend
+    from rest_framework import filters
+
+    from goals.search import FullTextSearchFilter
+    from goals.views import GoalListView
+
+    if connection.vendor != 'postgresql':
+        raise SystemExit('Бенчмарк поиска требует PostgreSQL')
+
+    started = time.perf_counter()
+    user = seed(args.goals)
+    print(f'dataset: {args.goals:,} goals ready in {time.perf_counter() - started:.1f}s')
+
+    views = {
+        'SearchFilter': GoalListView.as_view(
+            filter_backends=[DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]),
+        'FullTextSearch': GoalListView.as_view(
+            filter_backends=[DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]),
+    }
+    print(f'{"query":<24}' + ''.join(f'{name + " p50, ms":>24}' for name in views))
+    for query in QUERIES:
+        row = f'{query:<24}'
+        for view in views.values():
+            samples = measure(view, user, query, args.repeat)
+            row += f'{statistics.median(samples) * 1000:>24.1f}'
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
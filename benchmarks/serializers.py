@@ -0,0 +1,90 @@
+"""
+Микробенчмарк сериализации списков: DRF ModelSerializer против быстрого пути
+goals.fast_serializers. База данных не нужна — объекты и строки строятся в памяти.
+
+    python -m benchmarks.serializers --rows 10000 --repeat 5
+"""
+import argparse
+import datetime
+import time
+
+from benchmarks import setup_django
+
+
+def build_objects(rows: int) -> dict:
+    from core.models import User
+    from goals.models import Board, Goal, GoalCategory, GoalComment
+
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    users = [User(id=i, username=f'user{i}', first_name='Имя', last_name='Фамилия', email=f'user{i}@example.com')
+             for i in range(1, 101)]
+    board = Board(id=1, title='Доска', created=now, updated=now)
+    categories = [GoalCategory(id=i, board=board, user=users[i % 100], title=f'Категория {i}', created=now,
+                               updated=now) for i in range(1, rows + 1)]
+    goals = [Goal(id=i, category=categories[i % len(categories)], user=users[i % 100], title=f'Цель {i}',
+                  description='Описание' if i % 2 else None, due_date=now.date() if i % 3 else None,
+                  status=i % 4 + 1, priority=i % 4 + 1, created=now, updated=now) for i in range(1, rows + 1)]
+    comments = [GoalComment(id=i, goal=goals[i - 1], user=users[i % 100], text=f'Комментарий {i}', created=now,
+                            updated=now) for i in range(1, rows + 1)]
+    boards = [Board(id=i, title=f'Доска {i}', created=now, updated=now) for i in range(1, rows + 1)]
+    return {'goals': goals, 'comments': comments, 'categories': categories, 'boards': boards}
+
+
+def to_row(obj, lookups: list[str]) -> dict:
+    """Строка в том виде, в каком ее вернул бы .values(*lookups)"""
+    row = {}
+    for lookup in lookups:
+        value = obj
+        *path, last = lookup.split('__')
+        for part in path:
+            value = getattr(value, part)
+        row[lookup] = getattr(value, value._meta.get_field(last).attname)
+    return row
+
+
+def run(rows: int, repeat: int) -> None:
+    from rest_framework.renderers import JSONRenderer
+
+    from goals.fast_serializers import compile_serializer
+    from goals.serializers import BoardSerializer, CommentWithUserSerializer, GoalCategorySerializer, GoalSerializer
+
+    objects = build_objects(rows)
+    cases = [
+        ('GoalSerializer', GoalSerializer, objects['goals']),
+        ('CommentWithUserSerializer', CommentWithUserSerializer, objects['comments']),
+        ('GoalCategorySerializer', GoalCategorySerializer, objects['categories']),
+        ('BoardSerializer', BoardSerializer, objects['boards']),
+    ]
+    renderer = JSONRenderer()
+
+    print(f'{"serializer":<28}{"drf rows/s":>14}{"fast rows/s":>14}{"speedup":>10}')
+    for name, serializer_class, instances in cases:
+        compiled = compile_serializer(serializer_class)
+        values_rows = [to_row(instance, compiled.lookups) for instance in instances]
+
+        drf_time = fast_time = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            drf_data = serializer_class(instances, many=True).data
+            drf_time = min(drf_time, time.perf_counter() - started)
+
+            started = time.perf_counter()
+            fast_data = compiled.serialize(values_rows)
+            fast_time = min(fast_time, time.perf_counter() - started)
+
+        assert renderer.render(drf_data) == renderer.render(fast_data), f'{name}: результаты различаются'
+        print(f'{name:<28}{rows / drf_time:>14,.0f}{rows / fast_time:>14,.0f}{drf_time / fast_time:>9.1f}x')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    run(args.rows, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+"""
+Задержка и число запросов к БД для каждого маршрута goals/, core/ и bot/ на синтетических данных.
+
+Бенчмарк создает в текущей БД воспроизводимый набор данных масштаба --scale (goals.datagen:
+пользователи, доски с участниками, категории, цели, комментарии; одинаковый при одинаковом
+--seed) и переиспользует его при повторных запусках, поэтому запускайте его на отдельной базе.
+Набор, заполнение которого было прервано, не переиспользуется: бенчмарк завершается с ошибкой.
+Пользователь-«актер» — владелец всех досок, поэтому списки видят весь набор.
+
+Запросы проходят через весь стек middleware (тестовый клиент). Каждый запрос выполняется
+в транзакции, которая затем откатывается: изменяющие запросы не меняют набор данных,
+а их время не включает COMMIT. Результаты сохраняются в JSON для сравнения между коммитами:
+
+    DB_NAME=todolist_bench python -m benchmarks.suite --scale medium --output before.json
+    DB_NAME=todolist_bench python -m benchmarks.suite --scale medium --output after.json --compare before.json
+"""
+import argparse
+import itertools
+import json
+import statistics
+import subprocess
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional
+
+from benchmarks import setup_django
+
+PASSWORD = 'benchmark-password'
+VERIFICATION_CODE = 'benchmark-suite'
+WEBHOOK_SECRET = 'benchmark-suite'
+BULK_ITEMS = 100
+
+
+@dataclass(frozen=True)
+class Scale:
+    users: int
+    boards: int
+    # на доску, на доску, на категорию, на цель
+    participants: int
+    categories: int
+    goals: int
+    comments: int
+
+
+SCALES = {
+    'small': Scale(users=50, boards=10, participants=5, categories=5, goals=20, comments=1),
+    'medium': Scale(users=1000, boards=100, participants=20, categories=10, goals=50, comments=2),
+    'large': Scale(users=10000, boards=200, participants=50, categories=20, goals=100, comments=2),
+}
+
+
+@dataclass
+class Dataset:
+    actor_id: int
+    board_id: int
+    category_id: int
+    goal_id: int
+    comment_id: int
+    bulk_goal_ids: list[int]
+
+
+@dataclass
+class Case:
+    name: str
+    method: str
+    path: str
+    data: Optional[Callable[[int], object]] = None
+    auth: bool = True
+    headers: Optional[dict] = None
+
+
+def dataset_prefix(scale_name: str, seed_value: int) -> str:
+    """Начало имен пользователей и названий досок набора данных"""
+    return f'suite-{scale_name}-{seed_value}'
+
+
+def seed(scale_name: str, seed_value: int, batch_size: int) -> Dataset:
+    """Набор данных масштаба scale_name (goals.datagen); если он уже создан, только загружает его"""
+    from django.contrib.auth.hashers import make_password
+
+    from bot.models import TgUser
+    from core.models import User
+    from goals.datagen import DataSpec, IntRange, Mix, generate
+    from goals.models import Board, Goal, GoalCategory, GoalComment
+
+    prefix = dataset_prefix(scale_name, seed_value)
+    # generate коммитит пачки по отдельности, поэтому имя {prefix}-0 актер получает последним:
+    # прерванное заполнение оставляет {prefix}-seeding и не принимается за готовый набор
+    if not User.objects.filter(username=f'{prefix}-0').exists():
+        if User.objects.filter(username=f'{prefix}-seeding').exists():
+            raise SystemExit(f'Заполнение набора {prefix} было прервано, в базе неполные данные: '
+                             'запустите бенчмарк на чистой базе')
+        scale = SCALES[scale_name]
+        password = make_password(PASSWORD)
+        actor = User.objects.create(username=f'{prefix}-seeding', password=password)
+        generate(DataSpec(
+            users=scale.users - 1, boards=scale.boards, participants=IntRange(scale.participants, scale.participants),
+            categories=IntRange(scale.categories, scale.categories), goals=IntRange(scale.goals, scale.goals),
+            comments=IntRange(scale.comments, scale.comments),
+            statuses=Mix({Goal.Status.to_do: 5, Goal.Status.in_progress: 3, Goal.Status.done: 2,
+                          Goal.Status.archived: 1}),
+            password_hash=password, owner_id=actor.id, prefix=prefix, seed=seed_value,
+        ), batch_size=batch_size)
+        TgUser.objects.update_or_create(chat_id=seed_value, defaults={'verification_code': VERIFICATION_CODE})
+        User.objects.filter(pk=actor.pk).update(username=f'{prefix}-0')
+
+    actor = User.objects.get(username=f'{prefix}-0')
+    board = Board.objects.filter(title__startswith=prefix).order_by('pk').first()
+    category = GoalCategory.objects.filter(board=board).order_by('pk').first()
+    bulk_goal_ids = list(Goal.objects.visible().filter(category__board=board).order_by('pk').
+                         values_list('pk', flat=True)[:BULK_ITEMS])
+    # комментарий может изменить только автор
+    comment = GoalComment.objects.filter(goal__category__board=board, user=actor).order_by('pk').first()
+    return Dataset(actor_id=actor.id, board_id=board.id, category_id=category.id, goal_id=bulk_goal_ids[0],
+                   comment_id=comment.id, bulk_goal_ids=bulk_goal_ids)
+
+
+def cases(data: Dataset) -> list[Case]:
+    from django.urls import reverse
+
+    from core.models import User
+    from goals.datagen import WORDS
+
+    actor = User.objects.get(pk=data.actor_id)
+    goal, comment, board, category = data.goal_id, data.comment_id, data.board_id, data.category_id
+    return [
+        Case('signup POST', 'post', reverse('signup'), lambda i: {
+            'username': f'suite-signup-{i}', 'password': PASSWORD, 'password_repeat': PASSWORD}, auth=False),
+        Case('login POST', 'post', reverse('login'),
+             lambda i: {'username': actor.username, 'password': PASSWORD}, auth=False),
+        Case('profile GET', 'get', reverse('profile')),
+        Case('profile PATCH', 'patch', reverse('profile'), lambda i: {'first_name': f'Name {i}'}),
+        Case('update_password PATCH', 'patch', reverse('update_password'),
+             lambda i: {'old_password': PASSWORD, 'new_password': f'{PASSWORD}-{i}'}),
+
+        Case('create-board POST', 'post', reverse('create-board'), lambda i: {'title': f'Board {i}'}),
+        Case('board-list GET', 'get', reverse('board-list') + '?limit=50'),
+        Case('board GET', 'get', reverse('board', args=[board])),
+        Case('board PATCH', 'patch', reverse('board', args=[board]), lambda i: {'title': f'Board {i}'}),
+        Case('board DELETE', 'delete', reverse('board', args=[board])),
+        Case('board-stats GET', 'get', reverse('board-stats', args=[board])),
+
+        Case('create-category POST', 'post', reverse('create-category'),
+             lambda i: {'board': board, 'title': f'Category {i}'}),
+        Case('category-list GET', 'get', reverse('category-list') + '?limit=50'),
+        Case('category GET', 'get', reverse('category', args=[category])),
+        Case('category PATCH', 'patch', reverse('category', args=[category]), lambda i: {'title': f'Category {i}'}),
+        Case('category DELETE', 'delete', reverse('category', args=[category])),
+
+        Case('create-goal POST', 'post', reverse('create-goal'), lambda i: {'category': category, 'title': f'Goal {i}'}),
+        Case('goal-list GET', 'get', reverse('goal-list') + '?limit=50'),
+        Case('goal-list GET search', 'get', reverse('goal-list') + f'?limit=50&search={WORDS[0]}'),
+        Case('goal-list GET keyset', 'get', reverse('goal-list') + '?limit=50&cursor='),
+        Case('goal GET', 'get', reverse('goal', args=[goal])),
+        Case('goal PATCH', 'patch', reverse('goal', args=[goal]), lambda i: {'title': f'Goal {i}'}),
+        Case('goal DELETE', 'delete', reverse('goal', args=[goal])),
+        Case('goal-bulk-create POST', 'post', reverse('goal-bulk-create'),
+             lambda i: [{'category': category, 'title': f'Goal {i}.{n}'} for n in range(BULK_ITEMS)]),
+        Case('goal-bulk-update PATCH', 'patch', reverse('goal-bulk-update'),
+             lambda i: [{'id': goal_id, 'priority': i % 4 + 1} for goal_id in data.bulk_goal_ids]),
+        Case('goal-bulk-archive POST', 'post', reverse('goal-bulk-archive'), lambda i: data.bulk_goal_ids),
+
+        Case('create-comment POST', 'post', reverse('create-comment'), lambda i: {'goal': goal, 'text': f'Text {i}'}),
+        Case('comment-list GET', 'get', reverse('comment-list') + f'?goal={goal}&limit=50'),
+        Case('comment GET', 'get', reverse('comment', args=[comment])),
+        Case('comment PATCH', 'patch', reverse('comment', args=[comment]), lambda i: {'text': f'Text {i}'}),
+        Case('comment DELETE', 'delete', reverse('comment', args=[comment])),
+
+        Case('sync GET', 'get', reverse('sync')),
+
+        Case('verify_bot PATCH', 'patch', reverse('verify_bot'), lambda i: {'verification_code': VERIFICATION_CODE}),
+        # апдейт без сообщения: измеряется прием webhook, без обработки в фоне
+        Case('bot_webhook POST', 'post', reverse('bot_webhook'), lambda i: {'update_id': i}, auth=False,
+             headers={'HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN': WEBHOOK_SECRET}),
+    ]
+
+
+def run_case(client, case: Case, requests: int, warmup: int, counter: itertools.count) -> dict:
+    from django.db import connections, transaction
+
+    from todolist.metrics import QueryStats
+
+    latencies, queries, db_times, statuses = [], [], [], set()
+    for iteration in range(warmup + requests):
+        number = next(counter)
+        kwargs = {'format': 'json', **(case.headers or {})}
+        if case.data is not None:
+            kwargs['data'] = case.data(number)
+        stats = QueryStats()
+        with transaction.atomic():
+            with connections['default'].execute_wrapper(stats):
+                started = time.perf_counter()
+                response = getattr(client, case.method)(case.path, **kwargs)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        if iteration >= warmup:
+            latencies.append(elapsed)
+            queries.append(stats.count)
+            db_times.append(stats.duration)
+            statuses.add(response.status_code)
+
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        'status': sorted(statuses),
+        'p50_ms': round(percentiles[49] * 1000, 3),
+        'p95_ms': round(percentiles[94] * 1000, 3),
+        'queries': statistics.median(queries),
+        'db_ms': round(statistics.median(db_times) * 1000, 3),
+    }
+
+
+def run(scale: str, seed_value: int, requests: int, warmup: int, batch_size: int, only: Optional[list[str]]) -> dict:
+    from unittest.mock import patch
+
+    from django.db import connection
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    from benchmarks.fake_telegram import FakeTelegramServer
+    from core.models import User
+    from goals.models import Goal, GoalComment
+    from todolist import settings
+
+    prefix = dataset_prefix(scale, seed_value)
+    started = time.perf_counter()
+    data = seed(scale, seed_value, batch_size)
+    seeded = time.perf_counter() - started
+
+    client, anonymous = APIClient(), APIClient()
+    client.force_login(User.objects.get(pk=data.actor_id))
+    counter = itertools.count(int(time.time()))
+    results = {}
+    with FakeTelegramServer() as server, \
+            patch.object(settings, 'BOT_API_URL', server.url), \
+            override_settings(BOT_WEBHOOK_SECRET=WEBHOOK_SECRET):
+        for case in cases(data):
+            if only and not any(name in case.name for name in only):
+                continue
+            results[case.name] = run_case(client if case.auth else anonymous, case, requests, warmup, counter)
+            print(f'{case.name:<28}{results[case.name]["p50_ms"]:>10.2f}{results[case.name]["p95_ms"]:>10.2f}'
+                  f'{results[case.name]["queries"]:>9g}  {results[case.name]["status"]}')
+
+    return {
+        'commit': git_commit(),
+        'vendor': connection.vendor,
+        'scale': scale,
+        'dataset': {**asdict(SCALES[scale]), 'seed': seed_value, 'seed_seconds': round(seeded, 1),
+                    'goals_total': Goal.objects.filter(category__board__title__startswith=prefix).count(),
+                    'comments_total': GoalComment.objects.filter(goal__category__board__title__startswith=prefix).count()},
+        'requests': requests,
+        'results': results,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before: dict, after: dict) -> None:
+    print(f'\n{before.get("commit")} -> {after.get("commit")}')
+    print(f'{"case":<28}{"p95 before":>12}{"p95 after":>12}{"change":>9}{"queries":>12}')
+    for name, result in after['results'].items():
+        old = before['results'].get(name)
+        if old is None:
+            continue
+        change = (result['p95_ms'] / old['p95_ms'] - 1) * 100 if old['p95_ms'] else 0
+        queries = f'{old["queries"]:g}->{result["queries"]:g}' if old['queries'] != result['queries'] else ''
+        print(f'{name:<28}{old["p95_ms"]:>12.2f}{result["p95_ms"]:>12.2f}{change:>+8.0f}%{queries:>12}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=list(SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=1, help='Seed генератора данных')
+    parser.add_argument('--requests', type=int, default=30, help='Замеров на маршрут')
+    parser.add_argument('--warmup', type=int, default=3, help='Запросов на прогрев перед замерами')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Строк каждой таблицы в одной пачке при заполнении')
+    parser.add_argument('--only', nargs='+', help='Только маршруты, в названии которых есть эти строки')
+    parser.add_argument('--output', help='Сохранить результаты в JSON')
+    parser.add_argument('--compare', help='JSON прошлого запуска для сравнения')
+    args = parser.parse_args()
+    setup_django()
+
+    print(f'{"case":<28}{"p50, ms":>10}{"p95, ms":>10}{"queries":>9}  status')
+    report = run(args.scale, args.seed, args.requests, args.warmup, args.batch_size, args.only)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare) as file:
+            compare(json.load(file), report)
+
+
+if __name__ == '__main__':
+    main()
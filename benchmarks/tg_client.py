@@ -0,0 +1,55 @@
+"""
+Задержка sendMessage: новый запрос requests.get на каждое сообщение (как было в TgClient)
+против пула keep-alive соединений TgClient. Сервер — локальный фейковый Telegram.
+
+    python -m benchmarks.tg_client --messages 2000
+"""
+import argparse
+import statistics
+import time
+
+import requests
+
+from benchmarks import setup_django
+from benchmarks.fake_telegram import FakeTelegramServer
+
+
+def percentile(samples: list[float], q: int) -> float:
+    return statistics.quantiles(samples, n=100, method='inclusive')[q - 1]
+
+
+def measure(send, messages: int) -> list[float]:
+    samples = []
+    for i in range(messages):
+        started = time.perf_counter()
+        send(i)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from bot.tg.client import TgClient
+
+    with FakeTelegramServer() as server:
+        url = f'{server.url}/botbenchmark/sendMessage'
+        tg_client = TgClient(token='benchmark', api_url=server.url)
+        cases = [
+            ('requests.get', lambda i: requests.get(url, params={'chat_id': 1, 'text': str(i)}).json()),
+            ('TgClient', lambda i: tg_client.send_message(chat_id=1, text=str(i))),
+        ]
+        print(f'{"client":<16}{"p50, ms":>10}{"p99, ms":>10}{"connections":>14}')
+        for name, send in cases:
+            connections = server.connections
+            samples = measure(send, args.messages)
+            print(f'{name:<16}{percentile(samples, 50) * 1000:>10.3f}{percentile(samples, 99) * 1000:>10.3f}'
+                  f'{server.connections - connections:>14}')
+        tg_client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Прогон апдейтов через webhook бота с заданной частотой.
+
+Апдейты берутся из файла (JSON Lines, по апдейту на строку — например, записанные
+ответы getUpdates) или генерируются. Часть апдейтов можно отправить повторно, чтобы
+проверить отбрасывание дублей. Сервер запускается отдельно, например:
+
+    BOT_WEBHOOK_SECRET=secret uvicorn todolist.asgi:application
+    python -m benchmarks.webhook_replay --secret secret --count 2000 --rate 500 --duplicates 0.1
+"""
+import argparse
+import collections
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.fake_telegram import make_updates
+
+
+def load_updates(args) -> list[dict]:
+    if args.file:
+        with open(args.file, encoding='utf-8') as file:
+            updates = [json.loads(line) for line in file if line.strip()]
+    else:
+        updates = make_updates(args.count, args.chats, start_id=int(time.time() * 1000))
+    duplicates = random.sample(updates, int(len(updates) * args.duplicates))
+    return updates + duplicates
+
+
+def replay(updates: list[dict], url: str, secret: str, rate: float, workers: int) -> tuple[collections.Counter, list]:
+    statuses = collections.Counter()
+    latencies = []
+    lock = threading.Lock()
+    local = threading.local()
+
+    def post(update: dict) -> None:
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            response = session.post(url, json=update, headers={'X-Telegram-Bot-Api-Secret-Token': secret}, timeout=10)
+            result = 'duplicate' if response.ok and response.json().get('duplicate') else response.status_code
+        except requests.RequestException as e:
+            result = type(e).__name__
+        elapsed = time.perf_counter() - started
+        with lock:
+            statuses[result] += 1
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for i, update in enumerate(updates):
+            if rate:
+                delay = started + i / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            executor.submit(post, update)
+    return statuses, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000/bot/webhook')
+    parser.add_argument('--secret', required=True, help='BOT_WEBHOOK_SECRET сервера')
+    parser.add_argument('--file', help='JSON Lines с апдейтами; без него апдейты генерируются')
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--chats', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=200, help='запросов в секунду, 0 — без ограничения')
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--duplicates', type=float, default=0.0, help='доля апдейтов, отправляемых повторно')
+    args = parser.parse_args()
+
+    updates = load_updates(args)
+    started = time.perf_counter()
+    statuses, latencies = replay(updates, args.url, args.secret, args.rate, args.workers)
+    elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    print(f'sent {len(updates)} updates in {elapsed:.2f}s ({len(updates) / elapsed:,.1f}/s)')
+    print(f'latency p50 {quantiles[49] * 1000:.1f} ms, p99 {quantiles[98] * 1000:.1f} ms')
+    for result, count in sorted(statuses.items(), key=str):
+        print(f'{result!s:<20}{count:>8}')
+
+
+if __name__ == '__main__':
+    main()
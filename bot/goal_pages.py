@@ -0,0 +1,126 @@
+"""
+Постраничный список целей для команды /goals.
+
+Страница — один запрос (select_related категории и автора, LIMIT на одну запись больше
+размера страницы, чтобы узнать, есть ли следующая). Готовый текст страницы кэшируется
+под версией пользователя; версия меняется при любом изменении его целей (bot.signals).
+Цели меняет в основном API, а страницы читает бот, поэтому кэш включен только общий
+для процессов (todolist.cache).
+"""
+import hashlib
+import uuid
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import BaseCache
+from django.db import transaction
+from django.http import QueryDict
+
+from goals.filters import GoalDateFilter
+from goals.models import Goal
+from todolist.cache import shared_cache
+
+
+class GoalPage(NamedTuple):
+    text: str
+    has_prev: bool
+    has_next: bool
+
+
+class InvalidFilters(ValueError):
+    pass
+
+
+def _cache() -> Optional[BaseCache]:
+    return shared_cache(settings.BOT_GOALS_CACHE)
+
+
+def _version_key(user_id: int) -> str:
+    return f'bot-goals:version:{user_id}'
+
+
+def _current_version(cache: BaseCache, user_id: int) -> str:
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), uuid.uuid4().hex, timeout=None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def invalidate_goal_pages(*user_ids: int) -> None:
+    """Сбрасывает кэш страниц сразу и еще раз после коммита (как invalidate_board_roles)"""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+
+    cache = _cache()
+    if cache is None:
+        return
+
+    def bump_versions() -> None:
+        cache.set_many({_version_key(user_id): uuid.uuid4().hex for user_id in user_ids}, timeout=None)
+
+    bump_versions()
+    transaction.on_commit(bump_versions)
+
+
+def parse_filters(args: list[str]) -> str:
+    """
+    Аргументы `/goals status=2 priority__in=3,4` в нормализованную строку фильтров GoalDateFilter.
+
+    Строка хранится в состоянии чата и входит в ключ кэша.
+    """
+    data = QueryDict(mutable=True)
+    for arg in args:
+        key, sep, value = arg.partition('=')
+        if not sep or key not in GoalDateFilter.base_filters:
+            raise InvalidFilters(f'Unknown filter: {arg}')
+        data[key] = value
+    query = data.urlencode()
+    filterset = GoalDateFilter(data, queryset=Goal.objects.none())
+    if not filterset.is_valid():
+        raise InvalidFilters('; '.join(f'{name}: {" ".join(errors)}' for name, errors in filterset.errors.items()))
+    return '&'.join(sorted(query.split('&'))) if query else ''
+
+
+def render_goal(goal: Goal) -> str:
+    return (f'Название: {goal.title},\n'
+            f'Категория: {goal.category},\n'
+            f'Статус: {goal.get_status_display()},\n'
+            f'Пользователь: {goal.user},\n'
+            f'Дедлайн {goal.due_date if goal.due_date else "Нет"} \n')
+
+
+def get_goal_page(user_id: int, query: str, page: int) -> GoalPage:
+    cache = _cache()
+    if cache is None:
+        return _render_page(user_id, query, page)
+    query_hash = hashlib.md5(query.encode()).hexdigest()
+    key = f'bot-goals:{user_id}:{_current_version(cache, user_id)}:{query_hash}:{page}'
+    goal_page = cache.get(key)
+    if goal_page is None:
+        goal_page = _render_page(user_id, query, page)
+        cache.set(key, tuple(goal_page), settings.BOT_GOALS_CACHE_TIMEOUT)
+    return GoalPage(*goal_page)
+
+
+def _render_page(user_id: int, query: str, page: int) -> GoalPage:
+    page_size = settings.BOT_GOALS_PAGE_SIZE
+    queryset = Goal.objects.visible().select_related('category', 'user').filter(user_id=user_id)
+    queryset = GoalDateFilter(QueryDict(query), queryset=queryset).qs.order_by('title', 'pk')
+    goals = list(queryset[page * page_size:(page + 1) * page_size + 1])
+
+    has_next = len(goals) > page_size
+    goals = goals[:page_size]
+    has_prev = page > 0
+    if not goals:
+        if page == 0 and not query:
+            return GoalPage('No Goals to display, create one with /create command', False, False)
+        return GoalPage('No goals match the filter' if page == 0 else 'No goals on this page', has_prev, False)
+
+    navigation = [command for command, enabled in (('/prev', has_prev), ('/next', has_next)) if enabled]
+    lines = [f'Goals, page {page + 1}' + (f' ({query})' if query else ''), '']
+    lines.extend(render_goal(goal) for goal in goals)
+    if navigation:
+        lines.append(' '.join(navigation))
+    return GoalPage('\n'.join(lines), has_prev, has_next)
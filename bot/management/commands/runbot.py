@@ -1,14 +1,23 @@
-import logging
+import asyncio
+import time
 
+from django.conf import settings
 from django.core.management import BaseCommand
+from prometheus_client import start_http_server
+
+from bot.goal_pages import InvalidFilters, get_goal_page, parse_filters
 from bot.models import TgUser
+from bot.states import ChatState, get_state_store
 from bot.tg.client import TgClient
+from bot.tg.runtime import PollingRunner, UpdateDispatcher, UpdatePoller
+from bot.tg.sender import OutboxSender
 from bot.tg.schemas import Message
+from goals.filters import GoalDateFilter
 from goals.models import Goal, GoalCategory, BoardParticipant
+from todolist.metrics import BOT_COMMAND_DURATION
 
-
-states = {}
-cat_id = []
+# Команды для метрик; остальные сообщения учитываются как 'text'
+COMMANDS = ('/board', '/goals', '/next', '/prev', '/create', '/cancel')
 
 
 class Command(BaseCommand):
@@ -16,122 +25,156 @@ class Command(BaseCommand):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.tg_client = TgClient()
-
-    def handle(self, *args, **kwargs):
-        offset = 0
+        self.sender = OutboxSender(self.tg_client)
+        self.state_store = get_state_store()
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--async', action='store_true', dest='use_async',
+            help='Обрабатывать апдейты конкурентно: свой воркер на каждый чат, ORM в пуле потоков',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.BOT_CONCURRENCY,
+            help='Сколько апдейтов обрабатывается одновременно в режиме --async',
+        )
+
+    def handle(self, *args, **options):
+        if settings.BOT_METRICS_PORT:
+            start_http_server(settings.BOT_METRICS_PORT)
+        if options.get('use_async'):
+            self.handle_async(options['concurrency'])
+            return
+
+        poller = UpdatePoller(self.tg_client)
 
         self.stdout.write(self.style.SUCCESS('Bot started'))
         while True:
-            res = self.tg_client.get_updates(offset=offset)
-            for item in res.result:
-                offset = item.update_id + 1
-                self.handle_message(item.message)
+            for item in poller.poll():
+                if item.message:
+                    self.handle_message(item.message)
+
+    def handle_async(self, concurrency: int):
+        dispatcher = UpdateDispatcher(self.handle_message, concurrency=concurrency)
+        self.stdout.write(self.style.SUCCESS(f'Bot started (async, concurrency={concurrency})'))
+        try:
+            asyncio.run(PollingRunner(self.tg_client, dispatcher).run())
+        finally:
+            dispatcher.close()
 
     def handle_message(self, msg: Message):
-        self.tg_client.send_message(chat_id=msg.chat.id, text=msg.text)
-        tg_user, _ = TgUser.objects.get_or_create(chat_id=msg.chat.id)
-        if tg_user.is_verified:
-            self.handle_authorized(tg_user, msg)
-        else:
-            self.handle_unauthorized(tg_user, msg)
+        started = time.perf_counter()
+        command = 'unauthorized'
+        try:
+            self.sender.send(chat_id=msg.chat.id, text=msg.text)
+            tg_user, _ = TgUser.objects.get_or_create(chat_id=msg.chat.id)
+            if tg_user.is_verified:
+                command = self.command_name(msg.text)
+                self.handle_authorized(tg_user, msg)
+            else:
+                self.handle_unauthorized(tg_user, msg)
+        finally:
+            self.sender.flush(msg.chat.id)
+            BOT_COMMAND_DURATION.labels(command).observe(time.perf_counter() - started)
+
+    @staticmethod
+    def command_name(text: str or None) -> str:
+        words = (text or '').split()
+        return words[0] if words and words[0] in COMMANDS else 'text'
 
     def handle_unauthorized(self, tg_user: TgUser, msg: Message):
 
-        self.tg_client.send_message(tg_user.chat_id, 'Hello')
+        self.sender.send(tg_user.chat_id, 'Hello')
         tg_user.update_verification_code()
-        self.tg_client.send_message(tg_user.chat_id, f'Your verification code: {tg_user.verification_code}')
+        self.sender.send(tg_user.chat_id, f'Your verification code: {tg_user.verification_code}')
 
     def handle_authorized(self, tg_user: TgUser, msg: Message):
-        self.tg_client.send_message(tg_user.chat_id, 'Authorized')
+        self.sender.send(tg_user.chat_id, 'Authorized')
 
-        allowed_commands: list[str] = ['/goals', '/create', '/cancel']
         if "/board" in msg.text:
             self.board(msg, tg_user)
         elif '/goals' in msg.text:
             self.get_goals(msg, tg_user)
 
+        elif msg.text in ('/next', '/prev'):
+            self.turn_goals_page(msg, tg_user)
+
         elif '/create' in msg.text:
             self.handle_categories(msg, tg_user)
 
         elif '/cancel' in msg.text:
             self.get_cancel(tg_user)
 
-        elif ('user' not in states) and (msg.text not in allowed_commands):
-            self.tg_client.send_message(tg_user.chat_id, 'Command not found')
-
-        elif (msg.text not in allowed_commands) and (states['user']) and \
-                ('category' not in states):
-            category = self.handle_save_category(tg_user, msg.text)
-            if category:
-                states['category'] = category
-                self.tg_client.send_message(tg_user.chat_id,
-                                            f'You choosed {category.title}, category, please enter name for your goal')
-
-        elif (msg.text not in allowed_commands) and (states['user']) and \
-                (states['category']) and ('goal_title' not in states):
-            states['goal_title'] = msg.text
-            goal = Goal.objects.create(title=states['goal_title'],
-                                       user=states['user'],
-                                       category=states['category'])
-            self.tg_client.send_message(tg_user.chat_id, f'Your goal {goal} has been created')
-            del states['user']
-            del states['category']
-            del states['goal_title']
-            cat_id.clear()
+        else:
+            state = self.state_store.get(tg_user.chat_id) or ChatState()
+            if state.step is None:
+                self.sender.send(tg_user.chat_id, 'Command not found')
+            elif state.step == ChatState.CHOOSE_CATEGORY:
+                category = self.handle_save_category(tg_user, msg.text)
+                if category:
+                    self.state_store.update(tg_user.chat_id, step=ChatState.ENTER_TITLE, category_id=category.id)
+                    self.sender.send(tg_user.chat_id,
+                                     f'You choosed {category.title}, category, please enter name for your goal')
+            elif state.step == ChatState.ENTER_TITLE:
+                goal = Goal.objects.create(title=msg.text,
+                                           user=tg_user.user,
+                                           category_id=state.category_id)
+                self.sender.send(tg_user.chat_id, f'Your goal {goal} has been created')
+                self.state_store.update(tg_user.chat_id, step=None, category_id=None)
 
     def board(self, msg, tg_user: TgUser):
         boards = BoardParticipant.objects.filter(user=tg_user.user)
         if boards:
-            [self.tg_client.send_message(msg.chat.id, f"Boards: {item.board}\n") for item in boards]
+            for item in boards:
+                self.sender.send(msg.chat.id, f"Boards: {item.board}\n")
         else:
-            self.tg_client.send_message(msg.chat.id, "Not Board")
+            self.sender.send(msg.chat.id, "Not Board")
 
     def get_goals(self, msg: Message, tg_user: TgUser):
-        goals = Goal.objects.filter(user=tg_user.user).exclude(status=Goal.Status.archived)
-
-        if goals.count() > 0:
-           [self.tg_client.send_message(msg.chat.id,
-                                        f'Название: {goal.title},\n'
-                                        f'Категория: {goal.category},\n'
-                                        f'Статус: {goal.get_status_display()},\n'
-                                        f'Пользователь: {goal.user},\n'
-                                        f'Дедлайн {goal.due_date if goal.due_date else "Нет"} \n')
-                                        for goal in goals]
-
+        try:
+            query = parse_filters(msg.text.split()[1:])
+        except InvalidFilters as e:
+            self.sender.send(msg.chat.id, f'{e}\nFilters: {", ".join(GoalDateFilter.base_filters)}')
+            return
+        self.state_store.update(msg.chat.id, goals_page=0, goals_query=query)
+        self.sender.send(msg.chat.id, get_goal_page(tg_user.user_id, query, 0).text)
+
+    def turn_goals_page(self, msg: Message, tg_user: TgUser):
+        state = self.state_store.get(msg.chat.id)
+        if state is None or state.goals_page is None:
+            self.sender.send(msg.chat.id, 'Open the list with /goals first')
+            return
+        goal_page = get_goal_page(tg_user.user_id, state.goals_query, state.goals_page)
+        if msg.text == '/next' and goal_page.has_next:
+            page = state.goals_page + 1
+        elif msg.text == '/prev' and goal_page.has_prev:
+            page = state.goals_page - 1
         else:
-            self.tg_client.send_message(msg.chat.id, 'No Goals to display, create one with /create command')
+            page = state.goals_page
+        self.state_store.update(msg.chat.id, goals_page=page)
+        self.sender.send(msg.chat.id, get_goal_page(tg_user.user_id, state.goals_query, page).text)
 
     def handle_categories(self, msg, tg_user: TgUser):
-        categories = GoalCategory.objects.filter(user=tg_user.user, is_deleted=False)
-        if categories.count() > 0:
-            category_list = ''
-            for cat in categories:
-                category_list += f'{cat.id}: {cat.title} \n'
-                cat_id.append(cat.id)
-            self.tg_client.send_message(
+        categories = GoalCategory.objects.visible().filter(user=tg_user.user)
+        category_list = ''.join(f'{cat.id}: {cat.title} \n' for cat in categories)
+        if category_list:
+            self.state_store.update(tg_user.chat_id, step=ChatState.CHOOSE_CATEGORY, category_id=None)
+            self.sender.send(
                 chat_id=tg_user.chat_id,
                 text=f'Please choose the Category, to create goal\n{category_list}')
-        if 'user' not in states:
-            states['user'] = tg_user.user
         else:
-            self.tg_client.send_message(msg.chat.id, 'No Categories found, first create category '
-                                                     'on website for your goals')
+            self.sender.send(msg.chat.id, 'No Categories found, first create category '
+                                          'on website for your goals')
 
     def handle_save_category(self, tg_user: TgUser, msg: str):
         messg = f'Unknown command'
         try:
             category_id = int(msg)
-            category_data = GoalCategory.objects.filter(user=tg_user.user).get(pk=category_id)
+            category_data = GoalCategory.objects.visible().filter(user=tg_user.user).get(pk=category_id)
             return category_data
-        except ValueError:
-            self.tg_client.send_message(chat_id=tg_user.chat_id, text=messg)
+        except (ValueError, GoalCategory.DoesNotExist):
+            self.sender.send(chat_id=tg_user.chat_id, text=messg)
             return None
 
     def get_cancel(self, tg_user: TgUser):
-        if 'user' in states:
-            del states['user']
-        if 'category' in states:
-            del states['category']
-        if 'goal_title' in states:
-            del states['goal_title']
-        self.tg_client.send_message(tg_user.chat_id, 'Operation canceled')
+        self.state_store.update(tg_user.chat_id, step=None, category_id=None)
+        self.sender.send(tg_user.chat_id, 'Operation canceled')
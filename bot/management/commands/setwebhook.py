@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from bot.tg.client import TgClient
+
+
+class Command(BaseCommand):
+    help = 'Регистрирует /bot/webhook в Telegram вместо long polling (runbot)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', nargs='?', help='Публичный адрес, например https://example.com/bot/webhook')
+        parser.add_argument('--delete', action='store_true', help='Удалить webhook и вернуться к runbot')
+
+    def handle(self, *args, **options):
+        tg_client = TgClient()
+        if options['delete']:
+            result = tg_client.delete_webhook()
+        else:
+            if not options['url']:
+                raise CommandError('Укажите url webhook')
+            if not settings.BOT_WEBHOOK_SECRET:
+                raise CommandError('Задайте BOT_WEBHOOK_SECRET')
+            result = tg_client.set_webhook(options['url'], settings.BOT_WEBHOOK_SECRET)
+
+        if not result.get('ok'):
+            raise CommandError(f'Telegram ответил ошибкой: {result}')
+        self.stdout.write(self.style.SUCCESS(result.get('description', 'OK')))
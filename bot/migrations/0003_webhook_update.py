@@ -0,0 +1,32 @@
+# Generated by Django 4.1.7 on 2026-10-18 21:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0002_remove_tguser_id_remove_tguser_user_ud_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookUpdate',
+            fields=[
+                ('update_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('message', models.JSONField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('claim', models.CharField(max_length=32)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('processed', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='webhookupdate',
+            index=models.Index(condition=models.Q(('processed__isnull', True)), fields=['claimed_at'], name='webhook_update_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='webhookupdate',
+            index=models.Index(fields=['processed'], name='webhook_update_processed_idx'),
+        ),
+    ]
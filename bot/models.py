@@ -22,3 +22,30 @@ class TgUser(models.Model):
     @staticmethod
     def _generate_verification_code() -> str:
         return get_random_string(20)
+
+
+class WebhookUpdate(models.Model):
+    """
+    Апдейт, принятый через webhook (bot.tg.webhook).
+
+    Строка пишется до ответа Telegram: первичный ключ отсекает повторы update_id во всех
+    процессах, а апдейт, который процесс не успел обработать, забирает другой процесс.
+    Обработанные строки хранятся BOT_WEBHOOK_DEDUP_TTL секунд ради отсева повторов.
+    """
+    update_id = models.BigIntegerField(primary_key=True)
+    message = models.JSONField()
+    created = models.DateTimeField(auto_now_add=True)
+    # Процесс, который обрабатывает апдейт, и когда он его взял; NULL — апдейт может взять любой
+    claim = models.CharField(max_length=32)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['claimed_at'], condition=models.Q(processed__isnull=True),
+                         name='webhook_update_pending_idx'),
+            models.Index(fields=['processed'], name='webhook_update_processed_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.__class__.__name__}{self.update_id}'
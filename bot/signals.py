@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bot.goal_pages import invalidate_goal_pages
+from goals.models import Board, Goal, GoalCategory
+from goals.signals import goals_bulk_updated
+
+
+@receiver([post_save, post_delete], sender=Goal)
+def invalidate_goal_pages_on_change(sender, instance: Goal, **kwargs) -> None:
+    invalidate_goal_pages(instance.user_id)
+
+
+@receiver(goals_bulk_updated, sender=Goal)
+def invalidate_goal_pages_on_bulk_update(sender, user_ids: set[int], **kwargs) -> None:
+    invalidate_goal_pages(*user_ids)
+
+
+@receiver(post_save, sender=GoalCategory)
+def invalidate_goal_pages_on_category_change(sender, instance: GoalCategory, created: bool, **kwargs) -> None:
+    # В тексте страницы есть название категории
+    if not created:
+        invalidate_goal_pages(*Goal.objects.filter(category=instance).values_list('user_id', flat=True).distinct())
+
+
+@receiver(post_save, sender=Board)
+def invalidate_goal_pages_on_board_delete(sender, instance: Board, **kwargs) -> None:
+    # Цели удаленной доски скрываются сразу, не дожидаясь фоновой архивации
+    if instance.is_deleted:
+        invalidate_goal_pages(*Goal.objects.filter(category__board=instance).values_list('user_id', flat=True).distinct())
@@ -0,0 +1,137 @@
+"""
+Состояние диалога бота по chat_id.
+
+Хранятся только шаг диалога, выбранная категория и позиция в списке /goals —
+короткий кортеж, который одинаково дешево держать в памяти и класть в кэш.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class ChatState(NamedTuple):
+    CHOOSE_CATEGORY = 'choose_category'
+    ENTER_TITLE = 'enter_title'
+
+    step: Optional[str] = None
+    category_id: Optional[int] = None
+    # Страница и фильтры последнего /goals; None — список не открывали
+    goals_page: Optional[int] = None
+    goals_query: str = ''
+
+    @property
+    def is_empty(self) -> bool:
+        return self == EMPTY_STATE
+
+
+EMPTY_STATE = ChatState()
+
+
+class BaseStateStore(ABC):
+    def __init__(self, ttl: int) -> None:
+        self.ttl = ttl
+
+    def update(self, chat_id: int, **fields) -> ChatState:
+        """Меняет часть полей состояния; пустое состояние удаляется"""
+        state = (self.get(chat_id) or EMPTY_STATE)._replace(**fields)
+        if state.is_empty:
+            self.delete(chat_id)
+        else:
+            self.set(chat_id, state)
+        return state
+
+    @abstractmethod
+    def get(self, chat_id: int) -> Optional[ChatState]:
+        ...
+
+    @abstractmethod
+    def set(self, chat_id: int, state: ChatState) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, chat_id: int) -> None:
+        ...
+
+
+class MemoryStateStore(BaseStateStore):
+    """
+    Состояния в памяти процесса.
+
+    Записи хранятся в порядке последнего изменения, а TTL у всех одинаковый, поэтому
+    просроченные записи всегда в начале словаря и удаляются за O(1) на каждую.
+    """
+
+    def __init__(self, ttl: int, clock: Callable[[], float] = time.monotonic) -> None:
+        super().__init__(ttl)
+        self.clock = clock
+        self._states: OrderedDict[int, tuple[float, ChatState]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chat_id: int) -> Optional[ChatState]:
+        with self._lock:
+            self._purge()
+            item = self._states.get(chat_id)
+        return item[1] if item else None
+
+    def set(self, chat_id: int, state: ChatState) -> None:
+        with self._lock:
+            self._states[chat_id] = (self.clock() + self.ttl, state)
+            self._states.move_to_end(chat_id)
+            self._purge()
+
+    def delete(self, chat_id: int) -> None:
+        with self._lock:
+            self._states.pop(chat_id, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._purge()
+            return len(self._states)
+
+    def _purge(self) -> None:
+        now = self.clock()
+        while self._states:
+            chat_id, (expires, _) = next(iter(self._states.items()))
+            if expires > now:
+                break
+            del self._states[chat_id]
+
+
+class CacheStateStore(BaseStateStore):
+    """
+    Состояния в кэше Django.
+
+    С общим бэкендом (Redis, Memcached, DatabaseCache) состояние видят все процессы бота.
+    """
+
+    def __init__(self, ttl: int, alias: str = 'default') -> None:
+        super().__init__(ttl)
+        self.cache = caches[alias]
+
+    def get(self, chat_id: int) -> Optional[ChatState]:
+        value = self.cache.get(self._key(chat_id))
+        return ChatState(*value) if value else None
+
+    def set(self, chat_id: int, state: ChatState) -> None:
+        self.cache.set(self._key(chat_id), tuple(state), self.ttl)
+
+    def delete(self, chat_id: int) -> None:
+        self.cache.delete(self._key(chat_id))
+
+    @staticmethod
+    def _key(chat_id: int) -> str:
+        return f'bot-state:{chat_id}'
+
+
+def get_state_store() -> BaseStateStore:
+    """Хранилище из настроек BOT_STATE_STORE ('memory' или 'cache')"""
+    if settings.BOT_STATE_STORE == 'memory':
+        return MemoryStateStore(settings.BOT_STATE_TTL)
+    if settings.BOT_STATE_STORE == 'cache':
+        return CacheStateStore(settings.BOT_STATE_TTL, alias=settings.BOT_STATE_CACHE)
+    raise ValueError(f'Unknown BOT_STATE_STORE: {settings.BOT_STATE_STORE}')
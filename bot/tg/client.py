@@ -1,35 +1,127 @@
-from typing import Any
+import random
+import time
+from typing import Any, Callable
 
 import requests
 from pydantic import ValidationError
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 
 from bot.tg.schemas import GetUpdatesResponse, SendMessageResponse
 from todolist import settings
+from todolist.metrics import BOT_API_REQUESTS
+
+# Ответы, после которых запрос имеет смысл повторить
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Команды, повтор которых безопасен. Остальные (sendMessage) после таймаута чтения или 5xx
+# могли уже выполниться, поэтому повторяются только на 429 и если соединение не установилось
+IDEMPOTENT_COMMANDS = ('getUpdates', 'setWebhook', 'deleteWebhook')
 
 
 class TgClient:
-    def __init__(self, token: str or None = None) -> None:
+    """
+    Клиент Bot API поверх одной requests.Session: соединения из пула переиспользуются
+    между запросами (keep-alive), у каждого запроса есть таймауты.
+
+    На 429 клиент ждет `retry_after` из ответа целиком, даже если он больше `max_backoff`.
+    На 5xx и сетевые ошибки — экспоненциальная пауза со случайным разбросом (full jitter),
+    не больше `max_retries` повторов. Неидемпотентные команды (не из IDEMPOTENT_COMMANDS)
+    после 5xx и таймаута чтения не повторяются: Telegram мог их уже выполнить; повтор только
+    если соединение не установилось. Сетевая ошибка последней попытки пробрасывается.
+    """
+
+    def __init__(self, token: str or None = None, api_url: str or None = None,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
         self.__token = token if token else settings.BOT_TOKEN
+        self.__api_url = api_url if api_url else settings.BOT_API_URL
+        self.sleep = sleep
+        self.connect_timeout = settings.BOT_HTTP_CONNECT_TIMEOUT
+        self.read_timeout = settings.BOT_HTTP_READ_TIMEOUT
+        self.max_retries = settings.BOT_HTTP_MAX_RETRIES
+        self.backoff = settings.BOT_HTTP_BACKOFF
+        self.max_backoff = settings.BOT_HTTP_MAX_BACKOFF
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.BOT_HTTP_POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
     def get_updates(self, offset: int = 0, timeout: int = 60) -> GetUpdatesResponse:
-        data = self._get('getUpdates', offset=offset, timeout=timeout)
+        data = self._get('getUpdates', read_timeout=timeout + self.read_timeout, offset=offset, timeout=timeout)
         return GetUpdatesResponse(**data)
 
     def send_message(self, chat_id: int, text: str) -> SendMessageResponse:
         data = self._get('sendMessage', chat_id=chat_id, text=text)
         return SendMessageResponse(**data)
 
+    def set_webhook(self, url: str, secret_token: str) -> dict:
+        return self._get('setWebhook', url=url, secret_token=secret_token)
+
+    def delete_webhook(self) -> dict:
+        return self._get('deleteWebhook')
+
+    def close(self) -> None:
+        self.session.close()
+
     def __get_url(self, method: str) -> str:
-        return f"https://api.telegram.org/bot{self.__token}/{method}"
+        return f"{self.__api_url}/bot{self.__token}/{method}"
 
-    def _get(self, command: str, **params: Any) -> dict:
+    def _get(self, command: str, read_timeout: float or None = None, **params: Any) -> dict:
         url = self.__get_url(command)
-        response = requests.get(url, params=params)
+        timeout = (self.connect_timeout, read_timeout or self.read_timeout)
+        idempotent = command in IDEMPOTENT_COMMANDS
+        attempt = 0
+        while True:
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                BOT_API_REQUESTS.labels(command, 'error').inc()
+                if attempt >= self.max_retries or not (idempotent or _not_sent(error)):
+                    raise
+            else:
+                BOT_API_REQUESTS.labels(command, str(response.status_code)).inc()
+                if response or response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    break
+                if response.status_code == 429:
+                    delay = self._retry_after(response)
+                    if delay is not None:
+                        # раньше retry_after Telegram снова ответит 429 и продлит ограничение
+                        attempt += 1
+                        self.sleep(delay)
+                        continue
+                elif not idempotent:
+                    break
+            self.sleep(self.backoff_delay(attempt))
+            attempt += 1
+
         if not response:
             print(f'Invalid status code from telegram {response.status_code} on command {command}')
             return {'ok': False, 'result': []}
         return response.json()
 
+    def backoff_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> float or None:
+        """Пауза из parameters.retry_after (Bot API) или заголовка Retry-After"""
+        try:
+            return float(response.json()['parameters']['retry_after'])
+        except (ValueError, KeyError, TypeError):
+            pass
+        try:
+            return float(response.headers['Retry-After'])
+        except (KeyError, ValueError):
+            return None
+
+
+def _not_sent(error: requests.RequestException) -> bool:
+    """Соединение не установилось, и сервер запрос не получил"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
 
 def _serialize_response(serializer_class, data):
     try:
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import requests
+from django.db import close_old_connections
+
+from bot.tg.client import TgClient
+from bot.tg.schemas import Message, UpdateObj
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDispatcher:
+    """
+    Раздает сообщения по чатам.
+
+    У каждого чата своя очередь и свой воркер, поэтому сообщения одного чата
+    обрабатываются строго по порядку, а разные чаты — параллельно. Обработчик синхронный
+    (ORM, запросы к Telegram) и выполняется в пуле потоков; число одновременно работающих
+    обработчиков ограничено `concurrency`. Воркер чата завершается, когда его очередь пуста.
+    """
+
+    def __init__(self, handler: Callable[[Message], None], concurrency: int = 8) -> None:
+        self.handler = handler
+        self.concurrency = concurrency
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='bot-handler')
+        self.queues: dict[int, asyncio.Queue] = {}
+        self.workers: dict[int, asyncio.Task] = {}
+        self.pending = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._changed: Optional[asyncio.Condition] = None
+
+    def dispatch(self, message: Message) -> None:
+        """Ставит сообщение в очередь его чата; вызывается из event loop"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._changed = asyncio.Condition()
+        chat_id = message.chat.id
+        queue = self.queues.get(chat_id)
+        if queue is None:
+            queue = self.queues[chat_id] = asyncio.Queue()
+            self.workers[chat_id] = asyncio.create_task(self._worker(chat_id, queue))
+        queue.put_nowait(message)
+        self.pending += 1
+
+    async def wait_for_capacity(self, limit: int) -> None:
+        """Ждет, пока в обработке останется меньше `limit` сообщений"""
+        if self._changed is None:
+            return
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.pending < limit)
+
+    async def join(self) -> None:
+        while self.workers:
+            await asyncio.gather(*self.workers.values())
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+    async def _worker(self, chat_id: int, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while not queue.empty():
+                message = queue.get_nowait()
+                async with self._semaphore:
+                    try:
+                        await loop.run_in_executor(self.executor, self._handle, message)
+                    except Exception:
+                        logger.exception('Failed to handle message from chat %s', chat_id)
+                self.pending -= 1
+                async with self._changed:
+                    self._changed.notify_all()
+        finally:
+            del self.queues[chat_id]
+            del self.workers[chat_id]
+
+    def _handle(self, message: Message) -> None:
+        close_old_connections()
+        try:
+            self.handler(message)
+        finally:
+            close_old_connections()
+
+
+class UpdatePoller:
+    """
+    getUpdates со сдвигом offset, который переживает сбои сети.
+
+    Когда TgClient исчерпал повторы, ошибка логируется, а следующий опрос идет после паузы,
+    растущей с числом сбоев подряд (не больше max_backoff клиента): бот ждет конца сбоя, а не завершается.
+    """
+
+    def __init__(self, tg_client: TgClient, timeout: int = 60,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        self.tg_client = tg_client
+        self.timeout = timeout
+        self.sleep = sleep
+        self.offset = 0
+        self.failures = 0
+
+    def poll(self) -> list[UpdateObj]:
+        try:
+            response = self.tg_client.get_updates(offset=self.offset, timeout=self.timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            self.failures += 1
+            delay = self.tg_client.backoff_delay(self.failures)
+            logger.warning('getUpdates failed %s times in a row, retrying in %.1fs', self.failures, delay,
+                           exc_info=True)
+            self.sleep(delay)
+            return []
+        self.failures = 0
+        if response.result:
+            self.offset = response.result[-1].update_id + 1
+        return response.result
+
+
+class PollingRunner:
+    """
+    Long-polling getUpdates в отдельном потоке и передача сообщений в UpdateDispatcher.
+
+    Пока в обработке `max_pending` сообщений и больше, новые апдейты не запрашиваются.
+    """
+
+    def __init__(self, tg_client: TgClient, dispatcher: UpdateDispatcher, poll_timeout: int = 60,
+                 max_pending: int = 1000) -> None:
+        self.tg_client = tg_client
+        self.dispatcher = dispatcher
+        self.poll_timeout = poll_timeout
+        self.max_pending = max_pending
+        self.poll_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bot-poll')
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        loop = asyncio.get_running_loop()
+        poller = UpdatePoller(self.tg_client, timeout=self.poll_timeout)
+        try:
+            while stop is None or not stop.is_set():
+                await self.dispatcher.wait_for_capacity(self.max_pending)
+                for item in await loop.run_in_executor(self.poll_executor, poller.poll):
+                    if item.message:
+                        self.dispatcher.dispatch(item.message)
+            await self.dispatcher.join()
+        finally:
+            self.poll_executor.shutdown(wait=False)
@@ -0,0 +1,151 @@
+"""
+Исходящие сообщения бота: склейка и ограничение частоты.
+
+Обработчик кладет сообщения в очередь чата через `send`, а `flush` отправляет их,
+склеивая подряд идущие сообщения одного чата в одно, пока влезает в лимит Telegram
+(4096 символов). Перед каждым запросом берется токен из ведра чата и из общего ведра,
+поэтому бот не упирается во flood-лимиты Telegram (~1 сообщение в секунду в чат,
+~30 в секунду всего).
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import requests
+
+from bot.tg.client import TgClient
+from todolist import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096
+
+
+class TokenBucket:
+    """
+    Ведро токенов: `rate` токенов в секунду, не больше `capacity` про запас.
+
+    `reserve` всегда забирает токен и возвращает, сколько нужно подождать, пока он появится.
+    Токены могут уйти в минус — так конкурирующие потоки встают в очередь, а не обгоняют друг друга.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+def coalesce(texts: list[str], limit: int = MAX_MESSAGE_LENGTH) -> list[str]:
+    """Склеивает тексты через перевод строки в сообщения не длиннее `limit`; длинные тексты режет"""
+    chunks, current = [], ''
+    for text in texts:
+        for start in range(0, len(text), limit):
+            piece = text[start:start + limit]
+            if current and len(current) + 1 + len(piece) <= limit:
+                current += '\n' + piece
+            else:
+                if current:
+                    chunks.append(current)
+                current = piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class OutboxSender:
+    """
+    Очередь исходящих сообщений по чатам.
+
+    Сообщения одного чата должны отправляться из одного потока (так работает UpdateDispatcher),
+    разные чаты могут отправляться параллельно. Ожидание лимита блокирует только поток,
+    который отправляет сообщения этого чата.
+
+    Сообщение, отправка которого не удалась (TgClient не повторяет sendMessage после 5xx и
+    таймаута, чтобы не задвоить его), логируется и пропускается, остальные сообщения чата уходят.
+    """
+
+    def __init__(self, tg_client: TgClient, chat_rate: Optional[float] = None, chat_burst: Optional[float] = None,
+                 global_rate: Optional[float] = None, global_burst: Optional[float] = None,
+                 sleep: Callable[[float], None] = time.sleep, clock: Callable[[], float] = time.monotonic) -> None:
+        self.tg_client = tg_client
+        self.chat_rate = chat_rate or settings.BOT_CHAT_RATE
+        self.chat_burst = chat_burst or settings.BOT_CHAT_BURST
+        self.sleep = sleep
+        self.clock = clock
+        self.global_bucket = TokenBucket(global_rate or settings.BOT_GLOBAL_RATE,
+                                         global_burst or settings.BOT_GLOBAL_BURST, clock)
+        self.counters = {'queued': 0, 'sent': 0, 'throttled': 0, 'failed': 0}
+        self._outbox: dict[int, list[str]] = {}
+        self._buckets: OrderedDict[int, tuple[float, TokenBucket]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def send(self, chat_id: int, text: Optional[str]) -> None:
+        if not text:
+            return
+        with self._lock:
+            self._outbox.setdefault(chat_id, []).append(text)
+            self.counters['queued'] += 1
+
+    def flush(self, chat_id: int) -> None:
+        with self._lock:
+            texts = self._outbox.pop(chat_id, [])
+        for text in coalesce(texts):
+            self._wait(chat_id)
+            try:
+                # ValueError — ответ с ошибкой, который не разбирается в SendMessageResponse
+                self.tg_client.send_message(chat_id=chat_id, text=text)
+            except (requests.RequestException, ValueError):
+                logger.warning('Failed to send a message to chat %s', chat_id, exc_info=True)
+                with self._lock:
+                    self.counters['failed'] += 1
+                continue
+            with self._lock:
+                self.counters['sent'] += 1
+
+    def flush_all(self) -> None:
+        with self._lock:
+            chat_ids = list(self._outbox)
+        for chat_id in chat_ids:
+            self.flush(chat_id)
+
+    def _wait(self, chat_id: int) -> None:
+        delay = self._chat_bucket(chat_id).reserve()
+        if delay:
+            self.sleep(delay)
+        global_delay = self.global_bucket.reserve()
+        if global_delay:
+            self.sleep(global_delay)
+        if delay or global_delay:
+            with self._lock:
+                self.counters['throttled'] += 1
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        """
+        Ведро чата. Ведра хранятся в порядке последнего использования; ведро, которым не пользовались
+        дольше, чем нужно на полное пополнение, снова полное — его можно выбросить и создать заново.
+        """
+        now = self.clock()
+        idle = (self.chat_burst + 1) / self.chat_rate
+        with self._lock:
+            while self._buckets:
+                used, _ = next(iter(self._buckets.values()))
+                if now - used < idle:
+                    break
+                self._buckets.popitem(last=False)
+            item = self._buckets.pop(chat_id, None)
+            bucket = item[1] if item else TokenBucket(self.chat_rate, self.chat_burst, self.clock)
+            self._buckets[chat_id] = (now, bucket)
+        return bucket
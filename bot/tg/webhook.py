@@ -0,0 +1,200 @@
+"""
+Обработка апдейтов, пришедших через webhook.
+
+View записывает апдейт в WebhookUpdate (повтор update_id отсекает первичный ключ — во всех
+процессах), отвечает Telegram и ставит апдейт в WebhookWorker процесса. Воркер обрабатывает
+его в отдельном потоке с event loop и UpdateDispatcher — с тем же порядком сообщений в чате
+и тем же ограничением параллельности, что у `runbot --async`, — и отмечает строку обработанной.
+
+Строку, взятую процессом, который завершился, не обработав ее (перезапуск воркера gunicorn,
+падение), через BOT_WEBHOOK_CLAIM_TIMEOUT забирает другой процесс: воркер каждые
+BOT_WEBHOOK_SWEEP_INTERVAL секунд ищет такие строки. При плавной остановке (worker_exit в
+todolist/gunicorn.conf.py) воркер дообрабатывает начатое, а ждущие в очереди апдейты сразу
+отдает другим процессам.
+"""
+import asyncio
+import datetime
+import logging
+import threading
+import uuid
+from typing import Callable, NamedTuple, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from bot.models import WebhookUpdate
+from bot.tg.runtime import UpdateDispatcher
+from bot.tg.schemas import Chat, Message
+
+logger = logging.getLogger(__name__)
+
+
+class PendingUpdate(NamedTuple):
+    update_id: int
+    message: Message
+
+    @property
+    def chat(self) -> Chat:
+        # UpdateDispatcher раскладывает апдейты по chat.id
+        return self.message.chat
+
+
+def store_update(update_id: int, message: Message, claim: str) -> bool:
+    """Записывает апдейт, взятый процессом claim; False — такой update_id уже принят"""
+    try:
+        with transaction.atomic():
+            WebhookUpdate.objects.create(update_id=update_id, message=message.dict(), claim=claim,
+                                         claimed_at=timezone.now())
+    except IntegrityError:
+        return False
+    return True
+
+
+class WebhookWorker:
+    """
+    Ограниченная очередь апдейтов: одновременно принимается не больше `max_pending` сообщений,
+    остальные `submit` отклоняет, и Telegram повторит их позже.
+    """
+
+    def __init__(self, handler: Callable[[Message], None], concurrency: int, max_pending: int,
+                 claim_timeout: float = 60, sweep_interval: Optional[float] = None) -> None:
+        self.handler = handler
+        self.max_pending = max_pending
+        self.claim_timeout = claim_timeout
+        self.claim = uuid.uuid4().hex
+        self.pending = 0
+        self.closing = False
+        self.counters = {'accepted': 0, 'rejected': 0}
+        self.dispatcher = UpdateDispatcher(self._handle, concurrency=concurrency)
+        # Принятые апдейты, обработка которых еще не началась
+        self._queued: set[int] = set()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='bot-webhook', daemon=True)
+        self.thread.start()
+        if sweep_interval:
+            asyncio.run_coroutine_threadsafe(self._sweep_forever(sweep_interval), self.loop)
+
+    def submit(self, update_id: int, message: Message) -> bool:
+        with self._lock:
+            if self.closing or self.pending >= self.max_pending:
+                self.counters['rejected'] += 1
+                return False
+            self.pending += 1
+            self.counters['accepted'] += 1
+            self._queued.add(update_id)
+        self.loop.call_soon_threadsafe(self.dispatcher.dispatch, PendingUpdate(update_id, message))
+        return True
+
+    def sweep(self) -> int:
+        """Забирает апдейты, брошенные другими процессами, и удаляет старые обработанные; возвращает число взятых"""
+        now = timezone.now()
+        WebhookUpdate.objects.filter(
+            processed__lt=now - datetime.timedelta(seconds=settings.BOT_WEBHOOK_DEDUP_TTL)
+        ).delete()
+        free = self.max_pending - self.pending
+        if self.closing or free <= 0:
+            return 0
+
+        abandoned = Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - datetime.timedelta(seconds=self.claim_timeout))
+        rows = WebhookUpdate.objects.filter(abandoned, processed__isnull=True).order_by('update_id')
+        taken = 0
+        for update_id, claimed_at, message in rows.values_list('update_id', 'claimed_at', 'message')[:free]:
+            # Условие на прежний claimed_at: из нескольких процессов строку возьмет один
+            if not WebhookUpdate.objects.filter(pk=update_id, claimed_at=claimed_at, processed__isnull=True).update(
+                    claim=self.claim, claimed_at=now):
+                continue
+            if not self.submit(update_id, Message(**message)):
+                self._release([update_id])
+                break
+            taken += 1
+        return taken
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Ждет, пока все принятые сообщения будут обработаны"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self.pending == 0, timeout)
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """
+        Плавная остановка: новые апдейты не принимаются, принятые обрабатываются до timeout,
+        а те, чья обработка не началась, сразу может взять другой процесс
+        """
+        with self._lock:
+            self.closing = True
+        self.join(timeout)
+        with self._lock:
+            queued = list(self._queued)
+        if queued:
+            self._release(queued)
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self.dispatcher.join(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.dispatcher.close()
+
+    def _release(self, update_ids: list[int]) -> None:
+        WebhookUpdate.objects.filter(pk__in=update_ids, claim=self.claim, processed__isnull=True).update(
+            claimed_at=None)
+
+    def _handle(self, update: PendingUpdate) -> None:
+        try:
+            with self._lock:
+                self._queued.discard(update.update_id)
+            # Продление захвата; если строку уже забрал другой процесс, второй раз апдейт не обрабатывается
+            if WebhookUpdate.objects.filter(pk=update.update_id, claim=self.claim, processed__isnull=True).update(
+                    claimed_at=timezone.now()):
+                try:
+                    self.handler(update.message)
+                finally:
+                    WebhookUpdate.objects.filter(pk=update.update_id).update(processed=timezone.now())
+        finally:
+            with self._idle:
+                self.pending -= 1
+                self._idle.notify_all()
+
+    async def _sweep_forever(self, interval: float) -> None:
+        loop = asyncio.get_running_loop()
+        while not self.closing:
+            try:
+                await loop.run_in_executor(self.dispatcher.executor, self._sweep_in_thread)
+            except Exception:
+                logger.exception('Failed to pick up abandoned webhook updates')
+            await asyncio.sleep(interval)
+
+    def _sweep_in_thread(self) -> None:
+        close_old_connections()
+        try:
+            self.sweep()
+        finally:
+            close_old_connections()
+
+
+_worker: Optional[WebhookWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_webhook_worker() -> WebhookWorker:
+    """Воркер процесса; создается при первом апдейте"""
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                from bot.management.commands.runbot import Command
+
+                _worker = WebhookWorker(Command().handle_message, concurrency=settings.BOT_CONCURRENCY,
+                                        max_pending=settings.BOT_WEBHOOK_MAX_PENDING,
+                                        claim_timeout=settings.BOT_WEBHOOK_CLAIM_TIMEOUT,
+                                        sweep_interval=settings.BOT_WEBHOOK_SWEEP_INTERVAL)
+    return _worker
+
+
+def shutdown_webhook_worker(timeout: Optional[float] = None) -> None:
+    """Плавно останавливает воркер процесса, если он был создан"""
+    if _worker is not None:
+        _worker.shutdown(timeout)
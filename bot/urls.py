@@ -1,7 +1,8 @@
 from django.urls import path
 
-from bot.views import VerificationCodeView
+from bot.views import VerificationCodeView, webhook_view
 
 urlpatterns = [
     path("verify", VerificationCodeView.as_view(), name='verify_bot'),
+    path("webhook", webhook_view, name='bot_webhook'),
 ]
@@ -1,12 +1,21 @@
+import json
 from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, HttpResponseNotAllowed, JsonResponse
+from django.utils.crypto import constant_time_compare
+from pydantic import ValidationError
 from rest_framework.generics import GenericAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
 
-from bot.models import TgUser
+from bot.models import TgUser, WebhookUpdate
 from bot.serializers import TgUserSerializer
 from bot.tg.client import TgClient
+from bot.tg.schemas import UpdateObj
+from bot.tg.webhook import get_webhook_worker, store_update
 
 
 class VerificationCodeView(GenericAPIView):
@@ -20,3 +29,42 @@ class VerificationCodeView(GenericAPIView):
         TgClient().send_message(tg_user.chat_id, 'You have been successfully verified')
 
         return Response(serializer.data)
+
+
+async def webhook_view(request: HttpRequest) -> HttpResponse:
+    """
+    Прием апдейтов от Telegram (setWebhook с secret_token = BOT_WEBHOOK_SECRET).
+
+    Апдейт записывается в БД и подтверждается, а обрабатывается в фоне (bot.tg.webhook).
+    Повторы одного update_id (Telegram повторяет запрос, если не дождался ответа)
+    отбрасываются. Если очередь обработки заполнена, отвечаем 503 — Telegram пришлет апдейт еще раз.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    secret = settings.BOT_WEBHOOK_SECRET
+    if not secret:
+        return JsonResponse({'ok': False, 'description': 'Webhook is disabled'}, status=404)
+    if not constant_time_compare(request.headers.get('X-Telegram-Bot-Api-Secret-Token', ''), secret):
+        return JsonResponse({'ok': False, 'description': 'Forbidden'}, status=403)
+
+    try:
+        update = UpdateObj(**json.loads(request.body))
+    except (ValueError, TypeError, ValidationError):
+        return JsonResponse({'ok': False, 'description': 'Invalid update'}, status=400)
+
+    if not update.message:
+        return JsonResponse({'ok': True})
+    worker = get_webhook_worker()
+    if not await sync_to_async(store_update)(update.update_id, update.message, worker.claim):
+        return JsonResponse({'ok': True, 'duplicate': True})
+
+    if not worker.submit(update.update_id, update.message):
+        await WebhookUpdate.objects.filter(pk=update.update_id).adelete()
+        response = JsonResponse({'ok': False, 'description': 'Too many pending updates'}, status=503)
+        response['Retry-After'] = '1'
+        return response
+    return JsonResponse({'ok': True})
+
+
+# csrf_exempt и require_POST в Django 4.1 не поддерживают async-view
+webhook_view.csrf_exempt = True
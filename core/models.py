@@ -1,5 +1,8 @@
 from django.contrib.auth.models import AbstractUser
+from django.db import models
 
 
 class User(AbstractUser):
-    pass
+    # пользователь вложен в строки списков целей, категорий и комментариев: ETag списка
+    # учитывает max(updated) авторов (goals.conditional)
+    updated = models.DateTimeField(verbose_name="Дата последнего обновления", auto_now=True)
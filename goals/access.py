@@ -0,0 +1,125 @@
+import uuid
+from typing import Optional, Union
+
+from django.conf import settings
+from django.core.cache import BaseCache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import HttpRequest
+from rest_framework.request import Request
+
+from goals.models import BoardParticipant
+from todolist.cache import shared_cache
+
+WRITE_ROLES = (BoardParticipant.Role.owner, BoardParticipant.Role.writer)
+
+
+def _cache() -> Optional[BaseCache]:
+    return shared_cache(settings.BOARD_ROLES_CACHE)
+
+
+def _version_key(user_id: int) -> str:
+    return f'board-roles:version:{user_id}'
+
+
+def _roles_key(user_id: int, version: str) -> str:
+    return f'board-roles:{user_id}:{version}'
+
+
+def _current_version(cache: BaseCache, user_id: int) -> str:
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), uuid.uuid4().hex, timeout=None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def _query_board_roles(user_id: int) -> dict[int, int]:
+    # Из основной базы и в запросах, читающих из реплики: роли отстающей реплики дали бы
+    # доступ исключенному участнику и попали бы в кэш под уже новой версией
+    participants = BoardParticipant.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id)
+    return dict(participants.values_list('board_id', 'role'))
+
+
+def load_board_roles(user_id: int) -> dict[int, int]:
+    """
+    Роли пользователя {board_id: role} из кэша, при промахе — из БД.
+
+    Версия читается до запроса в БД, а запись кладется под этой версией. Если участников
+    изменили, пока запрос шел, версия уже другая и устаревшая запись никогда не будет прочитана.
+    """
+    cache = _cache()
+    if cache is None:
+        return _query_board_roles(user_id)
+    key = _roles_key(user_id, _current_version(cache, user_id))
+    roles = cache.get(key)
+    if roles is None:
+        roles = _query_board_roles(user_id)
+        cache.set(key, roles, settings.BOARD_ROLES_CACHE_TIMEOUT)
+    return roles
+
+
+def invalidate_board_roles(*user_ids: int) -> None:
+    """Сбрасывает кэш ролей сразу и еще раз после коммита текущей транзакции"""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+
+    cache = _cache()
+    if cache is None:
+        return
+
+    def bump_versions() -> None:
+        cache.set_many({_version_key(user_id): uuid.uuid4().hex for user_id in user_ids}, timeout=None)
+
+    bump_versions()
+    transaction.on_commit(bump_versions)
+
+
+class BoardRoles:
+    """
+    Роли пользователя на досках в виде словаря {board_id: role}.
+
+    Словарь загружается при первом обращении (из кэша или одним запросом в БД)
+    и дальше используется разрешениями, сериализаторами и queryset'ами в рамках одного запроса.
+    """
+
+    def __init__(self, user) -> None:
+        self.user = user
+        self._roles: Optional[dict[int, int]] = None
+
+    @property
+    def roles(self) -> dict[int, int]:
+        if self._roles is None:
+            self._roles = self.load()
+        return self._roles
+
+    def load(self) -> dict[int, int]:
+        if not self.user.is_authenticated:
+            return {}
+        return load_board_roles(self.user.id)
+
+    @property
+    def board_ids(self) -> list[int]:
+        return list(self.roles)
+
+    def role(self, board_id: int) -> Optional[int]:
+        return self.roles.get(board_id)
+
+    def can_read(self, board_id: int) -> bool:
+        return board_id in self.roles
+
+    def can_write(self, board_id: int) -> bool:
+        return self.roles.get(board_id) in WRITE_ROLES
+
+    def is_owner(self, board_id: int) -> bool:
+        return self.roles.get(board_id) == BoardParticipant.Role.owner
+
+
+def get_board_roles(request: Union[Request, HttpRequest]) -> BoardRoles:
+    """Возвращает BoardRoles текущего запроса, создавая его при первом вызове"""
+    http_request = getattr(request, '_request', request)
+    board_roles: Optional[BoardRoles] = getattr(http_request, '_board_roles', None)
+    if board_roles is None or board_roles.user != request.user:
+        board_roles = BoardRoles(request.user)
+        http_request._board_roles = board_roles
+    return board_roles
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from goals.models import GoalCategory, Goal, GoalComment, Board, BoardParticipant
+from goals.models import ArchiveJob, GoalCategory, Goal, GoalComment, Board, BoardParticipant
 
 
 class ParticipantsInline(admin.TabularInline):
@@ -47,3 +47,10 @@ class Goal(admin.ModelAdmin):
 @admin.register(GoalComment)
 class GoalComment(admin.ModelAdmin):
     list_display = ("id", "user", "goal")
+
+
+@admin.register(ArchiveJob)
+class ArchiveJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "board", "category", "status", "processed", "total", "created", "updated")
+    list_filter = ["status"]
+    readonly_fields = ("board", "category", "status", "processed", "total", "created", "updated")
@@ -0,0 +1,76 @@
+"""
+Фоновая архивация после удаления доски или категории.
+
+Удаление только помечает доску или категорию и создает ArchiveJob, API и бот сразу скрывают
+все, что под ней (GoalQuerySet.visible). Цели архивируются пачками по GOALS_ARCHIVE_BATCH_SIZE,
+каждая пачка в своей короткой транзакции, чтобы не держать блокировки на тысячах строк.
+Задачи выполняет команда archive_worker.
+"""
+import datetime
+import time
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from goals.models import ArchiveJob, Goal, GoalCategory
+
+
+def claim_job(stale_after: float = 300) -> Optional[ArchiveJob]:
+    """
+    Берет самую старую ожидающую задачу и помечает ее выполняющейся.
+
+    Задача, которая выполняется дольше stale_after секунд без прогресса (воркер упал),
+    берется повторно: архивация идемпотентна.
+    """
+    stale = timezone.now() - datetime.timedelta(seconds=stale_after)
+    with transaction.atomic():
+        job = ArchiveJob.objects.select_for_update(skip_locked=True).filter(
+            Q(status=ArchiveJob.Status.pending) | Q(status=ArchiveJob.Status.running, updated__lt=stale)
+        ).order_by('created').first()
+        if job is None:
+            return None
+        job.status = ArchiveJob.Status.running
+        job.save(update_fields=['status', 'updated'])
+    return job
+
+
+def _pending_goals(job: ArchiveJob) -> QuerySet:
+    goals = Goal.objects.exclude(status=Goal.Status.archived)
+    if job.category_id:
+        return goals.filter(category_id=job.category_id)
+    return goals.filter(category__board_id=job.board_id)
+
+
+def run_job(job: ArchiveJob, batch_size: Optional[int] = None,
+            progress: Optional[Callable[[ArchiveJob], None]] = None, pause: float = 0) -> ArchiveJob:
+    """Архивирует цели задачи пачками, затем помечает удаленными категории доски"""
+    batch_size = batch_size or settings.GOALS_ARCHIVE_BATCH_SIZE
+    if job.total is None:
+        job.total = _pending_goals(job).count()
+        job.save(update_fields=['total', 'updated'])
+
+    while True:
+        with transaction.atomic():
+            goal_ids = list(_pending_goals(job).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not goal_ids:
+                break
+            job.processed += Goal.objects.filter(pk__in=goal_ids).update_and_notify(status=Goal.Status.archived)
+            job.save(update_fields=['processed', 'updated'])
+        if progress:
+            progress(job)
+        if pause:
+            time.sleep(pause)
+
+    if job.board_id:
+        categories = GoalCategory.objects.filter(board_id=job.board_id, is_deleted=False)
+        while category_ids := list(categories.values_list('pk', flat=True)[:batch_size]):
+            GoalCategory.objects.filter(pk__in=category_ids).update(is_deleted=True, updated=timezone.now())
+
+    job.status = ArchiveJob.Status.done
+    job.save(update_fields=['status', 'updated'])
+    if progress:
+        progress(job)
+    return job
@@ -0,0 +1,152 @@
+"""
+Условные запросы (ETag, Last-Modified) для досок, категорий, целей и комментариев.
+
+Валидаторы считаются из `updated` без сериализации: для объекта — из его pk и updated,
+для списка — из адреса запроса, ролей пользователя на досках, числа строк и max(updated)
+строк и вложенных в них объектов (автора).
+If-None-Match и If-Modified-Since на GET дают 304. If-Match на PUT/PATCH/DELETE дает 412,
+если объект изменился; проверка и запись идут в одной транзакции под блокировкой строки.
+
+Last-Modified отдается только там, где он растет при любом изменении ответа, — у объектов.
+У списка max(updated) оставшихся строк не растет, когда строка уходит из списка (архивация,
+удаление), и If-Modified-Since дал бы 304 на измененный список; у списков есть только ETag.
+"""
+import datetime
+import hashlib
+import json
+from typing import NamedTuple, Optional
+
+from django.db import transaction
+from django.db.models import Count, Max, Model
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import permissions, status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from goals.access import get_board_roles
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The resource has been modified.'
+    default_code = 'precondition_failed'
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: Optional[datetime.datetime]
+
+
+def make_etag(*parts) -> str:
+    """Сильный ETag из частей состояния ресурса"""
+    return '"%s"' % hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def set_validators(response: HttpResponse, validators: Validators) -> HttpResponse:
+    response['ETag'] = validators.etag
+    if validators.last_modified:
+        response['Last-Modified'] = http_date(validators.last_modified.timestamp())
+    return response
+
+
+def conditional_response(request, validators: Validators) -> Optional[HttpResponse]:
+    """304 для GET, если клиентская копия актуальна; PreconditionFailed, если не выполнено If-Match"""
+    last_modified = validators.last_modified and int(validators.last_modified.timestamp())
+    headers = set_validators(HttpResponse(), validators)
+    response = get_conditional_response(request, etag=validators.etag, last_modified=last_modified, response=headers)
+    if response is headers:
+        return None
+    if response.status_code == status.HTTP_412_PRECONDITION_FAILED:
+        raise PreconditionFailed
+    return response
+
+
+def _lookup(instance: Model, path: str):
+    """Значение по пути в стиле ORM ('user__updated') у загруженного объекта"""
+    value = instance
+    for name in path.split('__'):
+        value = getattr(value, name)
+    return value
+
+
+class ConditionalObjectMixin:
+    """
+    ETag и Last-Modified для RetrieveUpdateDestroyAPIView.
+
+    GET отвечает 304 без сериализации, изменение с устаревшим If-Match — 412.
+    """
+
+    # updated вложенных объектов из ответа (например, 'user__updated'): их изменения не трогают updated строки
+    nested_updated: tuple[str, ...] = ()
+
+    def object_validators(self, instance: Model) -> Validators:
+        stamps = [instance.updated] + [_lookup(instance, path) for path in self.nested_updated]
+        etag = make_etag(instance._meta.label, instance.pk, *(stamp.isoformat() for stamp in stamps))
+        return Validators(etag, max(stamps))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in permissions.SAFE_METHODS:
+            # If-Match проверяется по заблокированной строке, иначе проверка и запись могут разойтись
+            queryset = queryset.select_for_update(of=('self',))
+        return queryset
+
+    def get_object(self):
+        instance = super().get_object()
+        if self.request.method not in permissions.SAFE_METHODS:
+            conditional_response(self.request, self.object_validators(instance))
+        return instance
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        validators = self.object_validators(instance)
+        response = conditional_response(request, validators) or Response(self.get_serializer(instance).data)
+        return set_validators(response, validators)
+
+    def perform_update(self, serializer) -> None:
+        super().perform_update(serializer)
+        self.updated_instance = serializer.instance
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            response = super().update(request, *args, **kwargs)
+        return set_validators(response, self.object_validators(self.updated_instance))
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
+
+
+class ConditionalListMixin:
+    """
+    ETag для списков.
+
+    Страница с offset: ETag из числа строк и max(updated) всего списка, 304 без пагинации
+    и сериализации (число строк нужно и пагинатору), плюс max(updated) вложенных объектов
+    из `nested_updated`. Keyset-страница (`cursor`) не агрегирует весь список, иначе ее
+    стоимость снова росла бы с его размером: ETag считается из готовой страницы, и 304
+    экономит только передачу.
+    """
+    # как у ConditionalObjectMixin; в агрегате — max по всему списку
+    nested_updated: tuple[str, ...] = ()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        # роли, а не только id досок: смена роли при том же наборе досок тоже меняет ETag
+        scope = (queryset.model._meta.label, request.user.pk, request.get_full_path(),
+                 sorted(get_board_roles(request).roles.items()))
+
+        if getattr(self.paginator, 'cursor_query_param', None) in request.query_params:
+            response = super().list(request, *args, **kwargs)
+            validators = Validators(make_etag(*scope, json.dumps(response.data, sort_keys=True, default=str)), None)
+            return set_validators(conditional_response(request, validators) or response, validators)
+
+        nested = {f'nested_{i}': Max(lookup) for i, lookup in enumerate(self.nested_updated)}
+        state = queryset.order_by().aggregate(last_modified=Max('updated'), count=Count('pk'), **nested)
+        # пагинатор возьмет это число вместо своего COUNT
+        self.list_count = state['count']
+        validators = Validators(make_etag(*scope, *state.values()), None)
+        response = conditional_response(request, validators) or super().list(request, *args, **kwargs)
+        return set_validators(response, validators)
@@ -0,0 +1,260 @@
+"""
+Быстрое заполнение БД синтетическими данными (команда generate_data).
+
+Пользователи, доски, участники, категории, цели, их счетчики GoalCounter и комментарии
+пишутся пачками: в PostgreSQL через COPY, в других БД через bulk_create. Первичные ключи
+назначаются заранее с max(id) + 1, поэтому дочерние строки ссылаются на родителей без
+чтения из БД, а последовательности сдвигаются в конце. Генерацию не стоит запускать
+параллельно с другой записью в те же таблицы.
+
+Каждая пачка — отдельная транзакция: родители в ней пишутся раньше детей. Сигналы
+не отправляются: все строки новые, и кэшей, которые надо сбросить, у них нет.
+"""
+import datetime
+import io
+import itertools
+import random
+from bisect import bisect
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from core.models import User
+from goals.models import Board, BoardParticipant, Goal, GoalCategory, GoalComment, GoalCounter
+
+# Порядок записи: родители раньше детей
+MODELS = (User, Board, BoardParticipant, GoalCategory, Goal, GoalCounter, GoalComment)
+
+WORDS = (
+    'купить', 'молоко', 'прочитать', 'книгу', 'выучить', 'английский', 'бегать', 'утром', 'отчет', 'квартал',
+    'позвонить', 'ремонт', 'отпуск', 'билеты', 'проект', 'buy', 'read', 'learn', 'python', 'report',
+    'release', 'deploy', 'review', 'meeting', 'budget', 'travel', 'garden', 'homework', 'invoice', 'backup',
+)
+YEAR = 365 * 24 * 60 * 60
+
+
+@dataclass(frozen=True)
+class IntRange:
+    """Число из отрезка [low, high], равномерно"""
+    low: int
+    high: int
+
+    @classmethod
+    def parse(cls, value: str) -> 'IntRange':
+        """'10' или '0-100'"""
+        low, _, high = value.partition('-')
+        try:
+            result = cls(int(low), int(high or low))
+        except ValueError:
+            raise ValueError(f'Expected N or MIN-MAX, got {value!r}')
+        if result.low < 0 or result.low > result.high:
+            raise ValueError(f'Expected 0 <= MIN <= MAX, got {value!r}')
+        return result
+
+    def sample(self, rng: random.Random) -> int:
+        return rng.randint(self.low, self.high)
+
+
+class Mix:
+    """Случайный выбор значения с весами, например статусов целей"""
+
+    def __init__(self, weights: dict[int, float]) -> None:
+        self.values = list(weights)
+        self.cum_weights = list(itertools.accumulate(weights.values()))
+
+    @classmethod
+    def parse(cls, value: str, choices: type[models.IntegerChoices]) -> 'Mix':
+        """'to_do=50,done=30,archived=20' — имена из choices и веса"""
+        weights = {}
+        for item in value.split(','):
+            name, _, weight = item.partition('=')
+            if name.strip() not in choices.names:
+                raise ValueError(f'Unknown {choices.__name__} {name.strip()!r}, expected one of: '
+                                 f'{", ".join(choices.names)}')
+            try:
+                weights[choices[name.strip()].value] = float(weight)
+            except ValueError:
+                raise ValueError(f'Expected NAME=WEIGHT, got {item!r}')
+        if not weights or min(weights.values()) < 0 or sum(weights.values()) <= 0:
+            raise ValueError(f'Expected positive weights, got {value!r}')
+        return cls(weights)
+
+    def sample(self, rng: random.Random) -> int:
+        return self.values[bisect(self.cum_weights, rng.random() * self.cum_weights[-1])]
+
+
+@dataclass
+class DataSpec:
+    users: int
+    boards: int
+    # на доску, на доску, на категорию, на цель
+    participants: IntRange
+    categories: IntRange
+    goals: IntRange
+    comments: IntRange
+    statuses: Mix
+    # хэш make_password, один на всех пользователей
+    password_hash: str
+    roles: Mix = field(default_factory=lambda: Mix({BoardParticipant.Role.owner: 1, BoardParticipant.Role.writer: 3,
+                                                    BoardParticipant.Role.reader: 6}))
+    # доля целей со сроком выполнения
+    due_dates: float = 0.5
+    # существующий пользователь, который становится владельцем всех досок
+    owner_id: Optional[int] = None
+    prefix: str = 'gen'
+    seed: int = 0
+
+
+class BulkCreateWriter:
+    def write(self, model: type[models.Model], rows: list[dict]) -> None:
+        model._base_manager.bulk_create([model(**row) for row in rows])
+
+
+class CopyWriter:
+    """COPY ... FROM STDIN в текстовом формате PostgreSQL"""
+
+    def write(self, model: type[models.Model], rows: list[dict]) -> None:
+        attnames = list(rows[0])
+        columns = ', '.join(connection.ops.quote_name(model._meta.get_field(name).column) for name in attnames)
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(self.format(row[name]) for name in attnames))
+            buffer.write('\n')
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN',
+                               buffer)
+
+    @staticmethod
+    def format(value) -> str:
+        if type(value) is int:
+            return str(value)
+        if value is None:
+            return r'\N'
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            return value.isoformat()
+        return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def get_writer(method: str = 'auto'):
+    """'copy' (только PostgreSQL), 'bulk' или 'auto' — COPY, если БД его поддерживает"""
+    if method == 'auto':
+        method = 'copy' if connection.vendor == 'postgresql' else 'bulk'
+    if method == 'copy' and connection.vendor != 'postgresql':
+        raise ValueError('COPY is only supported on PostgreSQL')
+    return CopyWriter() if method == 'copy' else BulkCreateWriter()
+
+
+class _Buffers:
+    """Строки по моделям; при заполнении любой пачки записываются все в порядке MODELS"""
+
+    def __init__(self, writer, batch_size: int, progress: Optional[Callable[[Counter], None]]) -> None:
+        self.writer = writer
+        self.batch_size = batch_size
+        self.progress = progress
+        self.rows: dict[type[models.Model], list[dict]] = {model: [] for model in MODELS}
+        self.defaults = {
+            model: {f.attname: f.get_default() for f in model._meta.concrete_fields} for model in MODELS
+        }
+        self.written = Counter()
+
+    def add(self, model: type[models.Model], **row) -> None:
+        self.rows[model].append({**self.defaults[model], **row})
+        if len(self.rows[model]) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        with transaction.atomic():
+            for model, rows in self.rows.items():
+                if rows:
+                    self.writer.write(model, rows)
+                    self.written[model._meta.label] += len(rows)
+                    rows.clear()
+        if self.progress:
+            self.progress(self.written)
+
+
+def _next_ids(model: type[models.Model]) -> Iterable[int]:
+    return itertools.count((model._base_manager.aggregate(max_id=models.Max('pk'))['max_id'] or 0) + 1)
+
+
+def generate(spec: DataSpec, writer=None, batch_size: int = 10000,
+             progress: Optional[Callable[[Counter], None]] = None) -> Counter:
+    """Создает данные по spec; возвращает число строк по моделям"""
+    writer = writer or get_writer()
+    rng = random.Random(spec.seed)
+    now = timezone.now()
+    ids = {model: _next_ids(model) for model in MODELS}
+    buffers = _Buffers(writer, batch_size, progress)
+
+    def dates() -> dict:
+        created = now - datetime.timedelta(seconds=rng.randrange(YEAR))
+        return {'created': created, 'updated': created + (now - created) * rng.random()}
+
+    def text(words: int) -> str:
+        return ' '.join(rng.choices(WORDS, k=words))
+
+    first_user_id = next(ids[User])
+    user_ids = range(first_user_id, first_user_id + spec.users)
+
+    try:
+        for user_id in user_ids:
+            joined = now - datetime.timedelta(seconds=rng.randrange(YEAR))
+            # COPY пишет поля как есть, auto_now у User.updated не срабатывает
+            buffers.add(User, id=user_id, username=f'{spec.prefix}-{user_id}', password=spec.password_hash,
+                        email=f'{spec.prefix}-{user_id}@example.com', date_joined=joined, updated=joined)
+
+        for number in range(spec.boards):
+            board_id = next(ids[Board])
+            buffers.add(Board, id=board_id, title=f'{spec.prefix} {number}', **dates())
+
+            members = []
+            if spec.owner_id is not None:
+                members.append((spec.owner_id, BoardParticipant.Role.owner))
+            count = min(len(user_ids), max(spec.participants.sample(rng) - len(members), 0))
+            for user_id in rng.sample(user_ids, count):
+                # у доски всегда есть владелец
+                role = spec.roles.sample(rng) if members else BoardParticipant.Role.owner
+                members.append((user_id, role))
+            for user_id, role in members:
+                buffers.add(BoardParticipant, id=next(ids[BoardParticipant]), board_id=board_id, user_id=user_id,
+                            role=role, **dates())
+            if not members:
+                continue
+            authors = [user_id for user_id, role in members if role != BoardParticipant.Role.reader]
+
+            for _ in range(spec.categories.sample(rng)):
+                category_id = next(ids[GoalCategory])
+                buffers.add(GoalCategory, id=category_id, board_id=board_id, user_id=authors[0],
+                            title=text(2), **dates())
+                counters = Counter()
+                for _ in range(spec.goals.sample(rng)):
+                    goal_id = next(ids[Goal])
+                    goal = {
+                        'status': spec.statuses.sample(rng),
+                        'priority': rng.randint(Goal.Priority.low, Goal.Priority.critical),
+                        'due_date': (now + datetime.timedelta(days=rng.randint(-60, 60))).date()
+                        if rng.random() < spec.due_dates else None,
+                    }
+                    buffers.add(Goal, id=goal_id, category_id=category_id, user_id=rng.choice(authors),
+                                title=text(3), description=text(rng.randint(0, 12)) or None, **goal, **dates())
+                    counters[(goal['status'], goal['priority'], goal['due_date'])] += 1
+                    for _ in range(spec.comments.sample(rng)):
+                        buffers.add(GoalComment, id=next(ids[GoalComment]), goal_id=goal_id,
+                                    user_id=rng.choice(members)[0], text=text(rng.randint(1, 20)), **dates())
+                # категория новая: ее счетчики известны целиком
+                for (status, priority, due_date), count in counters.items():
+                    buffers.add(GoalCounter, id=next(ids[GoalCounter]), category_id=category_id, status=status,
+                                priority=priority, due_date=due_date, count=count)
+        buffers.flush()
+    finally:
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), MODELS):
+                cursor.execute(sql)
+    return buffers.written
@@ -0,0 +1,200 @@
+"""
+События изменений на досках для real-time подписчиков (goals.realtime).
+
+Приемники сигналов (goals.signals) после коммита транзакции публикуют события вида
+{"board": id, "type": "goal", "action": "updated", "ids": [...]} в брокер GOALS_EVENTS_BROKER.
+Событие содержит только идентификаторы: клиент перечитывает объекты (с ETag) или вызывает goals/sync.
+
+LocalBroker раздает события подписчикам своего процесса. PostgresBroker передает их через
+NOTIFY/LISTEN, чтобы событие из одного процесса (воркер gunicorn, archive_worker) дошло
+до подключений во всех процессах.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, Error, connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Больше идентификаторов в одном событии не кладется: полезная нагрузка NOTIFY ограничена 8000 байт
+MAX_EVENT_IDS = 500
+
+# Подписчик, не успевший забрать GOALS_EVENTS_QUEUE_SIZE событий, получает OVERFLOW и отключается
+OVERFLOW = object()
+
+
+class Subscription:
+    """Очередь событий одной доски для одного подключения; создается и читается в event loop"""
+
+    def __init__(self, broker: 'LocalBroker', board_id: int, user_id: int, maxsize: int) -> None:
+        self.broker = broker
+        self.board_id = board_id
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def put(self, event: dict) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+            self.overflowed = True
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+    def __enter__(self) -> 'Subscription':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class LocalBroker:
+    """Брокер в памяти процесса"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscriptions: dict[int, set[Subscription]] = {}
+
+    def subscribe(self, board_id: int, user_id: int) -> Subscription:
+        subscription = Subscription(self, board_id, user_id, settings.GOALS_EVENTS_QUEUE_SIZE)
+        with self._lock:
+            self._subscriptions.setdefault(board_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.board_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.board_id, None)
+
+    def subscribers(self, board_id: int) -> int:
+        with self._lock:
+            return len(self._subscriptions.get(board_id, ()))
+
+    def publish(self, event: dict) -> None:
+        self.deliver(event)
+
+    def deliver(self, event: dict) -> None:
+        """Передает событие подписчикам доски; можно вызывать из любого потока"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(event['board'], ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # event loop подключения уже закрыт
+                self.unsubscribe(subscription)
+
+
+class PostgresBroker(LocalBroker):
+    """
+    Брокер через NOTIFY/LISTEN PostgreSQL.
+
+    publish выполняет pg_notify; поток-слушатель с отдельным соединением вне пула (запускается
+    при первой подписке) раздает полученные события подписчикам процесса через LocalBroker.deliver.
+    """
+    channel = 'goals_events'
+
+    def __init__(self, using: str = DEFAULT_DB_ALIAS) -> None:
+        super().__init__()
+        self.using = using
+        self._listener: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def publish(self, event: dict) -> None:
+        with connections[self.using].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, json.dumps(event)])
+
+    def subscribe(self, board_id: int, user_id: int) -> Subscription:
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='goals-events-listener', daemon=True)
+                self._listener.start()
+        return super().subscribe(board_id, user_id)
+
+    def stop(self) -> None:
+        """Останавливает поток-слушатель и закрывает его соединение"""
+        with self._lock:
+            listener, self._listener = self._listener, None
+        if listener is not None:
+            self._stopping.set()
+            listener.join()
+            self._stopping.clear()
+
+    def _listen(self) -> None:
+        try:
+            self._listen_forever()
+        finally:
+            # поток завершился из-за непредвиденной ошибки: следующая подписка запустит новый
+            with self._lock:
+                if self._listener is threading.current_thread():
+                    self._listener = None
+
+    def _listen_forever(self) -> None:
+        import psycopg2
+        import select
+
+        while not self._stopping.is_set():
+            conn = None
+            try:
+                # Соединение не из пула (todolist.db.postgresql_pool): оно занято все время работы слушателя
+                conn = psycopg2.connect(**connections[self.using].get_connection_params())
+                conn.set_session(autocommit=True)
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.channel}')
+                while not self._stopping.is_set():
+                    if select.select([conn], [], [], 1) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self.deliver(json.loads(conn.notifies.pop(0).payload))
+            except (psycopg2.Error, Error, OSError):
+                logger.exception('Goal events listener failed, reconnecting')
+                time.sleep(1)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+
+_brokers: dict[str, LocalBroker] = {}
+_brokers_lock = threading.Lock()
+
+
+def get_broker() -> LocalBroker:
+    path = settings.GOALS_EVENTS_BROKER
+    with _brokers_lock:
+        if path not in _brokers:
+            _brokers[path] = import_string(path)()
+        return _brokers[path]
+
+
+def publish_event(board_id: int, type_: str, action: str, ids: list[int], **extra) -> None:
+    """Публикует событие после коммита текущей транзакции; ids разбиваются по MAX_EVENT_IDS"""
+    for start in range(0, len(ids), MAX_EVENT_IDS):
+        event = {'board': board_id, 'type': type_, 'action': action, 'ids': ids[start:start + MAX_EVENT_IDS], **extra}
+        transaction.on_commit(lambda event=event: _publish(event))
+
+
+def _publish(event: dict) -> None:
+    # Недоставленное событие не должно ломать уже закоммиченный запрос
+    try:
+        get_broker().publish(event)
+    except Exception:
+        logger.exception('Failed to publish goal event %s', event)
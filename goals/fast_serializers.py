@@ -0,0 +1,159 @@
+"""
+Быстрый read-only путь сериализации для списков.
+
+Сериализатор DRF один раз «компилируется» в набор аксессоров к строкам `.values()`:
+для каждого поля заранее известны ключ строки и функция преобразования. Это убирает
+создание экземпляров моделей и вызовы get_attribute/to_representation на каждом поле,
+а результат совпадает с `Serializer(many=True).data` байт в байт после рендеринга в JSON.
+"""
+import datetime
+from functools import lru_cache
+from operator import itemgetter
+from typing import Callable, Iterable, Optional
+
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+# Поля, у которых to_representation для значения из БД ничего не меняет
+IDENTITY_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+)
+
+Getter = Callable[[dict], object]
+
+
+class CompiledSerializer:
+    """
+    Сериализатор строк `.values()` по заранее построенным аксессорам.
+
+    Аксессоры зависят от текущей временной зоны (как DateTimeField в DRF),
+    поэтому собираются один раз на зону и переиспользуются.
+    """
+
+    def __init__(self, lookups: list[str], specs: list) -> None:
+        self.lookups = lookups
+        self.specs = specs
+        self._getters: dict = {}
+
+    def getters(self) -> list[tuple[str, Getter]]:
+        tz = timezone.get_current_timezone()
+        getters = self._getters.get(tz)
+        if getters is None:
+            getters = self._getters[tz] = _build_getters(self.specs, tz)
+        return getters
+
+    def to_representation(self, row: dict) -> dict:
+        return {name: get(row) for name, get in self.getters()}
+
+    def serialize(self, rows: Iterable[dict]) -> list[dict]:
+        getters = self.getters()
+        return [{name: get(row) for name, get in getters} for row in rows]
+
+
+@lru_cache(maxsize=None)
+def compile_serializer(serializer_class: type[serializers.ModelSerializer]) -> Optional[CompiledSerializer]:
+    """
+    Компилирует ModelSerializer в CompiledSerializer.
+
+    Возвращает None, если в сериализаторе есть поля, которые нельзя получить через `.values()`
+    (методы, свойства, many-to-many и т.п.) — тогда нужно использовать обычный путь.
+    """
+    compiled = _compile(serializer_class(), prefix='')
+    if compiled is None:
+        return None
+    lookups, specs = compiled
+    return CompiledSerializer(lookups, specs)
+
+
+def _compile(serializer: serializers.Serializer, prefix: str) -> Optional[tuple[list, list]]:
+    """Возвращает (lookups для .values(), описания полей) или None"""
+    if not isinstance(serializer, serializers.ModelSerializer):
+        return None
+    model = serializer.Meta.model
+    lookups, specs = [], []
+
+    for field in serializer._readable_fields:
+        if len(field.source_attrs) != 1:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            return None
+        key = prefix + field.source
+
+        if isinstance(field, serializers.ModelSerializer):
+            nested = _compile(field, prefix=key + '__')
+            if nested is None:
+                return None
+            nested_lookups, nested_specs = nested
+            pk_key = key + '__' + field.Meta.model._meta.pk.name
+            lookups.extend(nested_lookups if pk_key in nested_lookups else [*nested_lookups, pk_key])
+            specs.append((field.field_name, pk_key, nested_specs))
+            continue
+
+        if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+            convert = None
+        elif isinstance(field, (serializers.BaseSerializer, serializers.RelatedField)):
+            return None
+        elif field.__class__ in IDENTITY_FIELDS:
+            convert = None
+        else:
+            convert = field
+
+        lookups.append(key)
+        specs.append((field.field_name, key, convert))
+
+    return lookups, specs
+
+
+def _build_getters(specs: list, tz) -> list[tuple[str, Getter]]:
+    getters = []
+    for name, key, convert in specs:
+        if isinstance(convert, list):
+            getters.append((name, _nested_getter(key, _build_getters(convert, tz))))
+        elif convert is None:
+            getters.append((name, itemgetter(key)))
+        else:
+            getters.append((name, _getter(key, _converter(convert, tz))))
+    return getters
+
+
+def _converter(field: serializers.Field, tz) -> Callable:
+    """to_representation поля; для дат в ISO 8601 — та же логика без обращений к настройкам на каждой строке"""
+    if field.__class__ is serializers.DateTimeField and not hasattr(field, 'timezone') and tz is not None:
+        if getattr(field, 'format', api_settings.DATETIME_FORMAT) == ISO_8601:
+            def datetime_to_iso(value):
+                if isinstance(value, str):
+                    return value
+                value = value.astimezone(tz) if timezone.is_aware(value) else timezone.make_aware(value, tz)
+                value = value.isoformat()
+                return value[:-6] + 'Z' if value.endswith('+00:00') else value
+            return datetime_to_iso
+    if field.__class__ is serializers.DateField:
+        if getattr(field, 'format', api_settings.DATE_FORMAT) == ISO_8601:
+            def date_to_iso(value):
+                return value if isinstance(value, str) else datetime.date.isoformat(value)
+            return date_to_iso
+    return field.to_representation
+
+
+def _getter(key: str, convert: Callable) -> Getter:
+    def get(row: dict):
+        value = row[key]
+        return None if value is None else convert(value)
+    return get
+
+
+def _nested_getter(pk_key: str, getters: list[tuple[str, Getter]]) -> Callable[[dict], Optional[dict]]:
+    def get(row: dict) -> Optional[dict]:
+        if row[pk_key] is None:
+            return None
+        return {name: nested_get(row) for name, nested_get in getters}
+    return get
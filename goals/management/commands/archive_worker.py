@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import close_old_connections
+
+from goals.archive import claim_job, run_job
+from goals.models import ArchiveJob
+
+
+class Command(BaseCommand):
+    help = 'Архивирует цели и категории удаленных досок и категорий пачками (задачи ArchiveJob)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Выполнить ожидающие задачи и завершиться')
+        parser.add_argument('--batch-size', type=int, default=settings.GOALS_ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=settings.GOALS_ARCHIVE_POLL_INTERVAL,
+                            help='Пауза между проверками очереди, секунды')
+        parser.add_argument('--pause', type=float, default=0, help='Пауза между пачками, секунды')
+        parser.add_argument('--stale', type=float, default=300,
+                            help='Через сколько секунд без прогресса задача считается брошенной')
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_job(options['stale'])
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+                # воркер живет долго: соединение переоткрывается по CONN_MAX_AGE, как после запроса
+                close_old_connections()
+                continue
+            run_job(job, options['batch_size'], progress=self.report, pause=options['pause'])
+
+    def report(self, job: ArchiveJob) -> None:
+        target = f'board {job.board_id}' if job.board_id else f'category {job.category_id}'
+        state = 'done' if job.status == ArchiveJob.Status.done else 'running'
+        self.stdout.write(f'archive job {job.id} ({target}): {job.processed}/{job.total} goals, {state}')
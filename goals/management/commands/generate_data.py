@@ -0,0 +1,84 @@
+import argparse
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError
+
+from core.models import User
+from goals.datagen import DataSpec, IntRange, Mix, generate, get_writer
+from goals.models import BoardParticipant, Goal
+
+
+def _argument(parse):
+    """Ошибка разбора значения — сообщение argparse вместо трассировки"""
+    def parse_argument(value: str):
+        try:
+            return parse(value)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e))
+    return parse_argument
+
+
+class Command(BaseCommand):
+    help = 'Заполняет БД синтетическими пользователями, досками, категориями, целями и комментариями (goals.datagen)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--boards', type=int, default=100)
+        parser.add_argument('--participants', type=_argument(IntRange.parse), default=IntRange(1, 10),
+                            help='Участников на доску: N или MIN-MAX')
+        parser.add_argument('--categories', type=_argument(IntRange.parse), default=IntRange(1, 10),
+                            help='Категорий на доску: N или MIN-MAX')
+        parser.add_argument('--goals', type=_argument(IntRange.parse), default=IntRange(0, 100),
+                            help='Целей на категорию: N или MIN-MAX')
+        parser.add_argument('--comments', type=_argument(IntRange.parse), default=IntRange(0, 3),
+                            help='Комментариев на цель: N или MIN-MAX')
+        parser.add_argument('--statuses', type=_argument(lambda value: Mix.parse(value, Goal.Status)),
+                            default=Mix.parse('to_do=50,in_progress=25,done=20,archived=5', Goal.Status),
+                            help='Доли статусов целей, например to_do=50,done=50')
+        parser.add_argument('--roles', type=_argument(lambda value: Mix.parse(value, BoardParticipant.Role)),
+                            default=Mix.parse('owner=1,writer=3,reader=6', BoardParticipant.Role),
+                            help='Доли ролей участников, кроме первого — он владелец')
+        parser.add_argument('--due-dates', type=float, default=0.5, help='Доля целей со сроком')
+        password = parser.add_mutually_exclusive_group()
+        password.add_argument('--password', help='Пароль всех пользователей (хэшируется один раз)')
+        password.add_argument('--password-hash', help='Готовый хэш make_password для всех пользователей')
+        parser.add_argument('--owner', help='Существующий пользователь, который станет владельцем всех досок')
+        parser.add_argument('--prefix', default='gen', help='Начало имен пользователей и названий досок')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=10000, help='Строк каждой таблицы в одной пачке')
+        parser.add_argument('--method', choices=['auto', 'copy', 'bulk'], default='auto',
+                            help='COPY (PostgreSQL) или bulk_create; auto — COPY, если доступен')
+
+    def handle(self, *args, **options):
+        owner_id = None
+        if options['owner']:
+            owner_id = User.objects.filter(username=options['owner']).values_list('pk', flat=True).first()
+            if owner_id is None:
+                raise CommandError(f'User {options["owner"]!r} does not exist')
+        try:
+            writer = get_writer(options['method'])
+        except ValueError as e:
+            raise CommandError(e)
+
+        # без пароля пользователи не могут войти: make_password(None) — непригодный пароль
+        password_hash = options['password_hash'] or make_password(options['password'])
+        spec = DataSpec(
+            users=options['users'], boards=options['boards'], participants=options['participants'],
+            categories=options['categories'], goals=options['goals'], comments=options['comments'],
+            statuses=options['statuses'], roles=options['roles'], due_dates=options['due_dates'],
+            password_hash=password_hash, owner_id=owner_id, prefix=options['prefix'], seed=options['seed'],
+        )
+
+        started = time.perf_counter()
+        progress = None
+        if options['verbosity'] > 1:
+            progress = lambda written: self.stdout.write(', '.join(f'{k}={v}' for k, v in written.items()))
+        written = generate(spec, writer, batch_size=options['batch_size'], progress=progress)
+        elapsed = time.perf_counter() - started
+
+        for label, count in written.items():
+            self.stdout.write(f'{label}: {count}')
+        total = sum(written.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано строк: {total} за {elapsed:.1f} с ({total / elapsed if elapsed else 0:.0f} строк/с)'))
@@ -0,0 +1,30 @@
+from django.core.management import BaseCommand, CommandError
+
+from goals.models import GoalCategory
+from goals.stats import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счетчики целей (статистика досок) с целями и исправляет расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--board', type=int, action='append', help='Только категории этой доски')
+        parser.add_argument('--check', action='store_true',
+                            help='Только проверить, при расхождениях завершиться с ошибкой')
+
+    def handle(self, *args, **options):
+        category_ids = None
+        if options['board']:
+            category_ids = GoalCategory.objects.filter(board_id__in=options['board']).values_list('pk', flat=True)
+
+        drift = reconcile_counters(category_ids, repair=not options['check'])
+        for (category_id, status, priority, due_date), (stored, actual) in sorted(drift.items(), key=str):
+            self.stdout.write(f'category={category_id} status={status} priority={priority} '
+                              f'due_date={due_date}: {stored} -> {actual}')
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Счетчики совпадают с целями'))
+        elif options['check']:
+            raise CommandError(f'Расхождений: {len(drift)}')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Исправлено расхождений: {len(drift)}'))
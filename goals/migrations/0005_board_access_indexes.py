@@ -0,0 +1,47 @@
+# Generated by Django 4.1.7 on 2026-10-18 18:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("goals", "0004_alter_goalcategory_board"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="boardparticipant",
+            index=models.Index(
+                fields=["user", "role"], include=("board",), name="participant_user_role_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="goal",
+            index=models.Index(
+                condition=models.Q(("status", 4), _negated=True),
+                fields=["category", "title"],
+                name="goal_active_cat_title_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="goal",
+            index=models.Index(
+                condition=models.Q(("status", 4), _negated=True),
+                fields=["category", "created"],
+                name="goal_active_cat_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="goalcategory",
+            index=models.Index(
+                condition=models.Q(("is_deleted", False)),
+                fields=["board", "title"],
+                name="category_active_board_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="goalcomment",
+            index=models.Index(fields=["goal", "-created"], name="comment_goal_created_idx"),
+        ),
+    ]
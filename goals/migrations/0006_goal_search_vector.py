@@ -0,0 +1,89 @@
+# Generated by Django 4.1.7 on 2026-10-18 19:48
+
+import django.contrib.postgres.search
+from django.db import DatabaseError, migrations, transaction
+
+# Вектор из заголовка (вес A) и описания (вес B) в русской и английской конфигурациях.
+# Триггер срабатывает только при изменении текстовых колонок, массовые update статуса его не трогают.
+SEARCH_TRIGGERS = {
+    "goals_goal": ("title", "description"),
+    "goals_goalcategory": ("title",),
+}
+
+
+def _vector_sql(columns):
+    parts = []
+    for column, weight in zip(columns, "AB"):
+        for config in ("russian", "english"):
+            parts.append(f"setweight(to_tsvector('{config}', coalesce(NEW.{column}, '')), '{weight}')")
+    return " || ".join(parts)
+
+
+def create_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, columns in SEARCH_TRIGGERS.items():
+        schema_editor.execute(f"""
+            CREATE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {_vector_sql(columns)};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        schema_editor.execute(f"""
+            CREATE TRIGGER {table}_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF {", ".join(columns)} ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {table}_search_vector_update()
+        """)
+        schema_editor.execute(f"UPDATE {table} SET {columns[0]} = {columns[0]}")
+        schema_editor.execute(f"CREATE INDEX {table}_search_idx ON {table} USING gin (search_vector)")
+
+    # pg_trgm нужен для поиска по части слова; без него поиск работает только по префиксам
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError:
+        # нет прав на создание расширения
+        return
+    for table, columns in SEARCH_TRIGGERS.items():
+        for column in columns:
+            schema_editor.execute(
+                f"CREATE INDEX {table}_{column}_trgm_idx ON {table} USING gin ({column} gin_trgm_ops)"
+            )
+
+
+def drop_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, columns in SEARCH_TRIGGERS.items():
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector_trigger ON {table}")
+        schema_editor.execute(f"DROP FUNCTION IF EXISTS {table}_search_vector_update()")
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_search_idx")
+        for column in columns:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {table}_{column}_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("goals", "0005_board_access_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="goal",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="goalcategory",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
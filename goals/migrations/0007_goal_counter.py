@@ -0,0 +1,47 @@
+# Generated by Django 4.1.7 on 2026-10-18 20:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_goal_counters(apps, schema_editor):
+    Goal = apps.get_model('goals', 'Goal')
+    GoalCounter = apps.get_model('goals', 'GoalCounter')
+    alias = schema_editor.connection.alias
+    rows = Goal.objects.using(alias).values('category_id', 'status', 'priority', 'due_date'). \
+        annotate(count=models.Count('id')).order_by()
+    GoalCounter.objects.using(alias).bulk_create((GoalCounter(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0006_goal_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoalCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'К выполнению'), (2, 'В процессе'), (3, 'Выполнено'), (4, 'Архив')], verbose_name='Статус')),
+                ('priority', models.PositiveSmallIntegerField(choices=[(1, 'Низкий'), (2, 'Средний'), (3, 'Высокий'), (4, 'Критический')], verbose_name='Приоритет')),
+                ('due_date', models.DateField(blank=True, null=True, verbose_name='Дата выполнения')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counters', to='goals.goalcategory', verbose_name='Категория')),
+            ],
+            options={
+                'verbose_name': 'Счетчик целей',
+                'verbose_name_plural': 'Счетчики целей',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='goalcounter',
+            constraint=models.UniqueConstraint(condition=models.Q(('due_date__isnull', False)), fields=('category', 'status', 'priority', 'due_date'), name='goal_counter_key_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='goalcounter',
+            constraint=models.UniqueConstraint(condition=models.Q(('due_date__isnull', True)), fields=('category', 'status', 'priority'), name='goal_counter_no_due_date_uniq'),
+        ),
+        migrations.RunPython(fill_goal_counters, migrations.RunPython.noop),
+    ]
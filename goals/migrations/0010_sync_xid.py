@@ -0,0 +1,97 @@
+# Generated by Django 4.1.7 on 2026-10-18 22:04
+
+from django.db import migrations, models
+
+# Таблицы, изменения которых отдает goals/sync
+SYNC_TABLES = ("goals_board", "goals_goalcategory", "goals_goal", "goals_goalcomment")
+
+
+def create_sync_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # txid_current() — номер транзакции с эпохой, сравнимый с txid_snapshot_xmin()
+    schema_editor.execute("""
+        CREATE FUNCTION goals_sync_xid_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.sync_xid := txid_current();
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table in SYNC_TABLES:
+        schema_editor.execute(f"""
+            CREATE TRIGGER {table}_sync_xid_trigger
+            BEFORE INSERT OR UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION goals_sync_xid_update()
+        """)
+
+
+def drop_sync_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table in SYNC_TABLES:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_sync_xid_trigger ON {table}")
+    schema_editor.execute("DROP FUNCTION IF EXISTS goals_sync_xid_update()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0009_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='board',
+            name='board_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='goal',
+            name='goal_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='goalcategory',
+            name='category_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='goalcomment',
+            name='comment_updated_idx',
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='sync_xid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='goal',
+            name='sync_xid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='goalcategory',
+            name='sync_xid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='goalcomment',
+            name='sync_xid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='board',
+            index=models.Index(fields=['sync_xid', 'id'], name='board_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['sync_xid', 'id'], name='goal_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goalcategory',
+            index=models.Index(fields=['sync_xid', 'id'], name='category_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goalcomment',
+            index=models.Index(fields=['sync_xid', 'id'], name='comment_sync_idx'),
+        ),
+        migrations.RunPython(create_sync_triggers, drop_sync_triggers),
+    ]
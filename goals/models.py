@@ -1,4 +1,7 @@
-from django.db import models
+from collections import Counter
+
+from django.contrib.postgres.search import SearchVectorField
+from django.db import IntegrityError, models, router, transaction
 from django.utils import timezone
 
 from core.models import User
@@ -15,13 +18,29 @@ class DatesModelMixin(models.Model):
         if not self.id:
             self.created = timezone.now()
         self.updated = timezone.now()
+        # updated — валидатор ETag/Last-Modified (goals.conditional), сохраняется всегда
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "updated"}
         return super().save(*args, **kwargs)
 
 
-class Board(DatesModelMixin):
+class SyncMixin(models.Model):
+    class Meta:
+        abstract = True
+
+    # Номер транзакции, последней изменившей строку: курсор синхронизации (goals.sync).
+    # Назначается триггером PostgreSQL (миграция 0010), в других БД остается 0
+    sync_xid = models.BigIntegerField(default=0, editable=False)
+
+
+class Board(DatesModelMixin, SyncMixin):
     class Meta:
         verbose_name = "Доска"
         verbose_name_plural = "Доски"
+        indexes = [
+            # Изменения после курсора синхронизации (goals.sync)
+            models.Index(fields=["sync_xid", "id"], name="board_sync_idx"),
+        ]
 
     title = models.CharField(verbose_name="Название", max_length=255)
     is_deleted = models.BooleanField(verbose_name="Удалена", default=False)
@@ -35,6 +54,9 @@ class BoardParticipant(DatesModelMixin):
         unique_together = ("board", "user")
         verbose_name = "Участник"
         verbose_name_plural = "Участники"
+        indexes = [
+            models.Index(fields=["user", "role"], include=["board"], name="participant_user_role_idx"),
+        ]
 
     class Role(models.IntegerChoices):
         owner = 1, "Владелец"
@@ -60,28 +82,139 @@ class BoardParticipant(DatesModelMixin):
     editable_choices: list[tuple[int, str]] = Role.choices[1:]
 
 
-class GoalCategory(DatesModelMixin):
+class GoalCategoryQuerySet(models.QuerySet):
+    def visible(self) -> "GoalCategoryQuerySet":
+        """Неудаленные категории неудаленных досок"""
+        return self.filter(is_deleted=False, board__is_deleted=False)
+
+
+class GoalCategory(DatesModelMixin, SyncMixin):
     class Meta:
         verbose_name = "Категория"
         verbose_name_plural = "Категории"
+        indexes = [
+            models.Index(
+                fields=["board", "title"], condition=models.Q(is_deleted=False), name="category_active_board_idx"
+            ),
+            models.Index(fields=["sync_xid", "id"], name="category_sync_idx"),
+        ]
 
     board = models.ForeignKey(
         Board, verbose_name="Доска", on_delete=models.PROTECT, related_name="categories")
     title = models.CharField(verbose_name="Название", max_length=255)
     user = models.ForeignKey(User, verbose_name="Автор", on_delete=models.PROTECT)
     is_deleted = models.BooleanField(verbose_name="Удалена", default=False)
+    # Заполняется триггером в PostgreSQL (goals.search)
+    search_vector = SearchVectorField(null=True, editable=False)
 
+    objects = GoalCategoryQuerySet.as_manager()
 
-class Goal(DatesModelMixin):
-    class Meta:
-        verbose_name = "Цель"
-        verbose_name_plural = "Цели"
 
-    class Status(models.IntegerChoices):
-        to_do = 1, "К выполнению"
-        in_progress = 2, "В процессе"
-        done = 3, "Выполнено"
-        archived = 4, "Архив"
+# Поля, по которым цели раскладываются по счетчикам GoalCounter
+COUNTER_FIELDS = ("category_id", "status", "priority", "due_date")
+
+
+class GoalQuerySet(models.QuerySet):
+    def visible(self) -> "GoalQuerySet":
+        """
+        Неархивные цели неудаленных категорий и досок.
+
+        После удаления доски или категории цели архивируются в фоне (goals.archive),
+        а до этого скрываются по признаку is_deleted родителя.
+        """
+        return self.exclude(status=Goal.Status.archived).filter(
+            category__is_deleted=False, category__board__is_deleted=False)
+
+    def update_and_notify(self, **fields) -> int:
+        """
+        update() целей с отметкой updated и сигналом goals_bulk_updated.
+
+        Массовый update не вызывает post_save, поэтому счетчики GoalCounter пересчитываются
+        здесь же в одной транзакции, а кэши, которые следят за целями, узнают об изменениях из сигнала.
+        """
+        from goals.signals import goals_bulk_updated
+
+        changes = {}
+        for name, value in fields.items():
+            attname = Goal._meta.get_field(name).attname
+            if attname in COUNTER_FIELDS:
+                changes[attname] = value.pk if isinstance(value, models.Model) else value
+
+        with transaction.atomic(using=self.db):
+            goals = list(self.select_for_update(of=("self",)).values_list("pk", "user_id", *COUNTER_FIELDS))
+            if not goals:
+                return 0
+            goal_ids = [goal[0] for goal in goals]
+            fields.setdefault("updated", timezone.now())
+            count = Goal.objects.filter(pk__in=goal_ids).update(**fields)
+            deltas = Counter()
+            for goal in goals:
+                old_key = goal[2:]
+                new_key = tuple(changes.get(field, value) for field, value in zip(COUNTER_FIELDS, old_key))
+                if new_key != old_key:
+                    deltas[old_key] -= 1
+                    deltas[new_key] += 1
+            GoalCounter.objects.using(self.db).apply(deltas)
+
+        goals_bulk_updated.send(sender=Goal, goal_ids=goal_ids, user_ids={goal[1] for goal in goals},
+                                fields=fields)
+        return count
+
+    def bulk_create_and_notify(self, goals: list["Goal"]) -> list["Goal"]:
+        """bulk_create целей с датами, счетчиками GoalCounter и сигналом goals_bulk_updated"""
+        from goals.signals import goals_bulk_updated
+
+        now = timezone.now()
+        for goal in goals:
+            goal.created = goal.updated = now
+        with transaction.atomic(using=self.db):
+            goals = self.bulk_create(goals)
+            GoalCounter.objects.using(self.db).apply(Counter(goal.counter_key() for goal in goals))
+
+        goals_bulk_updated.send(sender=Goal, goal_ids=[goal.pk for goal in goals],
+                                user_ids={goal.user_id for goal in goals}, fields={}, created=True)
+        return goals
+
+    def bulk_update_and_notify(self, goals: list["Goal"], fields: list[str]) -> int:
+        """bulk_update целей с отметкой updated, счетчиками GoalCounter и сигналом goals_bulk_updated"""
+        from goals.signals import goals_bulk_updated
+
+        if not goals:
+            return 0
+        now = timezone.now()
+        for goal in goals:
+            goal.updated = now
+        fields = list(dict.fromkeys([*fields, "updated"]))
+        with transaction.atomic(using=self.db):
+            previous = {
+                goal[0]: goal[1:] for goal in Goal.objects.using(self.db).select_for_update().
+                filter(pk__in=[goal.pk for goal in goals]).values_list("pk", *COUNTER_FIELDS)
+            }
+            count = self.bulk_update(goals, fields)
+            deltas = Counter()
+            for goal in goals:
+                old_key = previous.get(goal.pk)
+                new_key = goal.counter_key(old_key, fields)
+                if old_key is not None and new_key != old_key:
+                    deltas[old_key] -= 1
+                    deltas[new_key] += 1
+            GoalCounter.objects.using(self.db).apply(deltas)
+
+        goals_bulk_updated.send(sender=Goal, goal_ids=[goal.pk for goal in goals],
+                                user_ids={goal.user_id for goal in goals}, fields=dict.fromkeys(fields))
+        return count
+
+
+class GoalStatus(models.IntegerChoices):
+    to_do = 1, "К выполнению"
+    in_progress = 2, "В процессе"
+    done = 3, "Выполнено"
+    archived = 4, "Архив"
+
+
+class Goal(DatesModelMixin, SyncMixin):
+    # Вне класса, чтобы условия индексов в Meta ссылались на тот же статус, что и visible()
+    Status = GoalStatus
 
     class Priority(models.IntegerChoices):
         low = 1, "Низкий"
@@ -89,6 +222,24 @@ class Goal(DatesModelMixin):
         high = 3, "Высокий"
         critical = 4, "Критический"
 
+    class Meta:
+        verbose_name = "Цель"
+        verbose_name_plural = "Цели"
+        indexes = [
+            # Неархивные цели категории в порядке сортировки списка (title / created)
+            models.Index(
+                fields=["category", "title"],
+                condition=~models.Q(status=GoalStatus.archived),
+                name="goal_active_cat_title_idx",
+            ),
+            models.Index(
+                fields=["category", "created"],
+                condition=~models.Q(status=GoalStatus.archived),
+                name="goal_active_cat_created_idx",
+            ),
+            models.Index(fields=["sync_xid", "id"], name="goal_sync_idx"),
+        ]
+
     user = models.ForeignKey(
         User,
         verbose_name="Пользователь",
@@ -111,15 +262,125 @@ class Goal(DatesModelMixin):
     priority = models.PositiveSmallIntegerField(
         verbose_name="Приоритет", choices=Priority.choices, default=Priority.medium
     )
+    # Заполняется триггером в PostgreSQL (goals.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = GoalQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # Прежние значения читаются с блокировкой строки, чтобы счетчики
+        # менялись в той же транзакции и не расходились при параллельных правках
+        using = kwargs.get("using") or router.db_for_write(Goal, instance=self)
+        with transaction.atomic(using=using):
+            previous = None
+            if self.pk:
+                previous = Goal.objects.using(using).select_for_update().filter(pk=self.pk). \
+                    values_list(*COUNTER_FIELDS).first()
+            super().save(*args, **kwargs)
+            key = self.counter_key(previous, kwargs.get("update_fields"))
+            if key != previous:
+                deltas = Counter({key: 1})
+                if previous is not None:
+                    deltas[previous] -= 1
+                GoalCounter.objects.using(using).apply(deltas)
+
+    def counter_key(self, previous: tuple = None, update_fields=None) -> tuple:
+        """Ключ счетчика цели; при save(update_fields=...) остальные поля берутся из previous"""
+        due_date = self._meta.get_field("due_date").to_python(self.due_date)
+        key = (self.category_id, self.status, self.priority, due_date)
+        if previous is None or update_fields is None:
+            return key
+        saved = {self._meta.get_field(name).attname for name in update_fields}
+        return tuple(value if field in saved else old for field, value, old in zip(COUNTER_FIELDS, key, previous))
+
+
+class GoalCounterQuerySet(models.QuerySet):
+    def apply(self, deltas: dict[tuple, int]) -> None:
+        """Прибавляет к счетчикам deltas вида {(category_id, status, priority, due_date): n}"""
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if len(deltas) > 1:
+            deltas = self._apply_many(deltas)
+        for key, delta in deltas.items():
+            lookup = dict(zip(COUNTER_FIELDS, key))
+            if self.filter(**lookup).update(count=models.F("count") + delta):
+                continue
+            try:
+                with transaction.atomic(using=self.db):
+                    self.create(count=delta, **lookup)
+            except IntegrityError:
+                # строку успела создать параллельная транзакция
+                self.filter(**lookup).update(count=models.F("count") + delta)
+
+    def _apply_many(self, deltas: dict[tuple, int]) -> dict[tuple, int]:
+        """
+        Существующие счетчики меняются одним bulk_update, новые создаются одним bulk_create.
+        Возвращает дельты, которые не удалось применить из-за параллельной вставки.
+        """
+        deltas = dict(deltas)
+        counters = []
+        for counter in self.filter(category_id__in={key[0] for key in deltas}):
+            key = tuple(getattr(counter, field) for field in COUNTER_FIELDS)
+            if key in deltas:
+                counter.count = models.F("count") + deltas.pop(key)
+                counters.append(counter)
+        self.bulk_update(counters, ["count"])
+        try:
+            with transaction.atomic(using=self.db):
+                self.bulk_create([GoalCounter(count=delta, **dict(zip(COUNTER_FIELDS, key)))
+                                  for key, delta in deltas.items()])
+        except IntegrityError:
+            return deltas
+        return {}
+
+
+class GoalCounter(models.Model):
+    """
+    Число целей категории с данными статусом, приоритетом и сроком.
+
+    Поддерживается при сохранении и удалении целей и в GoalQuerySet.update_and_notify,
+    по нему считается статистика доски (goals.stats). Расхождения с целями проверяет
+    и исправляет команда reconcile_goal_counters.
+    """
+
+    class Meta:
+        verbose_name = "Счетчик целей"
+        verbose_name_plural = "Счетчики целей"
+        constraints = [
+            # NULL в уникальном индексе не равен NULL, поэтому цели без срока — отдельным условием
+            models.UniqueConstraint(
+                fields=["category", "status", "priority", "due_date"],
+                condition=models.Q(due_date__isnull=False),
+                name="goal_counter_key_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=["category", "status", "priority"],
+                condition=models.Q(due_date__isnull=True),
+                name="goal_counter_no_due_date_uniq",
+            ),
+        ]
+
+    category = models.ForeignKey(
+        GoalCategory, verbose_name="Категория", on_delete=models.CASCADE, related_name="counters"
+    )
+    status = models.PositiveSmallIntegerField(verbose_name="Статус", choices=Goal.Status.choices)
+    priority = models.PositiveSmallIntegerField(verbose_name="Приоритет", choices=Goal.Priority.choices)
+    due_date = models.DateField(verbose_name="Дата выполнения", null=True, blank=True)
+    count = models.IntegerField(verbose_name="Количество", default=0)
+
+    objects = GoalCounterQuerySet.as_manager()
+
 
-class GoalComment(DatesModelMixin):
+class GoalComment(DatesModelMixin, SyncMixin):
     class Meta:
         verbose_name = "Комментарий к цели"
         verbose_name_plural = "Комментарии к целям"
+        indexes = [
+            models.Index(fields=["goal", "-created"], name="comment_goal_created_idx"),
+            models.Index(fields=["sync_xid", "id"], name="comment_sync_idx"),
+        ]
 
     user = models.ForeignKey(
         User,
@@ -134,3 +395,37 @@ class GoalComment(DatesModelMixin):
         on_delete=models.PROTECT,
     )
     text = models.TextField(verbose_name="Текст")
+
+
+class ArchiveJob(DatesModelMixin):
+    """
+    Архивация целей и категорий удаленной доски или целей удаленной категории.
+
+    Создается при удалении, выполняется пачками командой archive_worker (goals.archive).
+    """
+
+    class Meta:
+        verbose_name = "Задача архивации"
+        verbose_name_plural = "Задачи архивации"
+        indexes = [
+            models.Index(fields=["status", "created"], name="archive_job_status_idx"),
+        ]
+
+    class Status(models.IntegerChoices):
+        pending = 1, "Ожидает"
+        running = 2, "Выполняется"
+        done = 3, "Завершена"
+
+    board = models.ForeignKey(
+        Board, verbose_name="Доска", null=True, blank=True, on_delete=models.PROTECT, related_name="archive_jobs"
+    )
+    category = models.ForeignKey(
+        GoalCategory, verbose_name="Категория", null=True, blank=True, on_delete=models.PROTECT,
+        related_name="archive_jobs",
+    )
+    status = models.PositiveSmallIntegerField(verbose_name="Статус", choices=Status.choices, default=Status.pending)
+    total = models.PositiveIntegerField(verbose_name="Целей к архивации", null=True, blank=True)
+    processed = models.PositiveIntegerField(verbose_name="Архивировано целей", default=0)
+
+    def __str__(self):
+        return f"{self.board or self.category}: {self.processed}/{self.total if self.total is not None else '?'}"
@@ -0,0 +1,217 @@
+import base64
+import binascii
+import datetime
+import decimal
+import json
+from typing import Any, Optional
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу (cursor/keyset).
+
+    Вместо OFFSET страница выбирается условием `(поле, pk) > (значения последней строки)`
+    по текущей сортировке запроса, поэтому стоимость запроса не зависит от глубины
+    страницы, а страницы не «плывут» при изменении целей. Курсор непрозрачный:
+    base64 от JSON с позицией и направлением.
+    """
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    default_limit = 20
+    max_limit = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view=None) -> list:
+        self.request = request
+        self.model = queryset.model
+        self.limit = self.get_limit(request)
+        self.ordering = self.get_ordering(queryset, view)
+        position, reverse = self.decode_cursor(request)
+
+        order_by = [('-' if descending != reverse else '') + name for name, descending in self.ordering]
+        queryset = queryset.order_by(*order_by)
+        if position is not None:
+            queryset = queryset.filter(self._keyset_filter(position, reverse))
+
+        rows = list(queryset[:self.limit + 1])
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if reverse:
+            rows.reverse()
+
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = has_more if reverse else position is not None
+        self.first_position = self._position(rows[0]) if rows else position
+        self.last_position = self._position(rows[-1]) if rows else position
+        return rows
+
+    def get_paginated_response(self, data) -> Response:
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_limit(self, request: Request) -> int:
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        if limit <= 0:
+            return self.default_limit
+        return min(limit, self.max_limit)
+
+    def get_ordering(self, queryset: QuerySet, view) -> list[tuple[str, bool]]:
+        """Сортировка запроса в виде [(поле, по убыванию)], всегда с pk в конце."""
+        ordering = list(queryset.query.order_by) or list(getattr(view, 'ordering', None) or [])
+        ordering = ordering or list(queryset.model._meta.ordering) or ['pk']
+        pk_name = queryset.model._meta.pk.name
+
+        result = []
+        for item in ordering:
+            if not isinstance(item, str):
+                raise NotFound('Cursor pagination supports only named ordering fields')
+            descending = item.startswith('-')
+            name = item.lstrip('-')
+            result.append((pk_name if name == 'pk' else name, descending))
+        if pk_name not in [name for name, _ in result]:
+            result.append((pk_name, result[0][1]))
+        return result
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.last_position, reverse=False)
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.first_position, reverse=True)
+
+    def encode_cursor(self, position: list, reverse: bool) -> str:
+        payload = {
+            'o': [('-' if descending else '') + name for name, descending in self.ordering],
+            'p': [self._dump_value(value) for value in position],
+        }
+        if reverse:
+            payload['r'] = 1
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'offset')
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request: Request) -> tuple[Optional[list], bool]:
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            ordering = [('-' if descending else '') + name for name, descending in self.ordering]
+            if payload['o'] != ordering or len(payload['p']) != len(self.ordering):
+                raise NotFound(self.invalid_cursor_message)
+            position = [
+                self._load_value(name, value) for (name, _), value in zip(self.ordering, payload['p'])
+            ]
+            return position, bool(payload.get('r'))
+        except (TypeError, KeyError, ValueError, ValidationError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _keyset_filter(self, position: list, reverse: bool) -> Q:
+        """(f1, f2, ..., pk) > (v1, v2, ..., vpk) с учетом направления каждого поля."""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.ordering, position):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _position(self, row) -> list:
+        if isinstance(row, dict):
+            return [row[name] for name, _ in self.ordering]
+        model = type(row)
+        position = []
+        for name, _ in self.ordering:
+            try:
+                attname = model._meta.get_field(name).attname
+            except FieldDoesNotExist:
+                attname = name
+            position.append(getattr(row, attname))
+        return position
+
+    def _load_value(self, name: str, value: Any) -> Any:
+        if value is None:
+            return None
+        try:
+            field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value
+        target = getattr(field, 'target_field', field)
+        return target.to_python(value)
+
+    @staticmethod
+    def _dump_value(value: Any) -> Any:
+        if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, decimal.Decimal):
+            return str(value)
+        return value
+
+
+class LimitOffsetOrKeysetPagination(LimitOffsetPagination):
+    """
+    LimitOffsetPagination для текущего фронтенда + курсорный режим.
+
+    Курсорный режим включается параметром `cursor` (первая страница — `?cursor=`).
+    """
+    cursor_query_param = KeysetPagination.cursor_query_param
+    keyset_class = KeysetPagination
+
+    keyset = None
+    view = None
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view=None) -> Optional[list]:
+        self.view = view
+        if self.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count(self, queryset: QuerySet) -> int:
+        # число строк уже посчитано для ETag (goals.conditional.ConditionalListMixin)
+        count = getattr(self.view, 'list_count', None)
+        return super().get_count(queryset) if count is None else count
+
+    def get_paginated_response(self, data) -> Response:
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view) -> list:
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor (keyset) pagination; pass an empty value for the first page.',
+                'schema': {'type': 'string'},
+            },
+        ]
@@ -1,6 +1,7 @@
 from rest_framework import permissions
 from rest_framework.request import Request
-from goals.models import BoardParticipant, Board, GoalCategory, Goal, GoalComment
+from goals.access import get_board_roles
+from goals.models import Board, GoalCategory, Goal, GoalComment
 from rest_framework.generics import GenericAPIView
 
 
@@ -20,12 +21,8 @@ class BoardPermissions(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
         if request.method in permissions.SAFE_METHODS:
-            return BoardParticipant.objects.filter(
-                user=request.user, board=obj
-            ).exists()
-        return BoardParticipant.objects.filter(
-            user=request.user, board=obj, role=BoardParticipant.Role.owner
-        ).exists()
+            return get_board_roles(request).can_read(obj.id)
+        return get_board_roles(request).is_owner(obj.id)
 
 
 class GoalCategoryPermissions(permissions.BasePermission):
@@ -44,11 +41,8 @@ class GoalCategoryPermissions(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
         if request.method in permissions.SAFE_METHODS:
-            return BoardParticipant.objects.filter(user=request.user, board=obj.board).exists()
-        return BoardParticipant.objects.filter(
-            user=request.user, board=obj.board,
-            role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer],
-        ).exists()
+            return get_board_roles(request).can_read(obj.board_id)
+        return get_board_roles(request).can_write(obj.board_id)
 
 
 class GoalPermissions(permissions.BasePermission):
@@ -67,11 +61,8 @@ class GoalPermissions(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
         if request.method in permissions.SAFE_METHODS:
-            return BoardParticipant.objects.filter(user=request.user, board=obj.category.board).exists()
-        return BoardParticipant.objects.filter(
-            user=request.user, board=obj.category.board,
-            role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer],
-        ).exists()
+            return get_board_roles(request).can_read(obj.category.board_id)
+        return get_board_roles(request).can_write(obj.category.board_id)
 
 
 class CommentPermissions(permissions.BasePermission):
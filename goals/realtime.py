@@ -0,0 +1,162 @@
+"""
+Поток событий доски (goals.events) по WebSocket и Server-Sent Events.
+
+    ws://<host>/goals/board/<pk>/events    — WebSocket, событие в каждом текстовом сообщении
+    GET /goals/board/<pk>/events          — text/event-stream
+
+Подключения обслуживаются ASGI-приложением без Django-представлений: пользователь (по сессии)
+и участие в доске проверяются один раз при подключении, затем соединение только ждет событий
+брокера и не держит ни потока, ни соединения с БД. Подключение закрывается при удалении доски,
+исключении пользователя из участников и переполнении очереди событий; после переподключения
+пропущенное забирается через goals/sync.
+"""
+import asyncio
+import json
+import re
+from http.cookies import SimpleCookie
+from importlib import import_module
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections
+from django.http import HttpRequest
+
+from goals.events import OVERFLOW, get_broker
+from goals.models import BoardParticipant
+
+EVENTS_PATH = re.compile(r'^/goals/board/(?P<pk>\d+)/events/?$')
+
+# Коды закрытия WebSocket: доступ запрещен, доступ потерян, клиент не успевает читать события
+CLOSE_FORBIDDEN = 4403
+CLOSE_GONE = 4410
+CLOSE_OVERFLOW = 4429
+
+
+def _headers(scope: dict) -> dict[str, str]:
+    return {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+
+
+def _origin_allowed(headers: dict[str, str]) -> bool:
+    """Куки отправляются и с чужих сайтов, поэтому WebSocket принимается только со своего origin"""
+    origin = headers.get('origin')
+    if origin is None:
+        return True
+    return urlsplit(origin).netloc == headers.get('host') or origin in settings.GOALS_EVENTS_ALLOWED_ORIGINS
+
+
+def _authorize(headers: dict[str, str], board_id: int) -> Optional[int]:
+    """id пользователя сессии, если он участник неудаленной доски"""
+    try:
+        cookies = SimpleCookie(headers.get('cookie', ''))
+        request = HttpRequest()
+        session_key = cookies[settings.SESSION_COOKIE_NAME].value if settings.SESSION_COOKIE_NAME in cookies else None
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+        user = get_user(request)
+        if user.is_authenticated and BoardParticipant.objects.filter(
+                board_id=board_id, user_id=user.pk, board__is_deleted=False).exists():
+            return user.pk
+        return None
+    finally:
+        close_old_connections()
+
+
+def _closes_subscription(event: dict, user_id: int) -> bool:
+    if event['type'] == 'board':
+        return event['action'] == 'deleted'
+    return event['type'] == 'participant' and event['action'] == 'deleted' and event['user'] == user_id
+
+
+async def _next_event(subscription, receive: Callable, disconnect_type: str,
+                      timeout: Optional[float] = None):
+    """Следующее событие; None — клиент отключился, OVERFLOW — переполнение, TimeoutError — пора слать ping"""
+    while True:
+        event_task = asyncio.ensure_future(subscription.get())
+        receive_task = asyncio.ensure_future(receive())
+        try:
+            done, _ = await asyncio.wait({event_task, receive_task}, timeout=timeout,
+                                         return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            event_task.cancel()
+            receive_task.cancel()
+        if receive_task in done and receive_task.result()['type'] == disconnect_type:
+            return None
+        if event_task in done:
+            return event_task.result()
+        if not done:
+            raise asyncio.TimeoutError
+
+
+class BoardEventsApplication:
+    """ASGI-приложение: события досок обслуживает само, остальное передает Django"""
+
+    def __init__(self, django_application: Callable) -> None:
+        self.django_application = django_application
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        match = EVENTS_PATH.match(scope.get('path', ''))
+        if match and scope['type'] == 'websocket':
+            await self.websocket(scope, receive, send, int(match['pk']))
+        elif match and scope['type'] == 'http' and scope['method'] == 'GET':
+            await self.event_stream(scope, receive, send, int(match['pk']))
+        else:
+            await self.django_application(scope, receive, send)
+
+    async def websocket(self, scope: dict, receive: Callable, send: Callable, board_id: int) -> None:
+        if (await receive())['type'] != 'websocket.connect':
+            return
+        headers = _headers(scope)
+        user_id = _origin_allowed(headers) and await sync_to_async(_authorize)(headers, board_id)
+        if not user_id:
+            await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+            return
+
+        with get_broker().subscribe(board_id, user_id) as subscription:
+            await send({'type': 'websocket.accept'})
+            while True:
+                # входящие сообщения клиента не нужны и только читаются, чтобы заметить отключение
+                event = await _next_event(subscription, receive, 'websocket.disconnect')
+                if event is None:
+                    return
+                if event is OVERFLOW:
+                    await send({'type': 'websocket.close', 'code': CLOSE_OVERFLOW})
+                    return
+                await send({'type': 'websocket.send', 'text': json.dumps(event)})
+                if _closes_subscription(event, user_id):
+                    await send({'type': 'websocket.close', 'code': CLOSE_GONE})
+                    return
+
+    async def event_stream(self, scope: dict, receive: Callable, send: Callable, board_id: int) -> None:
+        user_id = await sync_to_async(_authorize)(_headers(scope), board_id)
+        if not user_id:
+            await send({'type': 'http.response.start', 'status': 403,
+                        'headers': [(b'content-type', b'application/json')]})
+            await send({'type': 'http.response.body',
+                        'body': b'{"detail":"You do not have permission to perform this action."}'})
+            return
+
+        with get_broker().subscribe(board_id, user_id) as subscription:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ]})
+            while True:
+                try:
+                    event = await _next_event(subscription, receive, 'http.disconnect',
+                                              settings.GOALS_EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # комментарий не дает прокси закрыть простаивающее соединение
+                    await send({'type': 'http.response.body', 'body': b': ping\n\n', 'more_body': True})
+                    continue
+                if event is None:
+                    return
+                if event is OVERFLOW:
+                    break
+                body = f'event: {event["type"]}\ndata: {json.dumps(event)}\n\n'.encode()
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+                if _closes_subscription(event, user_id):
+                    break
+            await send({'type': 'http.response.body', 'body': b''})
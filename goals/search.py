@@ -0,0 +1,79 @@
+"""
+Полнотекстовый поиск по целям и категориям для параметра `search=`.
+
+В PostgreSQL колонку `search_vector` заполняет триггер (конфигурации russian и english,
+миграция 0006), поиск идет по GIN-индексу, результаты сортируются по ts_rank. Слова
+запроса ищутся как префиксы. Если установлен pg_trgm, вхождения в середине слова
+дополнительно ищутся через ILIKE по триграммным индексам, но только для запроса из одного
+слова или когда полнотекстовый поиск ничего не нашел: для нескольких слов условие ILIKE
+на каждое слово дороже и почти не добавляет результатов. На других СУБД работает
+обычный SearchFilter.
+"""
+import operator
+import re
+from functools import lru_cache, reduce
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, FloatField, Q, QuerySet
+from django.db.models.functions import Cast
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+SEARCH_CONFIGS = ('russian', 'english')
+
+
+@lru_cache(maxsize=None)
+def has_trigram(using: str) -> bool:
+    """Установлено ли расширение pg_trgm (проверяется один раз для каждой БД)"""
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def search_words(terms: list[str]) -> list[str]:
+    """Слова поисковых терминов без знаков препинания"""
+    return [word for term in terms for word in re.findall(r'\w+', term)]
+
+
+def build_search_query(terms: list[str]):
+    """tsquery, в котором каждое слово — префикс, слова объединены через AND, для каждой конфигурации"""
+    words = search_words(terms)
+    if not words:
+        return None
+    raw = ' & '.join(f'{word}:*' for word in words)
+    return reduce(operator.or_, (SearchQuery(raw, config=config, search_type='raw') for config in SEARCH_CONFIGS))
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter с полнотекстовым поиском в PostgreSQL.
+
+    Должен стоять после OrderingFilter: если сортировка не задана параметром `ordering`,
+    результаты упорядочиваются по релевантности, а сортировка view остается вторичной.
+    """
+
+    def filter_queryset(self, request, queryset: QuerySet, view) -> QuerySet:
+        terms = self.get_search_terms(request)
+        search_fields = self.get_search_fields(view, request)
+        if not terms or not search_fields or connections[queryset.db].vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+
+        query = build_search_query(terms)
+        if query is None:
+            return super().filter_queryset(request, queryset, view)
+
+        condition = Q(search_vector=query)
+        if has_trigram(queryset.db) and (
+                len(search_words(terms)) == 1 or not queryset.filter(condition).exists()):
+            lookups = [self.construct_search(str(field)) for field in search_fields]
+            condition |= reduce(operator.and_, (
+                reduce(operator.or_, (Q(**{lookup: term}) for lookup in lookups)) for term in terms
+            ))
+
+        # ts_rank возвращает real; double precision без потерь проходит через курсор keyset-пагинации
+        rank = Cast(SearchRank(F('search_vector'), query), FloatField())
+        queryset = queryset.filter(condition).annotate(search_rank=rank)
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+        return queryset.order_by('-search_rank', *queryset.query.order_by)
@@ -2,8 +2,10 @@ from rest_framework.request import Request
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework import serializers
 from django.db import transaction
+from django.utils import timezone
 from core.models import User
 from core.serializers import UserSerializer
+from goals.access import get_board_roles, invalidate_board_roles
 from goals.models import GoalCategory, Goal, GoalComment, Board, BoardParticipant
 
 
@@ -15,16 +17,13 @@ class GoalCategoryCreateSerializer(serializers.ModelSerializer):
     def validate_board(self, board: Board) -> Board:
         if board.is_deleted:
             raise serializers.ValidationError("board is deleted")
-        if not BoardParticipant.objects.filter(
-                board_id=board.id,
-                role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer],
-                user=self.context['request'].user):
+        if not get_board_roles(self.context['request']).can_write(board.id):
             raise ValidationError('You dont have permission create category in this board')
         return board
 
     class Meta:
         model = GoalCategory
-        fields = "__all__"
+        exclude = ("search_vector", "sync_xid")
         read_only_fields = ("id", "created", "updated", "user", "is_deleted")
 
 
@@ -33,38 +32,76 @@ class GoalCategorySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = GoalCategory
-        fields = "__all__"
+        exclude = ("search_vector", "sync_xid")
         read_only_fields = ("id", "created", "updated", "user", "is_deleted")
 
 
 # Goal
 
+def check_writable_category(serializer: serializers.Serializer, value: GoalCategory) -> GoalCategory:
+    """Категория не удалена, и у пользователя есть право записи на ее доске"""
+    if value.is_deleted:
+        raise serializers.ValidationError("category not found")
+    if not get_board_roles(serializer.context['request']).can_write(value.board_id):
+        raise PermissionDenied
+    return value
+
+
 class GoalCreateSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+    # категории удаленной доски недоступны сразу, до фоновой архивации
+    category = serializers.PrimaryKeyRelatedField(queryset=GoalCategory.objects.filter(board__is_deleted=False))
 
     class Meta:
         model = Goal
         read_only_fields = ("id", "created", "updated", "user")
-        fields = "__all__"
+        exclude = ("search_vector", "sync_xid")
 
     def validate_category(self, value: GoalCategory) -> GoalCategory:
-        if value.is_deleted:
-            raise serializers.ValidationError("category not found")
-        if not BoardParticipant.objects.filter(
-                board_id=value.board_id,
-                role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer],
-                user=self.context['request'].user).exists():
-            raise PermissionDenied
-        return value
+        return check_writable_category(self, value)
+
+
+class PrefetchedCategoryField(serializers.PrimaryKeyRelatedField):
+    """Категория из context['categories'] ({id: GoalCategory}), загруженного одним запросом на весь пакет"""
+
+    def to_internal_value(self, data) -> GoalCategory:
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            category = self.context['categories'].get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if category is None:
+            self.fail('does_not_exist', pk_value=data)
+        return category
+
+
+class GoalBulkCreateSerializer(GoalCreateSerializer):
+    """Элемент goal/bulk_create"""
+    category = PrefetchedCategoryField(queryset=GoalCategory.objects.all())
+
+
+class GoalBulkUpdateSerializer(serializers.ModelSerializer):
+    """Элемент goal/bulk_update: id цели и меняемые поля"""
+    id = serializers.IntegerField()
+    category = PrefetchedCategoryField(queryset=GoalCategory.objects.all(), required=False)
+
+    class Meta:
+        model = Goal
+        fields = ("id", "category", "status", "priority", "due_date")
+
+    def validate_category(self, value: GoalCategory) -> GoalCategory:
+        return check_writable_category(self, value)
 
 
 class GoalSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    category = serializers.PrimaryKeyRelatedField(queryset=GoalCategory.objects.filter(board__is_deleted=False))
 
     class Meta:
         model = Goal
         read_only_fields = ("id", "created", "updated", "user")
-        fields = "__all__"
+        exclude = ("search_vector", "sync_xid")
 
     def validate_category(self, value):
         if value.is_deleted:
@@ -79,19 +116,17 @@ class GoalSerializer(serializers.ModelSerializer):
 
 class CommentSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+    goal = serializers.PrimaryKeyRelatedField(queryset=Goal.objects.visible().select_related('category'))
 
     class Meta:
         model = GoalComment
-        fields = "__all__"
+        exclude = ("sync_xid",)
         read_only_fields = ("id", "created", "updated", "user")
 
     def validate_goal(self, value: Goal) -> Goal:
         if value.status == Goal.Status.archived:
             raise serializers.ValidationError("Goal not found")
-        if not BoardParticipant.objects.filter(
-                board_id=value.category.board_id,
-                role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer],
-                user_id=self.context['request'].user).exists():
+        if not get_board_roles(self.context['request']).can_write(value.category.board_id):
             raise PermissionDenied
         return value
 
@@ -108,7 +143,7 @@ class BoardSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Board
-        fields = "__all__"
+        exclude = ("sync_xid",)
         read_only_fields = ("id", "created", "updated", "user", "is_deleted")
 
 
@@ -138,14 +173,20 @@ class BoarWithParticipantsSerializer(BoardSerializer):
     def update(self, instance: Board, validated_data: dict) -> Board:
         request: Request = self.context['request']
         with transaction.atomic():
-            BoardParticipant.objects.filter(board=instance).exclude(user=request.user).delete()
-            BoardParticipant.objects.bulk_create(
+            old_participants = BoardParticipant.objects.filter(board=instance).exclude(user=request.user)
+            old_user_ids = list(old_participants.values_list('user_id', flat=True))
+            old_participants.delete()
+            now = timezone.now()
+            new_participants = BoardParticipant.objects.bulk_create(
                 [
-                    BoardParticipant(user=participant['user'], role=participant['role'], board=instance)
+                    BoardParticipant(user=participant['user'], role=participant['role'], board=instance,
+                                     created=now, updated=now)
                     for participant in validated_data.get('participants', [])
                 ],
                 ignore_conflicts=True,
             )
+            # bulk_create не отправляет post_save, поэтому сбрасываем кэш ролей явно
+            invalidate_board_roles(*old_user_ids, *[participant.user_id for participant in new_participants])
             if title := validated_data.get('title'):
                 instance.title = title
                 instance.save()
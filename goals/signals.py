@@ -0,0 +1,80 @@
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from goals.access import invalidate_board_roles
+from goals.events import publish_event
+from goals.models import Board, BoardParticipant, Goal, GoalCategory, GoalComment, GoalCounter
+
+# Отправляется массовыми операциями GoalQuerySet (update_and_notify, bulk_create_and_notify,
+# bulk_update_and_notify): goal_ids, user_ids (авторы целей), fields ({поле: значение или None,
+# если значения у целей разные}), created=True для новых целей
+goals_bulk_updated = Signal()
+
+
+@receiver([post_save, post_delete], sender=BoardParticipant)
+def invalidate_participant_roles(sender, instance: BoardParticipant, **kwargs) -> None:
+    invalidate_board_roles(instance.user_id)
+
+
+@receiver(post_delete, sender=Goal)
+def decrement_goal_counter(sender, instance: Goal, using: str, **kwargs) -> None:
+    # Удаление (в том числе через QuerySet.delete) выполняется в транзакции, счетчик меняется в ней же
+    GoalCounter.objects.using(using).apply(Counter({instance.counter_key(): -1}))
+
+
+def _goal_board_id(goal: Goal) -> int:
+    if Goal.category.is_cached(goal):
+        return goal.category.board_id
+    return GoalCategory.objects.values_list('board_id', flat=True).get(pk=goal.category_id)
+
+
+@receiver(post_save, sender=Goal)
+def publish_goal_saved(sender, instance: Goal, created: bool, **kwargs) -> None:
+    action = 'created' if created else 'archived' if instance.status == Goal.Status.archived else 'updated'
+    publish_event(_goal_board_id(instance), 'goal', action, [instance.pk])
+
+
+@receiver(post_delete, sender=Goal)
+def publish_goal_deleted(sender, instance: Goal, **kwargs) -> None:
+    publish_event(_goal_board_id(instance), 'goal', 'deleted', [instance.pk])
+
+
+@receiver(goals_bulk_updated, sender=Goal)
+def publish_goals_bulk_updated(sender, goal_ids: list[int], fields: dict, created: bool = False, **kwargs) -> None:
+    if created:
+        action = 'created'
+    else:
+        action = 'archived' if fields.get('status') == Goal.Status.archived else 'updated'
+    by_board = {}
+    for goal_id, board_id in Goal.objects.filter(pk__in=goal_ids).values_list('pk', 'category__board_id'):
+        by_board.setdefault(board_id, []).append(goal_id)
+    for board_id, ids in by_board.items():
+        publish_event(board_id, 'goal', action, sorted(ids))
+
+
+@receiver(post_save, sender=GoalCategory)
+def publish_category_saved(sender, instance: GoalCategory, created: bool, **kwargs) -> None:
+    action = 'created' if created else 'deleted' if instance.is_deleted else 'updated'
+    publish_event(instance.board_id, 'category', action, [instance.pk])
+
+
+@receiver([post_save, post_delete], sender=GoalComment)
+def publish_comment_changed(sender, instance: GoalComment, created: bool = False, **kwargs) -> None:
+    action = 'created' if created else 'updated' if kwargs['signal'] is post_save else 'deleted'
+    board_id = Goal.objects.values_list('category__board_id', flat=True).get(pk=instance.goal_id)
+    publish_event(board_id, 'comment', action, [instance.pk])
+
+
+@receiver(post_save, sender=Board)
+def publish_board_saved(sender, instance: Board, created: bool, **kwargs) -> None:
+    # у новой доски еще нет участников, которым можно отправить событие
+    if not created:
+        publish_event(instance.pk, 'board', 'deleted' if instance.is_deleted else 'updated', [instance.pk])
+
+
+@receiver([post_save, post_delete], sender=BoardParticipant)
+def publish_participant_changed(sender, instance: BoardParticipant, created: bool = False, **kwargs) -> None:
+    action = 'created' if created else 'updated' if kwargs['signal'] is post_save else 'deleted'
+    publish_event(instance.board_id, 'participant', action, [instance.pk], user=instance.user_id)
@@ -0,0 +1,103 @@
+"""
+Статистика доски по счетчикам GoalCounter и сверка счетчиков с целями.
+
+Статистика читается только из счетчиков, поэтому ее стоимость не зависит от числа целей.
+"""
+import datetime
+from collections import Counter
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from goals.models import COUNTER_FIELDS, Board, Goal, GoalCategory, GoalCounter
+
+# Просроченными считаются цели в этих статусах со сроком раньше сегодняшнего дня
+OPEN_STATUSES = (Goal.Status.to_do, Goal.Status.in_progress)
+
+
+def _empty_stats() -> dict:
+    return {
+        'total': 0,
+        'overdue': 0,
+        'by_status': {status: 0 for status in Goal.Status.values},
+        'by_priority': {priority: 0 for priority in Goal.Priority.values},
+    }
+
+
+def board_stats(board: Board, today: Optional[datetime.date] = None) -> dict:
+    """
+    Количество целей доски и ее категорий по статусам, приоритетам и просроченные.
+
+    Архивные цели учитываются только в by_status, total, by_priority и overdue считаются
+    по неархивным целям, как в списке целей.
+    """
+    today = today or timezone.localdate()
+    categories = list(GoalCategory.objects.filter(board=board, is_deleted=False).order_by('title', 'pk').
+                      values('id', 'title'))
+    stats = {category['id']: {**category, **_empty_stats()} for category in categories}
+
+    rows = GoalCounter.objects.filter(category_id__in=stats).values('category_id', 'status', 'priority'). \
+        annotate(total=Sum('count'), overdue=Sum('count', filter=Q(due_date__lt=today, status__in=OPEN_STATUSES))). \
+        order_by()
+    for row in rows:
+        category = stats[row['category_id']]
+        category['by_status'][row['status']] += row['total']
+        if row['status'] == Goal.Status.archived:
+            continue
+        category['total'] += row['total']
+        category['by_priority'][row['priority']] += row['total']
+        category['overdue'] += row['overdue'] or 0
+
+    result = {'board': board.id, **_empty_stats(), 'categories': list(stats.values())}
+    for category in result['categories']:
+        result['total'] += category['total']
+        result['overdue'] += category['overdue']
+        for group in ('by_status', 'by_priority'):
+            for key, value in category[group].items():
+                result[group][key] += value
+    return result
+
+
+def reconcile_counters(category_ids: Optional[Iterable[int]] = None, repair: bool = True,
+                       batch_size: int = 100) -> dict[tuple, tuple[int, int]]:
+    """
+    Сверяет счетчики с фактическим числом целей, по умолчанию исправляя расхождения.
+
+    Категории обрабатываются пачками, каждая в своей транзакции с блокировкой целей
+    и счетчиков. Возвращает {ключ счетчика: (в счетчике, на самом деле)} для расхождений.
+    """
+    if category_ids is None:
+        category_ids = GoalCategory.objects.order_by('pk').values_list('pk', flat=True)
+    category_ids = list(category_ids)
+
+    drift = {}
+    for start in range(0, len(category_ids), batch_size):
+        batch = category_ids[start:start + batch_size]
+        with transaction.atomic():
+            list(Goal.objects.select_for_update().filter(category_id__in=batch).values_list('pk'))
+            counters = {row[:-2]: row[-2:] for row in GoalCounter.objects.select_for_update().
+                        filter(category_id__in=batch).values_list(*COUNTER_FIELDS, 'count', 'pk')}
+            actual = Counter(dict(
+                (row[:-1], row[-1]) for row in Goal.objects.filter(category_id__in=batch).
+                values_list(*COUNTER_FIELDS).annotate(count=Count('pk')).order_by()
+            ))
+
+            batch_drift = {}
+            for key in counters.keys() | actual.keys():
+                stored = counters[key][0] if key in counters else 0
+                if stored != actual[key]:
+                    batch_drift[key] = (stored, actual[key])
+            drift.update(batch_drift)
+            if not repair:
+                continue
+
+            for key, (stored, real) in batch_drift.items():
+                if key in counters:
+                    GoalCounter.objects.filter(pk=counters[key][1]).update(count=real)
+                else:
+                    GoalCounter.objects.create(count=real, **dict(zip(COUNTER_FIELDS, key)))
+            # пустые счетчики остаются после смены статусов и удаления целей
+            GoalCounter.objects.filter(category_id__in=batch, count=0).delete()
+    return drift
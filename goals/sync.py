@@ -0,0 +1,221 @@
+"""
+Инкрементальная синхронизация для офлайн-клиентов: GET goals/sync?since=<token>.
+
+Ответ содержит доски, категории, цели и комментарии досок пользователя, измененные после
+токена, и tombstone-id удаленных досок и категорий и архивных целей. Изменения выбираются
+по курсору (отметка, id) каждой таблицы (индексы *_sync_idx), не больше GOALS_SYNC_MAX_ITEMS
+за ответ; если изменений больше, has_more=true и клиент сразу запрашивает следующий токен.
+
+Отметка должна расти в порядке коммитов, иначе транзакция может зафиксировать строку позади
+уже выданного курсора. В PostgreSQL это sync_xid — номер транзакции, изменившей строку
+(TransactionClock): отдаются только строки транзакций с номером меньше xmin текущего снимка,
+то есть уже завершенных. Долгая транзакция задерживает синхронизацию всех досок, пока не
+завершится, но ничего не теряется. В других БД (SQLite в разработке) отметка — updated,
+назначаемый в приложении до коммита (WallClock): отдаются изменения старше
+now() - GOALS_SYNC_LAG, и записи транзакций дольше GOALS_SYNC_LAG могут быть пропущены.
+
+В токене хранится и список досок пользователя: если с тех пор пользователь получил доступ
+к новой доске, синхронизация начинается заново. Текущий список досок отдается в board_ids,
+доски не из него клиент удаляет. Жестко удаленные комментарии в синхронизацию не попадают.
+"""
+import base64
+import binascii
+import datetime
+import json
+from abc import ABC, abstractmethod
+from typing import Callable, Iterator, NamedTuple, Optional
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from goals.fast_serializers import compile_serializer
+from goals.models import Board, Goal, GoalCategory, GoalComment
+from goals.serializers import BoardSerializer, CommentWithUserSerializer, GoalCategorySerializer, GoalSerializer
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class SyncType(NamedTuple):
+    name: str
+    queryset: Callable[[list[int]], QuerySet]
+    serializer: type
+    is_tombstone: Optional[Callable[[dict], bool]]
+
+
+SYNC_TYPES = [
+    SyncType('boards', lambda board_ids: Board.objects.filter(pk__in=board_ids),
+             BoardSerializer, lambda row: row['is_deleted']),
+    SyncType('categories', lambda board_ids: GoalCategory.objects.filter(board_id__in=board_ids),
+             GoalCategorySerializer, lambda row: row['is_deleted']),
+    SyncType('goals', lambda board_ids: Goal.objects.filter(category__board_id__in=board_ids),
+             GoalSerializer, lambda row: row['status'] == Goal.Status.archived),
+    SyncType('comments', lambda board_ids: GoalComment.objects.filter(goal__category__board_id__in=board_ids),
+             CommentWithUserSerializer, None),
+]
+
+
+class Clock(ABC):
+    """Отметка изменения строки: поле модели, ее представление в токене и граница уже видимых изменений"""
+    field: str
+
+    @abstractmethod
+    def bound(self):
+        """Отметка, до которой (включительно) все изменения уже зафиксированы"""
+
+    def dump(self, value):
+        return value
+
+    @abstractmethod
+    def load(self, value):
+        """Значение из токена; ValueError — токен испорчен"""
+
+
+class TransactionClock(Clock):
+    """PostgreSQL: sync_xid из триггера goals_sync_xid_update; транзакции до xmin снимка завершены"""
+    field = 'sync_xid'
+
+    def bound(self) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT txid_snapshot_xmin(txid_current_snapshot())')
+            return cursor.fetchone()[0] - 1
+
+    def load(self, value) -> int:
+        if type(value) is not int:
+            raise ValueError(value)
+        return value
+
+
+class WallClock(Clock):
+    """updated с отставанием GOALS_SYNC_LAG"""
+    field = 'updated'
+
+    def __init__(self, now: Optional[datetime.datetime] = None) -> None:
+        self.now = now
+
+    def bound(self) -> datetime.datetime:
+        return (self.now or timezone.now()) - datetime.timedelta(seconds=settings.GOALS_SYNC_LAG)
+
+    def dump(self, value: datetime.datetime) -> str:
+        return value.isoformat()
+
+    def load(self, value) -> datetime.datetime:
+        parsed = parse_datetime(value) if isinstance(value, str) else None
+        if parsed is None:
+            raise ValueError(value)
+        return parsed
+
+
+def get_clock(now: Optional[datetime.datetime] = None) -> Clock:
+    return TransactionClock() if connection.vendor == 'postgresql' else WallClock(now)
+
+
+class SyncToken(NamedTuple):
+    # {тип: [отметка, id или None — все строки с этой отметкой уже отданы]}
+    positions: dict
+    board_ids: list[int]
+
+
+class SyncResult(NamedTuple):
+    board_ids: list[int]
+    changes: dict[str, list[dict]]
+    deleted: dict[str, list[int]]
+    token: str
+    has_more: bool
+
+
+def encode_token(token: SyncToken) -> str:
+    payload = {'p': token.positions, 'b': token.board_ids}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+
+def decode_token(value: str, clock: Optional[Clock] = None) -> SyncToken:
+    if not value:
+        return SyncToken({}, [])
+    clock = clock or get_clock()
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(value.encode()).decode())
+        positions = payload['p']
+        for name, (mark, pk) in positions.items():
+            clock.load(mark)
+            if not (pk is None or type(pk) is int):
+                raise ValueError(name)
+        return SyncToken(positions, [int(board_id) for board_id in payload['b']])
+    except (TypeError, KeyError, ValueError, AttributeError, binascii.Error):
+        raise InvalidToken
+
+
+def _after(queryset: QuerySet, clock: Clock, position: Optional[list]) -> QuerySet:
+    """Строки после курсора (отметка, id); __gte по отметке дает планировщику диапазон по индексу"""
+    if not position:
+        return queryset
+    mark, pk = clock.load(position[0]), position[1]
+    if pk is None:
+        return queryset.filter(**{f'{clock.field}__gt': mark})
+    return queryset.filter(**{f'{clock.field}__gte': mark}).filter(
+        Q(**{f'{clock.field}__gt': mark}) | Q(**{clock.field: mark, 'pk__gt': pk}))
+
+
+def collect_changes(board_ids: list[int], token: SyncToken, limit: Optional[int] = None,
+                    clock: Optional[Clock] = None) -> SyncResult:
+    """Изменения после token до границы clock, не больше limit строк"""
+    limit = limit or settings.GOALS_SYNC_MAX_ITEMS
+    clock = clock or get_clock()
+    bound = clock.bound()
+    board_ids = sorted(board_ids)
+    positions = dict(token.positions)
+    if set(board_ids) - set(token.board_ids):
+        positions = {}
+
+    changes, deleted, remaining, has_more = {}, {}, limit, False
+    for sync_type in SYNC_TYPES:
+        changes[sync_type.name], deleted[sync_type.name] = [], []
+        if has_more:
+            continue
+        compiled = compile_serializer(sync_type.serializer)
+        lookups = list(dict.fromkeys([*compiled.lookups, 'id', clock.field]))
+        queryset = _after(sync_type.queryset(board_ids).filter(**{f'{clock.field}__lte': bound}), clock,
+                          positions.get(sync_type.name))
+        rows = list(queryset.order_by(clock.field, 'pk').values(*lookups)[:remaining + 1])
+
+        if len(rows) > remaining:
+            rows, has_more = rows[:remaining], True
+            if rows:
+                positions[sync_type.name] = [clock.dump(rows[-1][clock.field]), rows[-1]['id']]
+        else:
+            # все строки до границы отданы; курсор не сдвигается назад
+            current = positions.get(sync_type.name)
+            if current is None or clock.load(current[0]) < bound:
+                positions[sync_type.name] = [clock.dump(bound), None]
+        remaining -= len(rows)
+
+        live = []
+        for row in rows:
+            if sync_type.is_tombstone and sync_type.is_tombstone(row):
+                deleted[sync_type.name].append(row['id'])
+            else:
+                live.append(row)
+        changes[sync_type.name] = compiled.serialize(live)
+
+    return SyncResult(board_ids, changes, deleted, encode_token(SyncToken(positions, board_ids)), has_more)
+
+
+def render_changes(result: SyncResult, chunk_size: int = 100) -> Iterator[str]:
+    """
+    JSON ответа по частям. Запросы к БД уже выполнены в collect_changes, поэтому генератор
+    можно отдавать в StreamingHttpResponse и под ASGI.
+    """
+    def dumps(value) -> str:
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+    yield '{"board_ids":' + dumps(result.board_ids)
+    for name, items in result.changes.items():
+        yield f',"{name}":['
+        for start in range(0, len(items), chunk_size):
+            yield (',' if start else '') + ','.join(dumps(item) for item in items[start:start + chunk_size])
+        yield ']'
+    yield f',"deleted":{dumps(result.deleted)},"token":{dumps(result.token)},"has_more":{dumps(result.has_more)}}}'
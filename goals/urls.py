@@ -9,6 +9,9 @@ urlpatterns = [
 
     path("goal/create", views.GoalCreateView.as_view(), name='create-goal'),
     path("goal/list", views.GoalListView.as_view(), name='goal-list'),
+    path("goal/bulk_create", views.GoalBulkCreateView.as_view(), name='goal-bulk-create'),
+    path("goal/bulk_update", views.GoalBulkUpdateView.as_view(), name='goal-bulk-update'),
+    path("goal/bulk_archive", views.GoalBulkArchiveView.as_view(), name='goal-bulk-archive'),
     path("goal/<pk>", views.GoalListDetailView.as_view(), name='goal'),
 
     path("goal_comment/create", views.CommentCreateView.as_view(), name='create-comment'),
@@ -18,6 +21,9 @@ urlpatterns = [
     path("board/create", views.BoardCreateView.as_view(), name='create-board'),
     path("board/list", views.BordListView.as_view(), name='board-list'),
     path("board/<pk>", views.BoardDetailView.as_view(), name='board'),
+    path("board/<pk>/stats", views.BoardStatsView.as_view(), name='board-stats'),
+
+    path("sync", views.SyncView.as_view(), name='sync'),
 ]
 
 
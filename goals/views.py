@@ -1,26 +1,67 @@
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
 from rest_framework import permissions
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.generics import (
     CreateAPIView,
+    GenericAPIView,
     ListAPIView,
+    RetrieveAPIView,
     RetrieveUpdateDestroyAPIView,
 )
-from rest_framework.pagination import LimitOffsetPagination
-from rest_framework import filters
+from rest_framework import filters, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.serializers import as_serializer_error
 from django_filters.rest_framework import DjangoFilterBackend
 
+from goals.access import get_board_roles
+from goals.conditional import ConditionalListMixin, ConditionalObjectMixin, Validators, make_etag
+from goals.fast_serializers import compile_serializer
 from goals.filters import GoalDateFilter
-from goals.models import GoalCategory, Goal, GoalComment, Board, BoardParticipant
-from goals.permissions import BoardPermissions, GoalCategoryPermissions, CommentPermissions
+from goals.models import ArchiveJob, GoalCategory, Goal, GoalComment, Board, BoardParticipant
+from goals.pagination import LimitOffsetOrKeysetPagination
+from goals.search import FullTextSearchFilter
+from goals.stats import board_stats
+from goals.sync import InvalidToken, collect_changes, decode_token, render_changes
+from goals.permissions import BoardPermissions, GoalCategoryPermissions, GoalPermissions, CommentPermissions
 from goals.serializers import (
     GoalCreateSerializer,
     GoalCategorySerializer,
     GoalSerializer,
     CommentSerializer,
     GoalCategoryCreateSerializer, BoardSerializer, BoarWithParticipantsSerializer, CommentWithUserSerializer,
+    GoalBulkCreateSerializer, GoalBulkUpdateSerializer,
 )
 
 
+class ValuesListMixin:
+    """
+    Быстрый read-only путь для списков: строки выбираются через `.values()`
+    и сериализуются скомпилированным сериализатором без создания моделей.
+    Выключается настройкой GOALS_FAST_LIST_SERIALIZATION.
+    """
+
+    def list(self, request, *args, **kwargs):
+        compiled = compile_serializer(self.get_serializer_class())
+        if compiled is None or not settings.GOALS_FAST_LIST_SERIALIZATION:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # поля сортировки нужны курсорной пагинации для позиции последней строки
+        ordering = [name.lstrip('-') for name in queryset.query.order_by if isinstance(name, str)]
+        ordering.append(queryset.model._meta.pk.name)
+        extra = [name for name in dict.fromkeys(ordering) if name not in compiled.lookups and name != 'pk']
+        queryset = queryset.values(*compiled.lookups, *extra)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(compiled.serialize(page))
+        return Response(compiled.serialize(queryset))
+
+
 # GoalCategory
 
 class GoalCategoryCreateView(CreateAPIView):
@@ -29,32 +70,37 @@ class GoalCategoryCreateView(CreateAPIView):
     serializer_class = GoalCategoryCreateSerializer
 
 
-class GoalCategoryListView(ListAPIView):
+class GoalCategoryListView(ConditionalListMixin, ValuesListMixin, ListAPIView):
+    read_from_replica = True
+    nested_updated = ('user__updated',)
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = GoalCategorySerializer
-    pagination_class = LimitOffsetPagination
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
+    pagination_class = LimitOffsetOrKeysetPagination
+    filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
     ordering_fields = ["title", "created"]
     ordering = ["title"]
     search_fields = ["title"]
 
     def get_queryset(self):
-        return GoalCategory.objects.filter(board__participants__user=self.request.user). \
-            exclude(is_deleted=True)
+        return GoalCategory.objects.visible().select_related('user'). \
+            filter(board_id__in=get_board_roles(self.request).board_ids)
 
 
-class GoalCategoryDetailView(RetrieveUpdateDestroyAPIView):
+class GoalCategoryDetailView(ConditionalObjectMixin, RetrieveUpdateDestroyAPIView):
+    read_from_replica = True
+    nested_updated = ('user__updated',)
     serializer_class = GoalCategorySerializer
     permission_classes = [GoalCategoryPermissions]
 
     def get_queryset(self):
-        return GoalCategory.objects.exclude(is_deleted=True)
+        return GoalCategory.objects.visible().select_related('user')
 
     def perform_destroy(self, instance: GoalCategory) -> None:
+        # Категория скрывается сразу, ее цели архивирует archive_worker пачками
         with transaction.atomic():
             instance.is_deleted = True
             instance.save(update_fields=['is_deleted'])
-            instance.goal_set.update(status=Goal.Status.archived)
+            ArchiveJob.objects.create(category=instance)
 
 
 # Goal
@@ -64,33 +110,165 @@ class GoalCreateView(CreateAPIView):
     serializer_class = GoalCreateSerializer
 
 
-class GoalListView(ListAPIView):
+class GoalListView(ConditionalListMixin, ValuesListMixin, ListAPIView):
+    read_from_replica = True
+    nested_updated = ('user__updated',)
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = GoalSerializer
-    pagination_class = LimitOffsetPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = LimitOffsetOrKeysetPagination
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_class = GoalDateFilter
     ordering_fields = ["title", "created"]
     search_fields = ["title", "description"]
     ordering = ["title"]
 
     def get_queryset(self):
-        return Goal.objects.filter(
-            category__board__participants__user=self.request.user).exclude(status=Goal.Status.archived)
+        return Goal.objects.visible().select_related('user').filter(
+            category__board_id__in=get_board_roles(self.request).board_ids)
 
 
-class GoalListDetailView(RetrieveUpdateDestroyAPIView):
+class GoalListDetailView(ConditionalObjectMixin, RetrieveUpdateDestroyAPIView):
+    read_from_replica = True
+    nested_updated = ('user__updated',)
     serializer_class = GoalSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, GoalPermissions]
 
     def get_queryset(self):
-        return Goal.objects.exclude(status=Goal.Status.archived)
+        return Goal.objects.visible().select_related('category', 'user')
 
     def perform_destroy(self, instance: Goal) -> None:
         instance.status = Goal.Status.archived
         instance.save(update_fields=['status'])
 
 
+class GoalBulkMixin:
+    """
+    Общая часть массовых операций над целями.
+
+    Тело запроса — список элементов (не больше GOALS_BULK_MAX_ITEMS). Права проверяются по ролям
+    пользователя, загруженным один раз на запрос, категории загружаются одним запросом на пакет.
+    Ответ — {"results": [...]} с результатом каждого элемента по его индексу: 200/201, если
+    все элементы выполнены, 207 — если часть, 400 — если ни один.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    success_status = status.HTTP_200_OK
+
+    def get_items(self) -> list:
+        items = self.request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError('Expected a non-empty list')
+        if len(items) > settings.GOALS_BULK_MAX_ITEMS:
+            raise ValidationError(f'No more than {settings.GOALS_BULK_MAX_ITEMS} items per request')
+        return items
+
+    def get_serializer_context(self) -> dict:
+        context = super().get_serializer_context()
+        category_ids = set()
+        for item in self.get_items():
+            category_id = item.get('category') if isinstance(item, dict) else None
+            if isinstance(category_id, int) or isinstance(category_id, str) and category_id.isdigit():
+                category_ids.add(int(category_id))
+        context['categories'] = GoalCategory.objects.filter(board__is_deleted=False).in_bulk(category_ids)
+        return context
+
+    def validate_items(self, results: list) -> list[tuple[int, dict]]:
+        """Проверяет элементы сериализатором, ошибки записывает в results; возвращает (индекс, данные)"""
+        # один экземпляр на пакет, как child у ListSerializer: поля строятся один раз
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        valid = []
+        for index, item in enumerate(self.get_items()):
+            try:
+                valid.append((index, serializer.run_validation(item)))
+            except ValidationError as exc:
+                results[index] = self.error(index, status.HTTP_400_BAD_REQUEST, as_serializer_error(exc))
+            except PermissionDenied as exc:
+                results[index] = self.error(index, status.HTTP_403_FORBIDDEN, {'detail': exc.detail})
+        return valid
+
+    @staticmethod
+    def error(index: int, code: int, errors: dict) -> dict:
+        return {'index': index, 'status': code, 'errors': errors}
+
+    def bulk_response(self, results: list[dict]) -> Response:
+        failed = sum(1 for result in results if 'errors' in result)
+        if not failed:
+            code = self.success_status
+        elif failed == len(results):
+            code = status.HTTP_400_BAD_REQUEST
+        else:
+            code = status.HTTP_207_MULTI_STATUS
+        return Response({'results': results}, status=code)
+
+
+class GoalBulkCreateView(GoalBulkMixin, GenericAPIView):
+    """Создание целей пакетом: один bulk_create в транзакции"""
+    serializer_class = GoalBulkCreateSerializer
+    success_status = status.HTTP_201_CREATED
+
+    def post(self, request, *args, **kwargs):
+        results = [None] * len(self.get_items())
+        valid = self.validate_items(results)
+        goals = Goal.objects.bulk_create_and_notify([Goal(**data) for _, data in valid])
+        for (index, _), goal in zip(valid, goals):
+            results[index] = {'index': index, 'status': status.HTTP_201_CREATED, 'id': goal.id}
+        return self.bulk_response(results)
+
+
+class GoalBulkUpdateView(GoalBulkMixin, GenericAPIView):
+    """Изменение статуса, приоритета, категории и срока целей пакетом: один bulk_update в транзакции"""
+    serializer_class = GoalBulkUpdateSerializer
+
+    def patch(self, request, *args, **kwargs):
+        results = [None] * len(self.get_items())
+        valid = self.validate_items(results)
+        board_roles = get_board_roles(request)
+        with transaction.atomic():
+            goals = Goal.objects.visible().select_for_update(of=('self',)).select_related('category'). \
+                in_bulk([data['id'] for _, data in valid])
+            changed, fields = {}, set()
+            for index, data in valid:
+                goal = goals.get(data['id'])
+                if goal is None or not board_roles.can_read(goal.category.board_id):
+                    results[index] = self.error(index, status.HTTP_404_NOT_FOUND, {'id': ['Goal not found']})
+                elif not board_roles.can_write(goal.category.board_id):
+                    results[index] = self.error(
+                        index, status.HTTP_403_FORBIDDEN, {'detail': PermissionDenied.default_detail})
+                elif goal.id in changed:
+                    results[index] = self.error(index, status.HTTP_400_BAD_REQUEST, {'id': ['Duplicate goal']})
+                else:
+                    for name, value in data.items():
+                        if name != 'id':
+                            setattr(goal, name, value)
+                            fields.add(name)
+                    changed[goal.id] = goal
+                    results[index] = {'index': index, 'status': status.HTTP_200_OK, 'id': goal.id}
+            Goal.objects.bulk_update_and_notify(list(changed.values()), sorted(fields))
+        return self.bulk_response(results)
+
+
+class GoalBulkArchiveView(GoalBulkMixin, GenericAPIView):
+    """Архивация целей по списку id: один update в транзакции"""
+
+    def post(self, request, *args, **kwargs):
+        items = self.get_items()
+        board_roles = get_board_roles(request)
+        goal_ids = {item for item in items if isinstance(item, int) and not isinstance(item, bool)}
+        goals = dict(Goal.objects.visible().filter(pk__in=goal_ids).values_list('pk', 'category__board_id'))
+        results, archived = [], set()
+        for index, goal_id in enumerate(items):
+            if isinstance(goal_id, bool) or not isinstance(goal_id, int):
+                results.append(self.error(index, status.HTTP_400_BAD_REQUEST, {'id': ['A valid integer is required']}))
+            elif goal_id not in goals or not board_roles.can_read(goals[goal_id]):
+                results.append(self.error(index, status.HTTP_404_NOT_FOUND, {'id': ['Goal not found']}))
+            elif not board_roles.can_write(goals[goal_id]):
+                results.append(self.error(index, status.HTTP_403_FORBIDDEN, {'detail': PermissionDenied.default_detail}))
+            else:
+                archived.add(goal_id)
+                results.append({'index': index, 'status': status.HTTP_200_OK, 'id': goal_id})
+        Goal.objects.filter(pk__in=archived).update_and_notify(status=Goal.Status.archived)
+        return self.bulk_response(results)
+
+
 # Comment
 
 class CommentCreateView(CreateAPIView):
@@ -98,56 +276,78 @@ class CommentCreateView(CreateAPIView):
     serializer_class = CommentSerializer
 
 
-class CommentListView(ListAPIView):
+class CommentListView(ConditionalListMixin, ValuesListMixin, ListAPIView):
+    read_from_replica = True
+    nested_updated = ('user__updated',)
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = CommentWithUserSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = LimitOffsetOrKeysetPagination
     filter_backends = [filters.OrderingFilter, DjangoFilterBackend]
     filterset_fields = ['goal']
     ordering = ['-created']
 
     def get_queryset(self):
-        return GoalComment.objects.filter(
-            goal__category__board__participants__user=self.request.user)
+        return GoalComment.objects.select_related('user').filter(
+            goal__category__board_id__in=get_board_roles(self.request).board_ids,
+            goal__category__is_deleted=False, goal__category__board__is_deleted=False)
 
 
-class CommentDetailView(RetrieveUpdateDestroyAPIView):
+class CommentDetailView(ConditionalObjectMixin, RetrieveUpdateDestroyAPIView):
+    read_from_replica = True
+    nested_updated = ('user__updated',)
     permission_classes = [CommentPermissions]
     serializer_class = CommentWithUserSerializer
 
     def get_queryset(self):
         return GoalComment.objects.select_related("user").filter(
-            goal__category__board__participants__user=self.request.user)
+            goal__category__board_id__in=get_board_roles(self.request).board_ids,
+            goal__category__is_deleted=False, goal__category__board__is_deleted=False)
 
 
 # Board
 
-class BoardDetailView(RetrieveUpdateDestroyAPIView):
+class BoardDetailView(ConditionalObjectMixin, RetrieveUpdateDestroyAPIView):
+    read_from_replica = True
     permission_classes = [BoardPermissions]
     serializer_class = BoarWithParticipantsSerializer
     queryset = Board.objects.prefetch_related('participants__user').exclude(is_deleted=True)
 
+    def object_validators(self, instance: Board) -> Validators:
+        # В ответе есть участники, а их изменения не трогают updated доски. Без Last-Modified:
+        # после удаления участника max(updated) оставшихся может уменьшиться (goals.conditional)
+        participants = instance.participants.aggregate(updated=Max('updated'), count=Count('pk'))
+        etag = make_etag(Board._meta.label, instance.pk, instance.updated.isoformat(),
+                         participants['count'], participants['updated'])
+        return Validators(etag, None)
+
     def perform_destroy(self, instance: Board) -> None:
-        # При удалении доски помечаем ее как is_deleted,
-        # «удаляем» категории, обновляем статус целей
+        # При удалении доски помечаем ее как is_deleted, категории и цели
+        # «удаляет» и архивирует archive_worker пачками
         with transaction.atomic():
             instance.is_deleted = True
             instance.save()
-            instance.categories.update(is_deleted=True)
-            Goal.objects.filter(category__board=instance).update(
-                status=Goal.Status.archived
-            )
+            ArchiveJob.objects.create(board=instance)
+
+
+class BoardStatsView(RetrieveAPIView):
+    """Количество целей доски по статусам, приоритетам и просроченные (из счетчиков GoalCounter)"""
+    permission_classes = [BoardPermissions]
+    queryset = Board.objects.exclude(is_deleted=True)
 
+    def retrieve(self, request, *args, **kwargs):
+        return Response(board_stats(self.get_object()))
 
-class BordListView(ListAPIView):
+
+class BordListView(ConditionalListMixin, ValuesListMixin, ListAPIView):
+    read_from_replica = True
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = BoardSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = LimitOffsetOrKeysetPagination
     filter_backends = [filters.OrderingFilter]
     ordering = ["title", ]
 
     def get_queryset(self):
-        return Board.objects.filter(participants__user=self.request.user).exclude(is_deleted=True)
+        return Board.objects.filter(id__in=get_board_roles(self.request).board_ids).exclude(is_deleted=True)
 
 
 class BoardCreateView(CreateAPIView):
@@ -157,3 +357,16 @@ class BoardCreateView(CreateAPIView):
     def perform_create(self, serializer: BoardSerializer) -> None:
         board = serializer.save()
         BoardParticipant.objects.create(user=self.request.user, board=board, role=BoardParticipant.Role.owner)
+
+
+class SyncView(APIView):
+    """Изменения досок пользователя после токена since (goals.sync), ответ отдается потоком"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            token = decode_token(request.query_params.get('since', ''))
+        except InvalidToken:
+            raise ValidationError({'since': ['Invalid sync token.']})
+        result = collect_changes(get_board_roles(request).board_ids, token)
+        return StreamingHttpResponse(render_changes(result), content_type='application/json')
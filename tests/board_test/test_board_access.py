@@ -0,0 +1,81 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from goals.models import BoardParticipant
+from tests.factories import BoardFactory, BoardParticipantFactory, CategoryFactory, GoalFactory, GoalCommentFactory
+
+# Поиск участника доски по пользователю (не путать с выборкой всех участников доски)
+MEMBERSHIP_LOOKUP = re.compile(r'(?<!NOT \()"goals_boardparticipant"\."user_id" = ')
+
+
+def membership_lookups(queries: CaptureQueriesContext) -> int:
+    return sum(
+        1 for query in queries.captured_queries
+        if query['sql'].startswith('SELECT') and MEMBERSHIP_LOOKUP.search(query['sql'])
+    )
+
+
+@pytest.mark.django_db
+class TestBoardAccessQueries:
+    """ Каждый эндпоинт ищет участника доски не более одного раза за запрос """
+
+    @pytest.fixture()
+    def objects(self, user):
+        board = BoardFactory()
+        BoardParticipantFactory(board=board, user=user, role=BoardParticipant.Role.owner)
+        category = CategoryFactory(board=board, user=user)
+        goal = GoalFactory(category=category, user=user)
+        comment = GoalCommentFactory(goal=goal, user=user)
+        return {'board': board, 'category': category, 'goal': goal, 'comment': comment}
+
+    @pytest.mark.parametrize('method, url_name, kwarg, payload', [
+        ('post', 'create-category', None, lambda o: {'board': o['board'].id, 'title': 'category'}),
+        ('get', 'category', 'category', None),
+        ('patch', 'category', 'category', lambda o: {'title': 'renamed'}),
+        ('post', 'create-goal', None, lambda o: {'category': o['category'].id, 'title': 'goal'}),
+        ('get', 'goal', 'goal', None),
+        ('patch', 'goal', 'goal', lambda o: {'title': 'renamed'}),
+        ('post', 'create-comment', None, lambda o: {'goal': o['goal'].id, 'text': 'comment'}),
+        ('get', 'comment', 'comment', None),
+        ('get', 'board', 'board', None),
+        ('patch', 'board', 'board', lambda o: {'title': 'renamed', 'participants': []}),
+        ('get', 'goal-list', None, None),
+        ('get', 'category-list', None, None),
+        ('get', 'comment-list', None, None),
+        ('get', 'board-list', None, None),
+        ('get', 'board-stats', 'board', None),
+    ])
+    def test_single_membership_lookup(self, auth_client, objects, method, url_name, kwarg, payload) -> None:
+        url = reverse(url_name, kwargs={'pk': objects[kwarg].pk} if kwarg else None)
+        data = payload(objects) if payload else None
+
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(auth_client, method)(url, data=data)
+
+        assert response.status_code in (status.HTTP_200_OK, status.HTTP_201_CREATED), response.content
+        assert membership_lookups(queries) <= 1, "Повторные запросы участника доски"
+
+    def test_goal_detail_not_participant(self, auth_client, another_user) -> None:
+        """ Цель чужой доски недоступна """
+        board = BoardFactory()
+        BoardParticipantFactory(board=board, user=another_user)
+        goal = GoalFactory(category=CategoryFactory(board=board))
+
+        response = auth_client.get(reverse('goal', kwargs={'pk': goal.pk}))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_goal_update_reader(self, auth_client, user) -> None:
+        """ Читатель не может редактировать цель """
+        board = BoardFactory()
+        BoardParticipantFactory(board=board, user=user, role=BoardParticipant.Role.reader)
+        goal = GoalFactory(category=CategoryFactory(board=board))
+
+        response = auth_client.patch(reverse('goal', kwargs={'pk': goal.pk}), data={'title': 'renamed'})
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,83 @@
+import datetime
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from goals.archive import claim_job
+from goals.models import ArchiveJob, Goal, GoalCategory
+from goals.stats import reconcile_counters
+from tests.factories import BoardFactory, BoardParticipantFactory, CategoryFactory, GoalCommentFactory, GoalFactory
+
+
+@pytest.fixture()
+def board(user):
+    board = BoardFactory()
+    BoardParticipantFactory(board=board, user=user)
+    return board
+
+
+@pytest.fixture()
+def category(board, user):
+    return CategoryFactory(board=board, user=user)
+
+
+def run_worker(*args: str) -> str:
+    out = StringIO()
+    call_command('archive_worker', '--once', *args, stdout=out)
+    return out.getvalue()
+
+
+@pytest.mark.django_db
+class TestBackgroundArchive:
+
+    def test_category_delete(self, auth_client, user, category) -> None:
+        """ Цели удаленной категории скрыты сразу, архивируются воркером пачками """
+        goals = GoalFactory.create_batch(5, category=category, user=user)
+        GoalCommentFactory(goal=goals[0], user=user)
+
+        response = auth_client.delete(reverse('category', args=[category.id]))
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert not Goal.objects.filter(status=Goal.Status.archived).exists(), 'Архивация выполняется в фоне'
+        assert auth_client.get(reverse('goal-list')).json() == []
+        assert auth_client.get(reverse('comment-list')).json() == []
+        assert auth_client.get(reverse('goal', args=[goals[0].id])).status_code == status.HTTP_404_NOT_FOUND
+
+        output = run_worker('--batch-size', '2')
+
+        assert set(Goal.objects.values_list('status', flat=True)) == {Goal.Status.archived}
+        job = ArchiveJob.objects.get()
+        assert (job.status, job.processed, job.total) == (ArchiveJob.Status.done, 5, 5)
+        assert output.count('\n') == 4, 'Прогресс после каждой из трех пачек и при завершении'
+        assert reconcile_counters(repair=False) == {}
+
+    def test_board_delete(self, auth_client, user, board, category) -> None:
+        """ Категории и цели удаленной доски скрыты сразу, новые цели в них не создаются """
+        GoalFactory.create_batch(3, category=category, user=user)
+
+        response = auth_client.delete(reverse('board', args=[board.id]))
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert auth_client.get(reverse('category-list')).json() == []
+        assert auth_client.get(reverse('goal-list')).json() == []
+        response = auth_client.post(reverse('create-goal'), {'category': category.id, 'title': 'new'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        run_worker()
+
+        assert set(Goal.objects.values_list('status', flat=True)) == {Goal.Status.archived}
+        assert GoalCategory.objects.get().is_deleted
+        assert not ArchiveJob.objects.exclude(status=ArchiveJob.Status.done).exists()
+
+    def test_claim_stale_job(self, category) -> None:
+        """ Зависшая задача берется повторно, выполняющаяся — нет """
+        job = ArchiveJob.objects.create(category=category)
+        assert claim_job().pk == job.pk
+        assert claim_job() is None, 'Задача уже выполняется'
+
+        ArchiveJob.objects.filter(pk=job.pk).update(updated=timezone.now() - datetime.timedelta(hours=1))
+        assert claim_job(stale_after=60).pk == job.pk
@@ -0,0 +1,252 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.conf import settings as django_settings
+from django.db import OperationalError, connection, connections
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from goals import events
+from goals.models import BoardParticipant, Goal
+from goals.realtime import CLOSE_FORBIDDEN, CLOSE_GONE, CLOSE_OVERFLOW
+from tests.factories import BoardFactory, BoardParticipantFactory, CategoryFactory, GoalFactory
+from todolist.asgi import application
+
+
+@pytest.fixture()
+def category(user):
+    board = BoardFactory()
+    BoardParticipantFactory(board=board, user=user, role=BoardParticipant.Role.owner)
+    return CategoryFactory(board=board, user=user)
+
+
+@pytest.fixture()
+def published(monkeypatch) -> list[dict]:
+    published = []
+
+    class RecordingBroker:
+        publish = staticmethod(published.append)
+
+    monkeypatch.setattr(events, 'get_broker', RecordingBroker)
+    return published
+
+
+class Connection:
+    """ ASGI-соединение с приложением todolist.asgi """
+
+    def __init__(self, scope_type: str, path: str, session_key: str = '', origin: str = '') -> None:
+        headers = [(b'host', b'testserver')]
+        if session_key:
+            headers.append((b'cookie', f'{django_settings.SESSION_COOKIE_NAME}={session_key}'.encode()))
+        if origin:
+            headers.append((b'origin', origin.encode()))
+        scope = {'type': scope_type, 'path': path, 'method': 'GET', 'headers': headers, 'query_string': b''}
+        self.inbox, self.outbox = asyncio.Queue(), asyncio.Queue()
+        self.task = asyncio.ensure_future(application(scope, self.inbox.get, self.outbox.put))
+
+    async def output(self) -> dict:
+        return await asyncio.wait_for(self.outbox.get(), 5)
+
+    async def finished(self) -> None:
+        await asyncio.wait_for(self.task, 5)
+
+
+async def in_thread(func, *args, **kwargs):
+    """ ORM-вызов из event loop; соединение потока закрывается, иначе оно мешает удалить тестовую БД """
+    def call():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connections.close_all()
+
+    return await sync_to_async(call)()
+
+
+def session_key(client, user) -> str:
+    client.force_login(user)
+    return client.cookies[django_settings.SESSION_COOKIE_NAME].value
+
+
+@pytest.mark.django_db
+class TestBoardEventsPublishing:
+
+    def test_events(self, auth_client, user, another_user, category, published,
+                    django_capture_on_commit_callbacks) -> None:
+        """ Изменения целей, категорий, комментариев и участников публикуются после коммита """
+        board_id = category.board_id
+        with django_capture_on_commit_callbacks(execute=True):
+            goal_id = auth_client.post(reverse('create-goal'), {'category': category.id, 'title': 'goal'}).json()['id']
+            comment_id = auth_client.post(reverse('create-comment'), {'goal': goal_id, 'text': 'text'}).json()['id']
+            auth_client.patch(reverse('category', args=[category.id]), {'title': 'renamed'})
+            participant_id = BoardParticipantFactory(board=category.board, user=another_user).id
+            BoardParticipant.objects.filter(pk=participant_id).delete()
+            auth_client.post(reverse('goal-bulk-archive'), [goal_id], format='json')
+
+        assert published == [
+            {'board': board_id, 'type': 'goal', 'action': 'created', 'ids': [goal_id]},
+            {'board': board_id, 'type': 'comment', 'action': 'created', 'ids': [comment_id]},
+            {'board': board_id, 'type': 'category', 'action': 'updated', 'ids': [category.id]},
+            {'board': board_id, 'type': 'participant', 'action': 'created', 'ids': [participant_id],
+             'user': another_user.id},
+            {'board': board_id, 'type': 'participant', 'action': 'deleted', 'ids': [participant_id],
+             'user': another_user.id},
+            {'board': board_id, 'type': 'goal', 'action': 'archived', 'ids': [goal_id]},
+        ]
+
+    def test_not_published_on_rollback(self, user, category, published, django_capture_on_commit_callbacks) -> None:
+        with django_capture_on_commit_callbacks(execute=False):
+            GoalFactory(category=category, user=user)
+
+        assert published == [], 'Событие публикуется только после коммита'
+
+    def test_bulk_events_split_by_board(self, user, category, published, django_capture_on_commit_callbacks,
+                                        monkeypatch) -> None:
+        monkeypatch.setattr(events, 'MAX_EVENT_IDS', 2)
+        other_category = CategoryFactory(user=user)
+        goals = GoalFactory.create_batch(3, category=category, user=user)
+        other_goal = GoalFactory(category=other_category, user=user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Goal.objects.filter(user=user).update_and_notify(priority=Goal.Priority.high)
+
+        assert sorted((event['board'], event['ids']) for event in published) == sorted([
+            (category.board_id, [goals[0].id, goals[1].id]),
+            (category.board_id, [goals[2].id]),
+            (other_category.board_id, [other_goal.id]),
+        ])
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBoardEventsConnections:
+
+    def test_websocket(self, client, user, category) -> None:
+        """ Участник доски получает события доски, отключается при исключении из участников """
+        key = session_key(client, user)
+
+        async def scenario():
+            connection = Connection('websocket', f'/goals/board/{category.board_id}/events', key)
+            await connection.inbox.put({'type': 'websocket.connect'})
+            assert (await connection.output())['type'] == 'websocket.accept'
+
+            goal = await in_thread(GoalFactory, category=category, user=user)
+            message = await connection.output()
+            assert json.loads(message['text']) == {'board': category.board_id, 'type': 'goal',
+                                                   'action': 'created', 'ids': [goal.id]}
+
+            await in_thread(BoardParticipant.objects.filter(user=user).delete)
+            assert json.loads((await connection.output())['text'])['action'] == 'deleted'
+            assert await connection.output() == {'type': 'websocket.close', 'code': CLOSE_GONE}
+            await connection.finished()
+
+        asyncio.run(scenario())
+
+    @pytest.mark.parametrize('origin, participant', [('', False), ('https://evil.example', True)])
+    def test_websocket_forbidden(self, client, user, another_user, category, origin, participant) -> None:
+        """ Чужая доска и подключение с чужого сайта отклоняются """
+        key = session_key(client, user if participant else another_user)
+
+        async def scenario():
+            connection = Connection('websocket', f'/goals/board/{category.board_id}/events', key, origin)
+            await connection.inbox.put({'type': 'websocket.connect'})
+            assert await connection.output() == {'type': 'websocket.close', 'code': CLOSE_FORBIDDEN}
+            await connection.finished()
+
+        asyncio.run(scenario())
+
+    def test_websocket_overflow(self, client, settings, user, category) -> None:
+        """ Клиент, не успевающий читать события, отключается """
+        settings.GOALS_EVENTS_QUEUE_SIZE = 2
+        key = session_key(client, user)
+
+        async def scenario():
+            connection = Connection('websocket', f'/goals/board/{category.board_id}/events', key)
+            await connection.inbox.put({'type': 'websocket.connect'})
+            await connection.output()
+            # события приходят быстрее, чем подключение успевает их отправить
+            for goal_id in range(5):
+                events.get_broker().deliver({'board': category.board_id, 'type': 'goal', 'action': 'updated',
+                                             'ids': [goal_id]})
+            assert await connection.output() == {'type': 'websocket.close', 'code': CLOSE_OVERFLOW}
+            await connection.finished()
+
+        asyncio.run(scenario())
+
+    def test_event_stream(self, client, settings, user, another_user, category) -> None:
+        settings.GOALS_EVENTS_HEARTBEAT = 0.05
+        key, other_key = session_key(client, user), session_key(APIClient(), another_user)
+
+        async def scenario():
+            forbidden = Connection('http', f'/goals/board/{category.board_id}/events', other_key)
+            assert (await forbidden.output())['status'] == 403
+
+            connection = Connection('http', f'/goals/board/{category.board_id}/events', key)
+            start = await connection.output()
+            assert start['status'] == 200 and (b'content-type', b'text/event-stream') in start['headers']
+            assert (await connection.output())['body'] == b': ping\n\n', 'Ping при простое'
+
+            goal = await in_thread(GoalFactory, category=category, user=user)
+            while (body := (await connection.output())['body']) == b': ping\n\n':
+                pass
+            assert body.startswith(b'event: goal\ndata: ') and str(goal.id).encode() in body
+
+            await connection.inbox.put({'type': 'http.disconnect'})
+            await connection.finished()
+            assert events.get_broker().subscribers(category.board_id) == 0
+
+        asyncio.run(scenario())
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql', reason='NOTIFY/LISTEN только в PostgreSQL')
+    def test_postgres_broker(self, client, settings, user, category) -> None:
+        """ PostgresBroker доставляет события через NOTIFY, как из другого процесса """
+        settings.GOALS_EVENTS_BROKER = 'goals.events.PostgresBroker'
+        key = session_key(client, user)
+
+        async def scenario():
+            websocket = Connection('websocket', f'/goals/board/{category.board_id}/events', key)
+            await websocket.inbox.put({'type': 'websocket.connect'})
+            await websocket.output()
+            await asyncio.sleep(0.5)  # поток-слушатель выполняет LISTEN
+
+            goal = await in_thread(GoalFactory, category=category, user=user)
+            assert json.loads((await websocket.output())['text'])['ids'] == [goal.id]
+            await websocket.inbox.put({'type': 'websocket.disconnect'})
+            await websocket.finished()
+
+        try:
+            asyncio.run(scenario())
+        finally:
+            events.get_broker().stop()
+
+    def test_postgres_listener_restarted(self, monkeypatch) -> None:
+        """ Слушатель переподключается после ошибок БД, а упавший поток запускает следующая подписка """
+        import psycopg2
+
+        attempts, release = [], threading.Event()
+
+        def connect(**params):
+            attempts.append(params)
+            if len(attempts) == 1:
+                raise OperationalError('No database connection available')
+            release.wait(5)
+            raise RuntimeError('unexpected')
+
+        monkeypatch.setattr(psycopg2, 'connect', connect)
+        monkeypatch.setattr(events.time, 'sleep', lambda seconds: None)
+        broker = events.PostgresBroker()
+
+        async def scenario():
+            with broker.subscribe(1, 1):
+                listener = broker._listener
+                release.set()
+                listener.join(5)
+                assert len(attempts) == 2, 'После OperationalError Django слушатель подключается снова'
+                assert broker._listener is None
+            with broker.subscribe(1, 1):
+                assert broker._listener not in (None, listener)
+                broker._listener.join(5)
+
+        asyncio.run(scenario())
+        assert len(attempts) == 3
@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+from django.core.cache import caches
+from django.db import connection
+from django.conf import settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from goals.access import BoardRoles, _current_version, _roles_key, load_board_roles
+from goals.models import BoardParticipant
+from tests.factories import BoardFactory, BoardParticipantFactory
+
+
+@pytest.mark.django_db
+class TestBoardRolesCache:
+    """ Тесты кэша ролей пользователя на досках """
+
+    def test_roles_served_from_cache(self, user, django_assert_num_queries) -> None:
+        """ Повторное чтение ролей не обращается к БД """
+        board = BoardFactory()
+        BoardParticipantFactory(board=board, user=user)
+        load_board_roles(user.id)
+
+        with django_assert_num_queries(0):
+            roles = load_board_roles(user.id)
+
+        assert roles == {board.id: BoardParticipant.Role.owner}
+
+    def test_participant_save_invalidates(self, user) -> None:
+        """ Изменение роли через save() сбрасывает кэш """
+        participant = BoardParticipantFactory(user=user)
+        load_board_roles(user.id)
+
+        participant.role = BoardParticipant.Role.reader
+        participant.save(update_fields=['role'])
+
+        assert load_board_roles(user.id) == {participant.board_id: BoardParticipant.Role.reader}
+
+    def test_participant_delete_invalidates(self, user) -> None:
+        """ Удаление участника сбрасывает кэш """
+        participant = BoardParticipantFactory(user=user)
+        load_board_roles(user.id)
+
+        participant.delete()
+
+        assert load_board_roles(user.id) == {}
+
+    def test_stale_write_after_invalidation_is_ignored(self, user) -> None:
+        """
+        Чтение, начавшееся до изменения участников, не может положить в кэш
+        устаревшие роли так, чтобы их прочитали после изменения
+        """
+        participant = BoardParticipantFactory(user=user)
+        cache = caches[settings.BOARD_ROLES_CACHE]
+        version_before = _current_version(cache, user.id)
+        stale_roles = {participant.board_id: participant.role}
+
+        participant.delete()
+        cache.set(_roles_key(user.id, version_before), stale_roles)
+
+        assert load_board_roles(user.id) == {}
+
+    def test_process_local_cache_disabled(self, user, settings, django_assert_num_queries) -> None:
+        """ Сброс в LocMemCache не виден другим процессам, поэтому без CACHE_ALLOW_PROCESS_LOCAL роли читаются из БД """
+        settings.CACHE_ALLOW_PROCESS_LOCAL = False
+        participant = BoardParticipantFactory(user=user)
+        load_board_roles(user.id)
+
+        with django_assert_num_queries(1):
+            assert load_board_roles(user.id) == {participant.board_id: participant.role}
+        assert not caches[settings.BOARD_ROLES_CACHE].get(f'board-roles:version:{user.id}')
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(connection.vendor == 'sqlite', reason='Параллельная запись в sqlite блокирует таблицы')
+def test_revoked_access_never_stale_under_concurrent_reads(user_factory) -> None:
+    """
+    Пока другие потоки постоянно читают и кэшируют роли участника, владелец много раз
+    выдает и отзывает доступ. После каждого коммита отзыва чтение ролей не видит доску.
+    """
+    owner, member = user_factory.create(), user_factory.create()
+    board = BoardFactory()
+    BoardParticipantFactory(board=board, user=owner, role=BoardParticipant.Role.owner)
+    client = APIClient()
+    client.force_login(owner)
+    url = reverse('board', kwargs={'pk': board.pk})
+    stop = threading.Event()
+    errors = []
+
+    def reader() -> None:
+        try:
+            while not stop.is_set():
+                BoardRoles(member).roles
+        except Exception as e:  # pragma: no cover - сообщение попадет в assert ниже
+            errors.append(e)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(30):
+            grant = {'title': board.title,
+                     'participants': [{'user': member.username, 'role': BoardParticipant.Role.writer}]}
+            assert client.put(url, data=grant).status_code == status.HTTP_200_OK
+            assert BoardRoles(member).can_write(board.id)
+
+            revoke = {'title': board.title, 'participants': []}
+            assert client.put(url, data=revoke).status_code == status.HTTP_200_OK
+            assert not BoardRoles(member).can_read(board.id), "Отозванный доступ прочитан из кэша"
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    assert not errors
@@ -0,0 +1,123 @@
+import datetime
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from goals.models import Goal, GoalCounter
+from goals.stats import reconcile_counters
+from tests.factories import BoardFactory, BoardParticipantFactory, CategoryFactory, GoalFactory
+
+TODAY = datetime.date.today()
+YESTERDAY = TODAY - datetime.timedelta(days=1)
+
+
+@pytest.fixture()
+def board(user):
+    board = BoardFactory()
+    BoardParticipantFactory(board=board, user=user)
+    return board
+
+
+@pytest.fixture()
+def category(board, user):
+    return CategoryFactory(board=board, user=user, title='Б')
+
+
+def get_stats(auth_client, board) -> dict:
+    response = auth_client.get(reverse('board-stats', args=[board.id]))
+    assert response.status_code == status.HTTP_200_OK, response.content
+    return response.json()
+
+
+@pytest.mark.django_db
+class TestBoardStats:
+
+    def test_stats(self, auth_client, board, category, user) -> None:
+        other = CategoryFactory(board=board, user=user, title='А')
+        GoalFactory(category=category, user=user, priority=Goal.Priority.high, due_date=YESTERDAY)
+        GoalFactory(category=category, user=user, status=Goal.Status.done, due_date=YESTERDAY)
+        GoalFactory(category=category, user=user, status=Goal.Status.archived)
+        GoalFactory(category=other, user=user, status=Goal.Status.in_progress, due_date=TODAY)
+        GoalFactory(user=user)  # цель другой доски
+
+        stats = get_stats(auth_client, board)
+
+        assert stats['total'] == 3, 'Архивные цели не входят в total'
+        assert stats['overdue'] == 1, 'Выполненные цели и срок «сегодня» не просрочены'
+        assert stats['by_status'] == {'1': 1, '2': 1, '3': 1, '4': 1}
+        assert stats['by_priority'] == {'1': 0, '2': 2, '3': 1, '4': 0}
+        assert [(c['title'], c['total'], c['overdue']) for c in stats['categories']] == [('А', 1, 0), ('Б', 2, 1)]
+
+    def test_counters_follow_changes(self, auth_client, board, category, user) -> None:
+        """ Счетчики совпадают с целями после правок через API, массовой архивации и удаления """
+        goals = GoalFactory.create_batch(3, category=category, user=user)
+        other = CategoryFactory(board=board, user=user)
+        GoalFactory(category=other, user=user)
+
+        responses = [
+            auth_client.patch(reverse('goal', args=[goals[0].id]), {'status': Goal.Status.done, 'due_date': YESTERDAY}),
+            auth_client.put(reverse('goal', args=[goals[1].id]), {'title': 'new', 'category': other.id,
+                                                                   'priority': Goal.Priority.low}),
+            auth_client.delete(reverse('goal', args=[goals[2].id])),
+        ]
+        assert [response.status_code for response in responses] == [200, 200, 204]
+        assert reconcile_counters(repair=False) == {}
+        assert get_stats(auth_client, board)['by_status'] == {'1': 2, '2': 0, '3': 1, '4': 1}
+
+        auth_client.delete(reverse('category', args=[category.id]))
+        call_command('archive_worker', '--once')
+        assert reconcile_counters(repair=False) == {}
+        auth_client.delete(reverse('board', args=[board.id]))
+        call_command('archive_worker', '--once')
+        assert reconcile_counters(repair=False) == {}
+        Goal.objects.all().delete()
+        assert reconcile_counters(repair=False) == {}
+
+    def test_save_update_fields(self, category, user) -> None:
+        """ save(update_fields=...) учитывает только сохраняемые поля """
+        goal = GoalFactory(category=category, user=user)
+        goal.priority = Goal.Priority.critical
+        goal.status = Goal.Status.archived
+        goal.save(update_fields=['status'])
+
+        assert reconcile_counters(repair=False) == {}
+
+    def test_constant_queries(self, auth_client, board, category, user) -> None:
+        """ Статистика не читает таблицу целей """
+        GoalFactory.create_batch(20, category=category, user=user)
+
+        with CaptureQueriesContext(connection) as queries:
+            get_stats(auth_client, board)
+
+        assert not [query for query in queries.captured_queries if 'goals_goal"' in query['sql']]
+
+    def test_not_participant(self, auth_client, another_user) -> None:
+        board = BoardFactory()
+        BoardParticipantFactory(board=board, user=another_user)
+
+        response = auth_client.get(reverse('board-stats', args=[board.id]))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestReconcileCommand:
+
+    def test_repairs_drift(self, category, user) -> None:
+        GoalFactory.create_batch(2, category=category, user=user)
+        GoalFactory(category=category, user=user, due_date=TODAY)
+        GoalCounter.objects.filter(due_date__isnull=True).update(count=5)
+        GoalCounter.objects.filter(due_date=TODAY).delete()
+        GoalCounter.objects.create(category=category, status=Goal.Status.done, priority=Goal.Priority.low, count=1)
+
+        with pytest.raises(CommandError):
+            call_command('reconcile_goal_counters', '--check')
+        call_command('reconcile_goal_counters', '--board', str(category.board_id))
+
+        assert reconcile_counters(repair=False) == {}, 'Расхождения исправлены'
+        assert set(GoalCounter.objects.values_list('due_date', 'count')) == {(None, 2), (TODAY, 1)}
+        call_command('reconcile_goal_counters', '--check')
@@ -0,0 +1,105 @@
+import pytest
+import requests
+
+from benchmarks.fake_telegram import FakeTelegramServer
+from bot.tg.client import TgClient
+
+
+@pytest.fixture()
+def server():
+    with FakeTelegramServer() as server:
+        yield server
+
+
+@pytest.fixture()
+def sleeps() -> list[float]:
+    return []
+
+
+@pytest.fixture()
+def tg_client(server, sleeps):
+    client = TgClient(token='token', api_url=server.url, sleep=sleeps.append)
+    yield client
+    client.close()
+
+
+class TestTgClient:
+
+    def test_keep_alive(self, server, tg_client) -> None:
+        """ Запросы идут через одно соединение из пула """
+        for i in range(5):
+            response = tg_client.send_message(chat_id=1, text=str(i))
+            assert response.result.text == str(i)
+
+        assert server.connections == 1, f'Открыто {server.connections} соединений'
+
+    def test_retry_after(self, server, tg_client, sleeps) -> None:
+        """ На 429 клиент ждет retry_after из ответа и повторяет запрос """
+        server.fail_next(429, retry_after=7)
+
+        response = tg_client.send_message(chat_id=1, text='text')
+
+        assert response.ok
+        assert sleeps == [7.0]
+        assert server.sent == [(1, 'text')]
+
+    def test_long_retry_after(self, server, tg_client, sleeps) -> None:
+        """ retry_after длиннее max_backoff выжидается целиком: повтор раньше срока снова получит 429 """
+        server.fail_next(429, retry_after=3600)
+
+        assert tg_client.send_message(chat_id=1, text='text').ok
+        assert sleeps == [3600.0]
+
+    def test_backoff_on_server_error(self, server, tg_client, sleeps) -> None:
+        """ На 5xx пауза растет экспоненциально и не превышает предел """
+        server.fail_next(502, count=3)
+
+        data = tg_client._get('getUpdates', offset=0, timeout=0)
+
+        assert data['ok']
+        assert len(sleeps) == 3
+        for attempt, delay in enumerate(sleeps):
+            assert 0 <= delay <= tg_client.backoff * 2 ** attempt
+
+    def test_send_message_not_retried_after_server_error(self, server, tg_client, sleeps) -> None:
+        """ sendMessage после 5xx не повторяется: Telegram мог уже доставить сообщение """
+        server.fail_next(502)
+
+        assert tg_client._get('sendMessage', chat_id=1, text='text') == {'ok': False, 'result': []}
+        assert sleeps == []
+
+    def test_send_message_not_retried_after_read_timeout(self, sleeps) -> None:
+        with FakeTelegramServer(send_latency=0.5) as server:
+            tg_client = TgClient(token='token', api_url=server.url, sleep=sleeps.append)
+            tg_client.read_timeout = 0.1
+
+            with pytest.raises(requests.ReadTimeout):
+                tg_client.send_message(chat_id=1, text='text')
+            tg_client.close()
+
+        assert sleeps == []
+
+    def test_retries_exhausted(self, server, tg_client, sleeps) -> None:
+        """ После max_retries повторов возвращается пустой ответ, как и раньше """
+        server.fail_next(503, count=tg_client.max_retries + 1)
+
+        data = tg_client._get('getUpdates', offset=0, timeout=0)
+
+        assert data == {'ok': False, 'result': []}
+        assert len(sleeps) == tg_client.max_retries
+
+    def test_client_error_is_not_retried(self, server, tg_client, sleeps) -> None:
+        server.fail_next(400)
+
+        assert tg_client._get('sendMessage', chat_id=1, text='text') == {'ok': False, 'result': []}
+        assert sleeps == []
+
+    def test_connection_error(self, sleeps) -> None:
+        """ Ошибки соединения повторяются и для sendMessage: запрос не ушел; затем пробрасываются """
+        with FakeTelegramServer() as server:
+            url = server.url
+        tg_client = TgClient(token='token', api_url=url, sleep=sleeps.append)
+
+        with pytest.raises(requests.ConnectionError):
+            tg_client.send_message(chat_id=1, text='text')
+        assert len(sleeps) == tg_client.max_retries
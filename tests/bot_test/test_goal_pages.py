@@ -0,0 +1,136 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from bot.goal_pages import InvalidFilters, get_goal_page, parse_filters
+from bot.management.commands.runbot import Command
+from bot.tg.client import TgClient
+from goals.models import Goal
+from tests.factories import BoardFactory, BoardParticipantFactory, CategoryFactory, GoalFactory
+
+
+@pytest.fixture()
+def verified_tg_user(tg_user_factory, user):
+    return tg_user_factory(user=user)
+
+
+@pytest.fixture()
+def category(user):
+    board = BoardFactory()
+    BoardParticipantFactory(board=board, user=user)
+    return CategoryFactory(board=board, user=user)
+
+
+def titles(text: str) -> list[str]:
+    return [line[len('Название: '):-1] for line in text.splitlines() if line.startswith('Название: ')]
+
+
+@pytest.mark.django_db
+class TestGoalPages:
+
+    def test_constant_queries(self, settings, user, category) -> None:
+        """ Страница строится одним запросом независимо от числа целей и берется из кэша повторно """
+        settings.BOT_GOALS_PAGE_SIZE = 10
+        for count in (3, 30):
+            Goal.objects.filter(user=user).delete()
+            GoalFactory.create_batch(count, user=user, category=category)
+
+            with CaptureQueriesContext(connection) as queries:
+                goal_page = get_goal_page(user.id, '', 0)
+            assert len(queries) == 1, f'{count} целей: {len(queries)} запросов'
+            assert len(titles(goal_page.text)) == min(count, 10)
+
+            with CaptureQueriesContext(connection) as queries:
+                assert get_goal_page(user.id, '', 0) == goal_page
+            assert len(queries) == 0, 'Повторный запрос страницы должен браться из кэша'
+
+    def test_cache_invalidation(self, user, category) -> None:
+        """ Кэш страницы сбрасывается при изменении цели пользователя, в том числе массовом """
+        goal = GoalFactory(user=user, category=category, title='Старое название')
+        assert titles(get_goal_page(user.id, '', 0).text) == ['Старое название']
+
+        goal.title = 'Новое название'
+        goal.save()
+        assert titles(get_goal_page(user.id, '', 0).text) == ['Новое название']
+
+        Goal.objects.filter(pk=goal.pk).update_and_notify(status=Goal.Status.archived)
+        assert get_goal_page(user.id, '', 0).text.startswith('No Goals to display')
+
+    def test_process_local_cache_disabled(self, settings, user, category) -> None:
+        """ Цели меняет другой процесс (API), поэтому кэш в памяти процесса бота не используется """
+        settings.CACHE_ALLOW_PROCESS_LOCAL = False
+        goal = GoalFactory(user=user, category=category, title='Старое название')
+        get_goal_page(user.id, '', 0)
+
+        # изменение без сигналов: в процессе бота сброс кэша не виден
+        Goal.objects.filter(pk=goal.pk).update(title='Новое название')
+
+        assert titles(get_goal_page(user.id, '', 0).text) == ['Новое название']
+
+    def test_category_delete_invalidates(self, auth_client, user, category) -> None:
+        GoalFactory(user=user, category=category)
+        assert titles(get_goal_page(user.id, '', 0).text)
+
+        response = auth_client.delete(reverse('category', args=[category.id]))
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+        assert get_goal_page(user.id, '', 0).text.startswith('No Goals to display')
+
+    def test_filters(self, user, category) -> None:
+        GoalFactory(user=user, category=category, title='В работе', status=Goal.Status.in_progress)
+        GoalFactory(user=user, category=category, title='Важная', priority=Goal.Priority.critical)
+
+        assert titles(get_goal_page(user.id, parse_filters(['status=2']), 0).text) == ['В работе']
+        assert titles(get_goal_page(user.id, parse_filters(['priority__in=3,4']), 0).text) == ['Важная']
+        assert parse_filters(['status=2', 'priority=1']) == parse_filters(['priority=1', 'status=2'])
+
+    @pytest.mark.parametrize('args', [['color=red'], ['status'], ['status=abc']])
+    def test_invalid_filters(self, args) -> None:
+        with pytest.raises(InvalidFilters):
+            parse_filters(args)
+
+
+@pytest.mark.django_db
+class TestGoalsCommand:
+
+    @staticmethod
+    def send(command: Command, chat_id: int, text: str) -> str:
+        message = SimpleNamespace(chat=SimpleNamespace(id=chat_id), text=text)
+        with patch.object(TgClient, 'send_message') as send_message_mock:
+            command.handle_message(message)
+        return '\n'.join(call.kwargs['text'] for call in send_message_mock.mock_calls)
+
+    def test_navigation(self, settings, verified_tg_user, user, category) -> None:
+        """ /goals показывает первую страницу, /next и /prev листают, за границы не выходят """
+        settings.BOT_GOALS_PAGE_SIZE = 10
+        for i in range(25):
+            GoalFactory(user=user, category=category, title=f'Цель {i:02}')
+        chat_id = verified_tg_user.chat_id
+
+        pages = [titles(self.send(Command(), chat_id, text)) for text in
+                 ('/goals', '/next', '/next', '/next', '/prev', '/prev', '/prev')]
+
+        expected = [[f'Цель {i:02}' for i in range(start, min(start + 10, 25))] for start in (0, 10, 20)]
+        assert pages == [expected[0], expected[1], expected[2], expected[2], expected[1], expected[0], expected[0]]
+
+    def test_filtered_navigation(self, settings, verified_tg_user, user, category) -> None:
+        settings.BOT_GOALS_PAGE_SIZE = 2
+        for i in range(3):
+            GoalFactory(user=user, category=category, title=f'Готово {i}', status=Goal.Status.done)
+        GoalFactory(user=user, category=category, title='Новая')
+        chat_id = verified_tg_user.chat_id
+
+        assert titles(self.send(Command(), chat_id, '/goals status=3')) == ['Готово 0', 'Готово 1']
+        assert titles(self.send(Command(), chat_id, '/next')) == ['Готово 2']
+
+    def test_next_without_list(self, verified_tg_user) -> None:
+        assert 'Open the list with /goals first' in self.send(Command(), verified_tg_user.chat_id, '/next')
+
+    def test_invalid_filter(self, verified_tg_user) -> None:
+        assert 'Unknown filter: color=red' in self.send(Command(), verified_tg_user.chat_id, '/goals color=red')
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import requests
+
+from benchmarks.fake_telegram import FakeTelegramServer, make_updates
+from bot.tg.client import TgClient
+from bot.tg.runtime import UpdateDispatcher, UpdatePoller
+
+
+def make_message(chat_id: int, text: str):
+    return SimpleNamespace(chat=SimpleNamespace(id=chat_id), text=text)
+
+
+class RecordingHandler:
+    def __init__(self, delay: float = 0.0, fail_on: str = None) -> None:
+        self.delay = delay
+        self.fail_on = fail_on
+        self.handled: list[tuple[int, str]] = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, message) -> None:
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if message.text == self.fail_on:
+                raise RuntimeError('handler failed')
+            with self._lock:
+                self.handled.append((message.chat.id, message.text))
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def run_dispatcher(handler: RecordingHandler, messages: list, concurrency: int) -> UpdateDispatcher:
+    dispatcher = UpdateDispatcher(handler, concurrency=concurrency)
+    dispatcher._handle = handler
+
+    async def main() -> None:
+        for message in messages:
+            dispatcher.dispatch(message)
+        await dispatcher.join()
+
+    try:
+        asyncio.run(main())
+    finally:
+        dispatcher.close()
+    return dispatcher
+
+
+class TestUpdateDispatcher:
+
+    def test_per_chat_order(self) -> None:
+        """ Сообщения одного чата обрабатываются в порядке поступления """
+        handler = RecordingHandler(delay=0.001)
+        messages = [make_message(chat_id, str(i)) for i in range(20) for chat_id in (1, 2, 3)]
+
+        dispatcher = run_dispatcher(handler, messages, concurrency=3)
+
+        for chat_id in (1, 2, 3):
+            texts = [text for handled_chat, text in handler.handled if handled_chat == chat_id]
+            assert texts == [str(i) for i in range(20)], f'Нарушен порядок сообщений чата {chat_id}'
+        assert dispatcher.pending == 0
+        assert not dispatcher.workers, 'Воркеры чатов должны завершиться'
+
+    def test_concurrency_limit(self) -> None:
+        """ Разные чаты обрабатываются параллельно, но не больше concurrency одновременно """
+        handler = RecordingHandler(delay=0.02)
+        messages = [make_message(chat_id, 'text') for chat_id in range(10)]
+
+        run_dispatcher(handler, messages, concurrency=4)
+
+        assert len(handler.handled) == 10
+        assert 1 < handler.max_active <= 4, f'Одновременно обрабатывалось {handler.max_active} сообщений'
+
+    def test_one_chat_is_sequential(self) -> None:
+        """ Сообщения одного чата не обрабатываются параллельно """
+        handler = RecordingHandler(delay=0.005)
+        messages = [make_message(1, str(i)) for i in range(5)]
+
+        run_dispatcher(handler, messages, concurrency=4)
+
+        assert handler.max_active == 1
+
+    def test_handler_error_does_not_stop_chat(self) -> None:
+        """ Ошибка в обработчике не останавливает обработку следующих сообщений чата """
+        handler = RecordingHandler(fail_on='1')
+        messages = [make_message(1, str(i)) for i in range(3)]
+
+        dispatcher = run_dispatcher(handler, messages, concurrency=2)
+
+        assert handler.handled == [(1, '0'), (1, '2')]
+        assert dispatcher.pending == 0
+
+
+class TestUpdatePoller:
+
+    def test_network_outage(self) -> None:
+        """ Сетевые ошибки после всех повторов клиента не останавливают опрос: пауза растет, offset сохраняется """
+        errors = [requests.ConnectionError('down'), requests.Timeout('slow')]
+        sleeps = []
+        with FakeTelegramServer(updates=make_updates(3, chats=1)) as server:
+            tg_client = TgClient(token='token', api_url=server.url, sleep=lambda delay: None)
+            get_updates = tg_client.get_updates
+
+            def failing_get_updates(**kwargs):
+                if errors:
+                    raise errors.pop(0)
+                return get_updates(**kwargs)
+
+            poller = UpdatePoller(tg_client, timeout=0, sleep=sleeps.append)
+            with patch.object(tg_client, 'get_updates', failing_get_updates):
+                assert poller.poll() == [] and poller.poll() == []
+                assert poller.failures == 2
+                assert [item.update_id for item in poller.poll()] == [1, 2, 3]
+            tg_client.close()
+
+        assert poller.offset == 4 and poller.failures == 0
+        assert len(sleeps) == 2 and all(0 <= delay <= tg_client.max_backoff for delay in sleeps)
@@ -0,0 +1,146 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from bot.management.commands.runbot import Command
+from bot.tg.client import TgClient
+from bot.tg.sender import MAX_MESSAGE_LENGTH, OutboxSender, TokenBucket, coalesce
+from tests.factories import CategoryFactory, GoalFactory
+
+
+class FakeTime:
+    """ Часы, которые двигает только sleep """
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def clock(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture()
+def fake_time() -> FakeTime:
+    return FakeTime()
+
+
+def make_sender(fake_time: FakeTime, **kwargs) -> OutboxSender:
+    options = {'chat_rate': 1, 'chat_burst': 3, 'global_rate': 30, 'global_burst': 30}
+    options.update(kwargs)
+    return OutboxSender(MagicMock(), sleep=fake_time.sleep, clock=fake_time.clock, **options)
+
+
+def sent_texts(sender: OutboxSender) -> list[tuple[int, str]]:
+    return [(call.kwargs['chat_id'], call.kwargs['text']) for call in sender.tg_client.send_message.mock_calls]
+
+
+class TestCoalesce:
+
+    def test_joins_up_to_limit(self) -> None:
+        """ Сообщения склеиваются, пока влезают в лимит """
+        assert coalesce(['a', 'b', 'c'], limit=5) == ['a\nb\nc']
+        assert coalesce(['aa', 'bb', 'cc'], limit=5) == ['aa\nbb', 'cc']
+
+    def test_splits_long_text(self) -> None:
+        """ Текст длиннее лимита режется на части """
+        chunks = coalesce(['x' * (MAX_MESSAGE_LENGTH * 2 + 10), 'tail'])
+
+        assert [len(chunk) for chunk in chunks] == [MAX_MESSAGE_LENGTH, MAX_MESSAGE_LENGTH, 15]
+        assert all(len(chunk) <= MAX_MESSAGE_LENGTH for chunk in chunks)
+        assert ''.join(chunks).replace('\n', '') == 'x' * (MAX_MESSAGE_LENGTH * 2 + 10) + 'tail'
+
+
+class TestTokenBucket:
+
+    def test_reserve(self, fake_time) -> None:
+        bucket = TokenBucket(rate=2, capacity=2, clock=fake_time.clock)
+
+        assert [bucket.reserve() for _ in range(4)] == [0, 0, 0.5, 1.0]
+        fake_time.now = 10
+        assert bucket.reserve() == 0, 'За простой ведро снова наполняется'
+
+
+class TestOutboxSender:
+
+    def test_coalesces_per_chat(self, fake_time) -> None:
+        """ Сообщения чата склеиваются в одно, чаты не смешиваются """
+        sender = make_sender(fake_time)
+        for i in range(200):
+            sender.send(1, f'goal {i}')
+        sender.send(2, 'other')
+        sender.send(1, None)
+
+        sender.flush_all()
+
+        assert sent_texts(sender) == [(1, '\n'.join(f'goal {i}' for i in range(200))), (2, 'other')]
+        assert sender.counters == {'queued': 201, 'sent': 2, 'throttled': 0, 'failed': 0}
+
+    def test_chat_rate_limit(self, fake_time) -> None:
+        """ Сверх запаса в один чат уходит не больше chat_rate сообщений в секунду """
+        sender = make_sender(fake_time)
+        for i in range(5):
+            sender.send(1, 'x' * MAX_MESSAGE_LENGTH)
+
+        sender.flush(1)
+
+        assert len(sent_texts(sender)) == 5
+        assert fake_time.sleeps == [1.0, 1.0]
+        assert sender.counters['throttled'] == 2
+
+    def test_global_rate_limit(self, fake_time) -> None:
+        """ Общий лимит действует на все чаты вместе """
+        sender = make_sender(fake_time, global_rate=10, global_burst=2)
+        for chat_id in range(4):
+            sender.send(chat_id, 'text')
+            sender.flush(chat_id)
+
+        assert fake_time.sleeps == [0.1, 0.1]
+        assert sender.counters == {'queued': 4, 'sent': 4, 'throttled': 2, 'failed': 0}
+
+    def test_failed_message_skipped(self, fake_time) -> None:
+        """ Неотправленное сообщение не задерживает остальные сообщения чата """
+        sender = make_sender(fake_time)
+        sender.tg_client.send_message.side_effect = [requests.ReadTimeout(), None]
+        sender.send(1, 'x' * MAX_MESSAGE_LENGTH)
+        sender.send(1, 'next')
+
+        sender.flush(1)
+
+        assert sent_texts(sender) == [(1, 'x' * MAX_MESSAGE_LENGTH), (1, 'next')]
+        assert sender.counters['failed'] == 1 and sender.counters['sent'] == 1
+
+    def test_idle_buckets_are_dropped(self, fake_time) -> None:
+        sender = make_sender(fake_time)
+        for chat_id in range(100):
+            sender.send(chat_id, 'text')
+            sender.flush(chat_id)
+        fake_time.now += 60
+        sender.send(0, 'text')
+        sender.flush(0)
+
+        assert list(sender._buckets) == [0]
+
+
+@pytest.mark.django_db
+class TestRunbotSending:
+
+    def test_goals_page_in_one_request(self, tg_user_factory, user_factory) -> None:
+        """ Эхо, 'Authorized' и страница из 200 целей уходят одним запросом вместо 200+ """
+        tg_user = tg_user_factory(user=user_factory())
+        category = CategoryFactory(user=tg_user.user)
+        GoalFactory.create_batch(200, category=category, user=tg_user.user)
+        message = SimpleNamespace(chat=SimpleNamespace(id=tg_user.chat_id), text='/goals')
+
+        command = Command()
+        with patch.object(TgClient, 'send_message') as send_message_mock:
+            command.handle_message(message)
+
+        send_message_mock.assert_called_once()
+        assert send_message_mock.call_args.kwargs['text'].startswith('/goals\nAuthorized\nGoals, page 1')
+        assert command.sender.counters == {'queued': 3, 'sent': 1, 'throttled': 0, 'failed': 0}
@@ -0,0 +1,120 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from django.test import override_settings
+
+from bot.management.commands.runbot import Command
+from bot.states import BaseStateStore, CacheStateStore, ChatState, MemoryStateStore, get_state_store
+from bot.tg.client import TgClient
+from goals.models import Goal
+from tests.factories import CategoryFactory
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(params=['memory', 'cache'])
+def store(request):
+    if request.param == 'memory':
+        return MemoryStateStore(ttl=60)
+    return CacheStateStore(ttl=60)
+
+
+class TestStateStore:
+
+    def test_chats_do_not_interfere(self, store) -> None:
+        """ Состояние хранится отдельно для каждого чата """
+        store.set(1, ChatState(ChatState.CHOOSE_CATEGORY))
+        store.set(2, ChatState(ChatState.ENTER_TITLE, 10))
+
+        assert store.get(1) == ChatState(ChatState.CHOOSE_CATEGORY)
+        assert store.get(2) == ChatState(ChatState.ENTER_TITLE, 10)
+        assert store.get(3) is None
+
+        store.delete(1)
+        assert store.get(1) is None
+        assert store.get(2) == ChatState(ChatState.ENTER_TITLE, 10)
+
+    def test_memory_ttl(self) -> None:
+        """ Просроченные состояния не возвращаются и удаляются из памяти """
+        clock = FakeClock()
+        store = MemoryStateStore(ttl=10, clock=clock)
+        store.set(1, ChatState(ChatState.CHOOSE_CATEGORY))
+        clock.now = 5
+        store.set(2, ChatState(ChatState.CHOOSE_CATEGORY))
+
+        clock.now = 10
+        assert store.get(1) is None, 'Состояние должно истечь'
+        assert store.get(2) is not None
+        assert len(store) == 1
+
+        store.set(2, ChatState(ChatState.ENTER_TITLE, 1))
+        clock.now = 19
+        assert store.get(2) == ChatState(ChatState.ENTER_TITLE, 1), 'Запись продлевает TTL'
+        clock.now = 20
+        assert len(store) == 0
+
+    @pytest.mark.parametrize('name, store_class', [('memory', MemoryStateStore), ('cache', CacheStateStore)])
+    def test_store_from_settings(self, name, store_class) -> None:
+        with override_settings(BOT_STATE_STORE=name):
+            assert isinstance(get_state_store(), store_class)
+
+    def test_incomplete_store(self) -> None:
+        """ Хранилище без delete нельзя создать """
+        class IncompleteStore(BaseStateStore):
+            def get(self, chat_id):
+                return None
+
+            def set(self, chat_id, state):
+                pass
+
+        with pytest.raises(TypeError):
+            IncompleteStore(ttl=60)
+
+
+@pytest.mark.django_db
+class TestGoalCreationDialog:
+
+    @staticmethod
+    def send(command: Command, chat_id: int, text: str) -> str:
+        message = SimpleNamespace(chat=SimpleNamespace(id=chat_id), text=text)
+        with patch.object(TgClient, 'send_message') as send_message_mock:
+            command.handle_message(message)
+        return '\n'.join(call.kwargs['text'] for call in send_message_mock.mock_calls)
+
+    def test_dialogs_in_two_chats(self, tg_user_factory, user_factory) -> None:
+        """ Диалоги создания цели в разных чатах не смешиваются и переживают перезапуск бота """
+        first, second = tg_user_factory(chat_id=1, user=user_factory()), tg_user_factory(chat_id=2, user=user_factory())
+        first_category = CategoryFactory(user=first.user)
+        second_category = CategoryFactory(user=second.user)
+
+        self.send(Command(), first.chat_id, '/create')
+        self.send(Command(), second.chat_id, '/create')
+        self.send(Command(), first.chat_id, str(first_category.id))
+        replies = self.send(Command(), second.chat_id, str(first_category.id))
+        assert 'Unknown command' in replies, 'Чужую категорию выбрать нельзя'
+        self.send(Command(), second.chat_id, str(second_category.id))
+
+        self.send(Command(), second.chat_id, 'Вторая цель')
+        self.send(Command(), first.chat_id, 'Первая цель')
+
+        assert Goal.objects.get(title='Первая цель').category == first_category
+        assert Goal.objects.get(title='Вторая цель').category == second_category
+        assert 'Command not found' in self.send(Command(), first.chat_id, 'Ещё текст'), 'Диалог завершен'
+
+    def test_cancel(self, tg_user_factory, user_factory) -> None:
+        tg_user = tg_user_factory(user=user_factory())
+        CategoryFactory(user=tg_user.user)
+        command = Command()
+
+        self.send(command, tg_user.chat_id, '/create')
+        assert command.state_store.get(tg_user.chat_id) == ChatState(ChatState.CHOOSE_CATEGORY)
+        self.send(command, tg_user.chat_id, '/cancel')
+
+        assert command.state_store.get(tg_user.chat_id) is None
@@ -0,0 +1,174 @@
+import datetime
+import threading
+
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from bot.models import WebhookUpdate
+from bot.tg.schemas import Message
+from bot.tg.webhook import WebhookWorker
+
+SECRET = 'webhook-secret'
+
+
+class BlockingHandler:
+    """ Записывает сообщения; пока `release` не выставлен, обработка стоит """
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+        self.handled: list[tuple[int, str]] = []
+
+    def __call__(self, message) -> None:
+        self.release.wait(5)
+        self.handled.append((message.chat.id, message.text))
+
+
+@pytest.fixture()
+def handler() -> BlockingHandler:
+    return BlockingHandler()
+
+
+@pytest.fixture()
+def worker(handler, monkeypatch):
+    worker = WebhookWorker(handler, concurrency=2, max_pending=3)
+    monkeypatch.setattr('bot.views.get_webhook_worker', lambda: worker)
+    yield worker
+    handler.release.set()
+    worker.close()
+
+
+def make_update(update_id: int, chat_id: int = 1) -> dict:
+    return {'update_id': update_id, 'message': {'chat': {'id': chat_id}, 'text': f'text {update_id}'}}
+
+
+# Апдейты обрабатываются в потоках воркера, которые видят только закоммиченные строки
+@pytest.mark.django_db(transaction=True)
+class TestWebhook:
+    url: str = reverse('bot_webhook')
+
+    @pytest.fixture(autouse=True)
+    def webhook_secret(self, settings) -> None:
+        settings.BOT_WEBHOOK_SECRET = SECRET
+
+    def post(self, client, payload, secret: str = SECRET):
+        return client.post(self.url, payload, format='json', HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN=secret)
+
+    def test_update_is_processed(self, client, worker, handler) -> None:
+        """ Апдейт подтверждается сразу и обрабатывается в фоне """
+        response = self.post(client, make_update(1))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {'ok': True}
+        assert handler.handled == [], 'Ответ не должен ждать обработки'
+        handler.release.set()
+        assert worker.join(timeout=5)
+        assert handler.handled == [(1, 'text 1')]
+        assert WebhookUpdate.objects.get(pk=1).processed is not None
+
+    def test_duplicate_update_is_dropped(self, client, worker, handler) -> None:
+        """ Повтор того же update_id подтверждается, но не обрабатывается второй раз """
+        handler.release.set()
+        assert self.post(client, make_update(7)).json() == {'ok': True}
+        assert self.post(client, make_update(7)).json() == {'ok': True, 'duplicate': True}
+
+        assert worker.join(timeout=5)
+        assert handler.handled == [(1, 'text 7')]
+
+    def test_full_queue(self, client, worker, handler) -> None:
+        """ Сверх max_pending апдейты отклоняются с 503 и принимаются при повторе """
+        for update_id in range(1, 4):
+            assert self.post(client, make_update(update_id, chat_id=update_id)).status_code == status.HTTP_200_OK
+
+        response = self.post(client, make_update(4))
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert worker.counters == {'accepted': 3, 'rejected': 1}
+
+        handler.release.set()
+        assert worker.join(timeout=5)
+        assert self.post(client, make_update(4)).json() == {'ok': True}, 'Отклоненный апдейт не считается дублем'
+        assert worker.join(timeout=5)
+        assert len(handler.handled) == 4
+
+    @pytest.mark.parametrize('secret', ['', 'wrong'])
+    def test_wrong_secret(self, client, worker, secret) -> None:
+        response = self.post(client, make_update(1), secret=secret)
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert worker.counters['accepted'] == 0
+
+    @pytest.mark.parametrize('payload', [{}, {'update_id': 'x'}, {'update_id': 1, 'message': {'text': 'no chat'}}])
+    def test_invalid_update(self, client, worker, payload) -> None:
+        assert self.post(client, payload).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_disabled_without_secret(self, client, worker) -> None:
+        with override_settings(BOT_WEBHOOK_SECRET=None):
+            assert self.post(client, make_update(1)).status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db(transaction=True)
+class TestWebhookRecovery:
+    """ Апдейты, которые принял и не обработал другой процесс """
+
+    def store(self, update_id: int, claimed_ago: float = None, processed: bool = False,
+              claim: str = 'other') -> WebhookUpdate:
+        now = timezone.now()
+        return WebhookUpdate.objects.create(
+            update_id=update_id, message=make_update(update_id)['message'], claim=claim,
+            claimed_at=None if claimed_ago is None else now - datetime.timedelta(seconds=claimed_ago),
+            processed=now if processed else None,
+        )
+
+    def test_sweep_takes_abandoned_updates(self, handler) -> None:
+        """ Брошенные и освобожденные апдейты берутся в обработку, свежие и обработанные — нет """
+        worker = WebhookWorker(handler, concurrency=2, max_pending=10, claim_timeout=60)
+        self.store(1, claimed_ago=120)
+        self.store(2)
+        self.store(3, claimed_ago=1)
+        self.store(4, claimed_ago=120, processed=True)
+        handler.release.set()
+
+        try:
+            assert worker.sweep() == 2
+            assert worker.join(timeout=5)
+        finally:
+            worker.close()
+
+        assert sorted(handler.handled) == [(1, 'text 1'), (1, 'text 2')]
+        assert set(WebhookUpdate.objects.filter(processed__isnull=True).values_list('pk', flat=True)) == {3}
+        assert worker.sweep() == 0, 'Обработанные апдейты не берутся повторно'
+
+    def test_sweep_deletes_old_processed(self, handler, settings) -> None:
+        settings.BOT_WEBHOOK_DEDUP_TTL = 0
+        worker = WebhookWorker(handler, concurrency=1, max_pending=10)
+        self.store(1, processed=True)
+
+        try:
+            worker.sweep()
+        finally:
+            worker.close()
+
+        assert not WebhookUpdate.objects.exists()
+
+    def test_shutdown_releases_queued_updates(self, handler) -> None:
+        """ При остановке апдейты, обработка которых не началась, сразу доступны другим процессам """
+        worker = WebhookWorker(handler, concurrency=1, max_pending=10)
+        other = WebhookWorker(handler, concurrency=1, max_pending=10, claim_timeout=60)
+        for update_id in (1, 2):
+            self.store(update_id, claimed_ago=0, claim=worker.claim)
+            worker.submit(update_id, Message(**make_update(update_id)['message']))
+
+        try:
+            worker.shutdown(timeout=0.1)
+            assert not worker.submit(3, Message(**make_update(3)['message'])), 'Новые апдейты не принимаются'
+            assert WebhookUpdate.objects.get(pk=2).claimed_at is None
+            assert WebhookUpdate.objects.get(pk=1).claimed_at is not None, 'Начатый апдейт остается за воркером'
+            assert other.sweep() == 1
+        finally:
+            handler.release.set()
+            worker.close()
+            other.close()
+
+        assert sorted(handler.handled) == [(1, 'text 1'), (1, 'text 2')]
@@ -1,10 +1,25 @@
 import datetime
 import pytest
+from django.core.cache import caches
 from rest_framework.test import APIClient
 
 pytest_plugins = 'tests.factories'
 
 
+@pytest.fixture(autouse=True)
+def process_local_caches(settings):
+    """ Тесты идут в одном процессе, поэтому кэши в LocMemCache включены (todolist.cache) """
+    settings.CACHE_ALLOW_PROCESS_LOCAL = True
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """ Кэши процесса не должны переживать тест (id объектов в sqlite повторяются) """
+    yield
+    for cache in caches.all():
+        cache.clear()
+
+
 @pytest.fixture()
 def client() -> APIClient:
     """ Rest Framework test client instance. """
@@ -0,0 +1,84 @@
+import pytest
+from django.db import OperationalError, connection
+
+from todolist.db.postgresql_pool.base import DatabaseWrapper, close_pools
+
+pytestmark = [
+    pytest.mark.skipif(connection.vendor != 'postgresql', reason='Пул соединений только для PostgreSQL'),
+    pytest.mark.django_db,
+]
+
+
+@pytest.fixture()
+def make_wrapper():
+    """ Соединения с тестовой базой через пул, как у разных потоков одного процесса """
+    wrappers = []
+
+    def make(**pool) -> DatabaseWrapper:
+        settings_dict = {**connection.settings_dict, 'ENGINE': 'todolist.db.postgresql_pool',
+                         'CONN_HEALTH_CHECKS': True, 'OPTIONS': {'pool': {'max_size': 2, 'timeout': 0.2, **pool}}}
+        wrappers.append(DatabaseWrapper(settings_dict, alias=f'pooled{len(wrappers)}'))
+        return wrappers[-1]
+
+    yield make
+    for wrapper in wrappers:
+        wrapper.close()
+    close_pools()
+
+
+def backend_pid(wrapper: DatabaseWrapper) -> int:
+    with wrapper.cursor() as cursor:
+        cursor.execute('SELECT pg_backend_pid()')
+        return cursor.fetchone()[0]
+
+
+class TestConnectionPool:
+
+    def test_reuse(self, make_wrapper) -> None:
+        """ Закрытое соединение возвращается в пул и достается следующему подключению """
+        first, second = make_wrapper(), make_wrapper()
+        pid = backend_pid(first)
+        first.close()
+
+        assert backend_pid(second) == pid
+        assert second.pool.size == 1, 'Новое соединение не открывалось'
+
+    def test_dead_connection_replaced(self, make_wrapper) -> None:
+        """ Соединение, разорванное сервером, не выдается из пула при CONN_HEALTH_CHECKS """
+        wrapper = make_wrapper()
+        pid = backend_pid(wrapper)
+        wrapper.close()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+
+        assert backend_pid(wrapper) != pid
+        assert wrapper.pool.size == 1
+
+    def test_open_transaction_rolled_back(self, make_wrapper) -> None:
+        wrapper = make_wrapper()
+        with wrapper.cursor() as cursor:
+            cursor.execute('BEGIN; CREATE TEMPORARY TABLE pool_leftover (id int)')
+        wrapper.close()
+
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('pg_temp.pool_leftover')")
+            assert cursor.fetchone() == (None,), 'Незавершенная транзакция откатывается при возврате в пул'
+
+    def test_errors_not_reused(self, make_wrapper) -> None:
+        wrapper = make_wrapper()
+        pid = backend_pid(wrapper)
+        wrapper.errors_occurred = True
+        wrapper.close()
+
+        assert backend_pid(wrapper) != pid
+
+    def test_exhausted(self, make_wrapper) -> None:
+        """ Когда все соединения заняты, подключение ждет timeout и падает с OperationalError """
+        first, second, third = make_wrapper(), make_wrapper(), make_wrapper()
+        backend_pid(first), backend_pid(second)
+
+        with pytest.raises(OperationalError):
+            backend_pid(third)
+
+        first.close()
+        assert backend_pid(third)
@@ -0,0 +1,117 @@
+import time
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connections, transaction
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from goals.models import BoardParticipant, Goal
+from tests.factories import BoardFactory, BoardParticipantFactory, CategoryFactory, GoalFactory
+
+
+@pytest.fixture()
+def replica(settings):
+    """ Вторая база 'replica' — отдельное соединение с той же тестовой базой """
+    connections.settings['replica'] = {**connections['default'].settings_dict}
+    settings.DB_REPLICA_ALIASES = ['replica']
+    yield connections['replica']
+    connections['replica'].close()
+    del connections.settings['replica']
+    delattr(connections._connections, 'replica')
+
+
+@pytest.fixture()
+def goal(user):
+    board = BoardFactory()
+    BoardParticipantFactory(board=board, user=user, role=BoardParticipant.Role.owner)
+    return GoalFactory(category=CategoryFactory(board=board, user=user), user=user)
+
+
+def queries(client, method: str, url: str, data=None) -> tuple:
+    """ Ответ и число запросов в основную базу и в реплику """
+    with CaptureQueriesContext(connections['default']) as primary, \
+            CaptureQueriesContext(connections['replica']) as replica:
+        response = getattr(client, method)(url, data, format='json')
+    return response, len(primary), len(replica)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestReplicaRouter:
+
+    @pytest.mark.parametrize('url_name', ['goal-list', 'category-list', 'comment-list', 'board-list'])
+    def test_list_reads_from_replica(self, auth_client, replica, goal, url_name) -> None:
+        response, _, replica_queries = queries(auth_client, 'get', reverse(url_name))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert replica_queries > 0
+
+    def test_detail_and_writes(self, auth_client, replica, goal) -> None:
+        """ GET объекта читает из реплики, изменения и связанные чтения идут в основную базу """
+        url = reverse('goal', args=[goal.id])
+        response, _, replica_queries = queries(auth_client, 'get', url)
+        assert response.json()['title'] == goal.title and replica_queries > 0
+
+        response, primary_queries, replica_queries = queries(auth_client, 'patch', url, {'title': 'renamed'})
+        assert response.status_code == status.HTTP_200_OK
+        assert primary_queries > 0 and replica_queries == 0
+        assert Goal.objects.get(pk=goal.id).title == 'renamed'
+
+    def test_read_your_writes(self, auth_client, settings, replica, goal) -> None:
+        """ После своего изменения клиент читает из основной базы, пока действует cookie """
+        auth_client.post(reverse('create-goal'), {'category': goal.category_id, 'title': 'new'}, format='json')
+        assert settings.DB_PRIMARY_COOKIE in auth_client.cookies
+
+        response, primary_queries, replica_queries = queries(auth_client, 'get', reverse('goal-list'))
+        assert len(response.json()) == 2
+        assert primary_queries > 0 and replica_queries == 0
+
+        auth_client.cookies[settings.DB_PRIMARY_COOKIE] = str(time.time() - 1)
+        _, _, replica_queries = queries(auth_client, 'get', reverse('goal-list'))
+        assert replica_queries > 0, 'После окна чтение снова из реплики'
+
+    def test_asgi(self, settings, user, replica, goal) -> None:
+        """ Под ASGI списки тоже читаются из реплики, а после изменения клиент закрепляется за основной базой """
+        client = AsyncClient()
+        client.force_login(user)
+
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = async_to_sync(client.get)(reverse('goal-list'))
+        assert response.status_code == status.HTTP_200_OK and len(response.json()) == 1
+        assert replica_queries
+
+        response = async_to_sync(client.patch)(reverse('goal', args=[goal.id]), {'title': 'renamed'},
+                                               content_type='application/json')
+        assert response.status_code == status.HTTP_200_OK
+        assert settings.DB_PRIMARY_COOKIE in response.cookies
+
+    def test_roles_from_primary(self, auth_client, replica, goal) -> None:
+        """ Роли на досках читаются из основной базы и в запросах, читающих из реплики """
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = auth_client.get(reverse('goal-list'))
+
+        assert response.status_code == status.HTTP_200_OK and len(response.json()) == 1
+        assert replica_queries and not any('goals_boardparticipant"."role' in query['sql']
+                                           for query in replica_queries.captured_queries)
+
+    def test_other_views_use_primary(self, auth_client, replica, goal) -> None:
+        _, _, replica_queries = queries(auth_client, 'get', reverse('board-stats', args=[goal.category.board_id]))
+        assert replica_queries == 0
+
+    def test_router(self, replica) -> None:
+        """ Вне запроса, в транзакции и при записи используется основная база """
+        from todolist.db.router import ReplicaRouter, _replica_reads
+
+        router = ReplicaRouter()
+        assert router.db_for_read(Goal) is None
+        token = _replica_reads.set(True)
+        try:
+            assert router.db_for_read(Goal) == 'replica'
+            with transaction.atomic():
+                assert router.db_for_read(Goal) == 'default'
+            assert router.db_for_write(Goal) == 'default'
+        finally:
+            _replica_reads.reset(token)
+        assert router.allow_migrate('replica', 'goals') is False
@@ -88,7 +88,7 @@ class GoalCommentFactory(factory.django.DjangoModelFactory):
     # text = 'test comment'
     goal = factory.SubFactory(GoalFactory)
     user = factory.SubFactory(UserFactory)
-    title = factory.Faker('sentence')
+    text = factory.Faker('sentence')
 
     class Meta:
         model = GoalComment
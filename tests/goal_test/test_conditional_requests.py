@@ -0,0 +1,183 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from goals.models import BoardParticipant, Goal
+from tests.factories import BoardFactory, BoardParticipantFactory, CategoryFactory, GoalCommentFactory, GoalFactory
+
+DETAIL_UPDATES = {
+    'goal': {'title': 'renamed'},
+    'category': {'title': 'renamed'},
+    'comment': {'text': 'renamed'},
+    'board': {'title': 'renamed'},
+}
+
+
+@pytest.fixture()
+def objects(user):
+    board = BoardFactory()
+    BoardParticipantFactory(board=board, user=user, role=BoardParticipant.Role.owner)
+    category = CategoryFactory(board=board, user=user)
+    goal = GoalFactory(category=category, user=user)
+    comment = GoalCommentFactory(goal=goal, user=user)
+    return {'board': board, 'category': category, 'goal': goal, 'comment': comment}
+
+
+@pytest.mark.django_db
+class TestConditionalDetail:
+
+    @pytest.mark.parametrize('url_name', DETAIL_UPDATES)
+    def test_not_modified(self, auth_client, objects, url_name) -> None:
+        """ Повторный GET с ETag или Last-Modified отвечает 304, после изменения — 200 """
+        url = reverse(url_name, args=[objects[url_name].pk])
+        response = auth_client.get(url)
+        etag = response['ETag']
+
+        response = auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag and not response.content
+        if url_name != 'board':
+            last_modified = auth_client.get(url)['Last-Modified']
+            assert auth_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == \
+                   status.HTTP_304_NOT_MODIFIED
+
+        auth_client.patch(url, DETAIL_UPDATES[url_name])
+        response = auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+    @pytest.mark.parametrize('url_name', DETAIL_UPDATES)
+    def test_if_match(self, auth_client, objects, url_name) -> None:
+        """ Изменение с устаревшим If-Match отклоняется 412, с актуальным — проходит и возвращает новый ETag """
+        url = reverse(url_name, args=[objects[url_name].pk])
+        etag = auth_client.get(url)['ETag']
+        response = auth_client.patch(url, DETAIL_UPDATES[url_name], HTTP_IF_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        new_etag = response['ETag']
+        assert new_etag != etag and auth_client.get(url)['ETag'] == new_etag
+
+        response = auth_client.patch(url, {'title': 'lost update', 'text': 'lost update'}, HTTP_IF_MATCH=etag)
+
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert 'lost update' not in auth_client.get(url).content.decode()
+        assert auth_client.delete(url, HTTP_IF_MATCH=etag).status_code == status.HTTP_412_PRECONDITION_FAILED
+
+    def test_board_participants_change_etag(self, auth_client, objects, another_user) -> None:
+        url = reverse('board', args=[objects['board'].pk])
+        etag = auth_client.get(url)['ETag']
+
+        participant = BoardParticipantFactory(board=objects['board'], user=another_user,
+                                              role=BoardParticipant.Role.reader)
+        assert auth_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+        etag = auth_client.get(url)['ETag']
+        participant.delete()
+        response = auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert 'Last-Modified' not in response, 'Удаление участника может уменьшить max(updated)'
+
+    @pytest.mark.parametrize('url_name', ['goal', 'category', 'comment'])
+    def test_author_change_etag(self, auth_client, objects, url_name) -> None:
+        """ Автор вложен в ответ: его изменение меняет ETag, хотя updated строки тот же """
+        url = reverse(url_name, args=[objects[url_name].pk])
+        etag = auth_client.get(url)['ETag']
+
+        auth_client.patch(reverse('profile'), {'first_name': 'Renamed'})
+
+        assert auth_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_goal_delete_updates_timestamp(self, auth_client, objects) -> None:
+        goal = objects['goal']
+
+        auth_client.delete(reverse('goal', args=[goal.pk]))
+
+        assert Goal.objects.get(pk=goal.pk).updated > goal.updated, 'Архивация должна сохранять updated'
+
+
+@pytest.mark.django_db
+class TestConditionalList:
+
+    @pytest.mark.parametrize('url_name', ['goal-list', 'category-list', 'comment-list', 'board-list'])
+    def test_not_modified(self, auth_client, objects, url_name) -> None:
+        url = reverse(url_name)
+        etag = auth_client.get(url, {'limit': 10})['ETag']
+
+        assert auth_client.get(url, {'limit': 10}, HTTP_IF_NONE_MATCH=etag).status_code == \
+               status.HTTP_304_NOT_MODIFIED
+        assert auth_client.get(url, {'limit': 5}, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK, \
+            'Другие параметры — другой ETag'
+
+    def test_list_changes(self, auth_client, user, objects) -> None:
+        """ ETag списка меняется при создании, изменении и архивации цели и зависит только от состава списка """
+        url = reverse('goal-list')
+        etags = [auth_client.get(url)['ETag']]
+
+        goal = GoalFactory(category=objects['category'], user=user)
+        etags.append(auth_client.get(url)['ETag'])
+        auth_client.patch(reverse('goal', args=[goal.pk]), {'priority': Goal.Priority.high})
+        etags.append(auth_client.get(url)['ETag'])
+        auth_client.delete(reverse('goal', args=[goal.pk]))
+        etags.append(auth_client.get(url)['ETag'])
+
+        assert etags[0] != etags[1] != etags[2] != etags[3]
+        assert etags[3] == etags[0], 'После архивации список совпадает с исходным'
+
+    @pytest.mark.parametrize('url_name', ['goal-list', 'category-list', 'comment-list'])
+    def test_author_change(self, auth_client, objects, url_name) -> None:
+        """ Изменение вложенного автора меняет ETag списка """
+        url = reverse(url_name)
+        etag = auth_client.get(url, {'limit': 10})['ETag']
+
+        auth_client.patch(reverse('profile'), {'first_name': 'Renamed'})
+
+        assert auth_client.get(url, {'limit': 10}, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_role_change(self, auth_client, user, objects) -> None:
+        """ Смена роли при том же наборе досок меняет ETag списка """
+        url = reverse('board-list')
+        etag = auth_client.get(url, {'limit': 10})['ETag']
+
+        participant = BoardParticipant.objects.get(board=objects['board'], user=user)
+        participant.role = BoardParticipant.Role.reader
+        participant.save()
+
+        assert auth_client.get(url, {'limit': 10}, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_user_specific(self, client, auth_client, objects, another_user) -> None:
+        """ Один и тот же адрес у разных пользователей дает разные ETag """
+        etag = auth_client.get(reverse('goal-list'))['ETag']
+        client.force_login(another_user)
+
+        assert client.get(reverse('goal-list'), HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_archived_row_changes_list(self, auth_client, user, objects) -> None:
+        """ Уход строки из списка не дает 304 ни по ETag, ни по If-Modified-Since """
+        url = reverse('goal-list')
+        goal = GoalFactory(category=objects['category'], user=user)
+        response = auth_client.get(url)
+        assert 'Last-Modified' not in response
+
+        Goal.objects.filter(pk=goal.pk).update_and_notify(status=Goal.Status.archived)
+
+        assert auth_client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == status.HTTP_200_OK
+        assert auth_client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT').status_code == \
+               status.HTTP_200_OK
+
+    def test_keyset_page(self, auth_client, user, objects) -> None:
+        """ Курсорная страница не агрегирует весь список, а ETag считается по ее строкам """
+        url = reverse('goal-list')
+        GoalFactory.create_batch(3, category=objects['category'], user=user)
+        with CaptureQueriesContext(connection) as queries:
+            response = auth_client.get(url, {'cursor': '', 'limit': 2})
+        assert not [query['sql'] for query in queries if 'COUNT(' in query['sql'] or 'MAX(' in query['sql']]
+        next_url = response.json()['next']
+
+        response = auth_client.get(next_url, HTTP_IF_NONE_MATCH=auth_client.get(next_url)['ETag'])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        etag = response['ETag']
+
+        last_goal = Goal.objects.filter(user=user).order_by('title', 'pk').last()
+        auth_client.patch(reverse('goal', args=[last_goal.pk]), {'priority': Goal.Priority.critical})
+        assert auth_client.get(next_url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
@@ -0,0 +1,56 @@
+import datetime
+
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from goals.fast_serializers import compile_serializer
+from goals.models import Goal
+from goals.serializers import BoardSerializer, CommentWithUserSerializer, GoalCategorySerializer, GoalSerializer
+from tests.factories import BoardFactory, BoardParticipantFactory, CategoryFactory, GoalFactory, GoalCommentFactory
+
+
+@pytest.fixture()
+def board_rows(user):
+    board = BoardFactory()
+    BoardParticipantFactory(board=board, user=user)
+    BoardParticipantFactory(board=BoardFactory(), user=user)
+    category = CategoryFactory(board=board)
+    goals = [
+        GoalFactory(category=category, description=None),
+        GoalFactory(category=category, description='Описание', due_date=datetime.date(2030, 1, 2),
+                    status=Goal.Status.in_progress, priority=Goal.Priority.critical),
+        GoalFactory(category=CategoryFactory(board=board), title='Ещё цель'),
+    ]
+    for goal in goals:
+        GoalCommentFactory(goal=goal)
+    return goals
+
+
+@pytest.mark.parametrize('serializer_class', [
+    GoalSerializer, CommentWithUserSerializer, GoalCategorySerializer, BoardSerializer,
+])
+def test_list_serializers_compile(serializer_class) -> None:
+    """ Сериализаторы списков поддерживают быстрый путь """
+    assert compile_serializer(serializer_class) is not None
+
+
+@pytest.mark.django_db
+class TestFastListSerialization:
+    """ Быстрый путь отдает тот же JSON, что и обычные сериализаторы DRF """
+
+    @pytest.mark.parametrize('url_name', ['goal-list', 'category-list', 'comment-list', 'board-list'])
+    @pytest.mark.parametrize('params', [
+        {}, {'limit': 2}, {'limit': 2, 'offset': 1}, {'limit': 2, 'cursor': ''}, {'ordering': '-created'},
+    ], ids=['plain', 'limit', 'offset', 'cursor', 'ordering'])
+    def test_byte_identical(self, auth_client, board_rows, url_name, params) -> None:
+        url = reverse(url_name)
+
+        with override_settings(GOALS_FAST_LIST_SERIALIZATION=False):
+            expected = auth_client.get(url, params)
+        with override_settings(GOALS_FAST_LIST_SERIALIZATION=True):
+            response = auth_client.get(url, params)
+
+        assert response.status_code == expected.status_code == status.HTTP_200_OK
+        assert response.content == expected.content
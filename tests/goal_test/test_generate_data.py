@@ -0,0 +1,85 @@
+import io
+from collections import Counter
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+
+from core.models import User
+from goals.datagen import CopyWriter, DataSpec, IntRange, Mix, generate, get_writer
+from goals.models import Board, BoardParticipant, Goal, GoalComment
+from goals.stats import reconcile_counters
+from tests.factories import GoalFactory
+
+METHODS = ['bulk', pytest.param('copy', marks=pytest.mark.skipif(
+    connection.vendor != 'postgresql', reason='COPY только в PostgreSQL'))]
+
+
+def make_spec(**kwargs) -> DataSpec:
+    return DataSpec(**{
+        'users': 20, 'boards': 5, 'participants': IntRange(2, 6), 'categories': IntRange(1, 3),
+        'goals': IntRange(0, 10), 'comments': IntRange(0, 2), 'password_hash': 'hash',
+        'statuses': Mix.parse('to_do=1,done=1', Goal.Status), **kwargs,
+    })
+
+
+@pytest.mark.django_db
+class TestGenerateData:
+
+    @pytest.mark.parametrize('method', METHODS)
+    def test_generate(self, method) -> None:
+        """ Данные соответствуют распределениям, счетчики целей сходятся, ORM продолжает нумерацию """
+        written = generate(make_spec(), get_writer(method), batch_size=7)
+
+        assert written['core.User'] == User.objects.count() == 20
+        assert written['goals.Goal'] == Goal.objects.count()
+        participants = Counter(BoardParticipant.objects.values_list('board_id', flat=True))
+        assert len(participants) == 5 and all(2 <= count <= 6 for count in participants.values())
+        assert BoardParticipant.objects.filter(role=BoardParticipant.Role.owner).values('board').distinct().count() == 5
+        assert set(Goal.objects.values_list('status', flat=True)) <= {Goal.Status.to_do, Goal.Status.done}
+        assert reconcile_counters(repair=False) == {}, 'Счетчики GoalCounter созданы вместе с целями'
+
+        goal = GoalFactory()
+        assert goal.pk > max(Goal.objects.exclude(pk=goal.pk).values_list('pk', flat=True), default=0)
+
+    def test_reproducible(self) -> None:
+        """ Одинаковый seed дает одинаковые данные """
+        first = generate(make_spec(seed=3, prefix='first'))
+        second = generate(make_spec(seed=3, prefix='second'))
+
+        assert first == second
+
+    def test_owner(self, user) -> None:
+        generate(make_spec(owner_id=user.id))
+
+        assert set(BoardParticipant.objects.filter(user=user, role=BoardParticipant.Role.owner).
+                   values_list('board_id', flat=True)) == set(Board.objects.values_list('pk', flat=True))
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql', reason='COPY только в PostgreSQL')
+    def test_copy_escaping(self) -> None:
+        goal = GoalFactory()
+        text = 'tab\there\nnew line \\N back\\slash'
+
+        CopyWriter().write(GoalComment, [{'id': 10 ** 6, 'goal_id': goal.id, 'user_id': goal.user_id,
+                                          'text': text, 'created': goal.created, 'updated': goal.updated}])
+
+        assert GoalComment.objects.get(pk=10 ** 6).text == text
+
+
+@pytest.mark.django_db
+class TestGenerateDataCommand:
+
+    def test_command(self, user) -> None:
+        call_command('generate_data', '--users', '10', '--boards', '3', '--goals', '5', '--comments', '1',
+                     '--password', 'secret', '--owner', user.username, stdout=io.StringIO())
+
+        generated = User.objects.exclude(pk=user.pk)
+        assert generated.count() == 10
+        assert all(generated_user.check_password('secret') for generated_user in generated[:2])
+        assert Goal.objects.filter(category__board__participants__user=user).count() == Goal.objects.count()
+
+    @pytest.mark.parametrize('args', [['--goals', '10-1'], ['--statuses', 'done=1,unknown=2'],
+                                      ['--owner', 'nobody']])
+    def test_invalid_arguments(self, args) -> None:
+        with pytest.raises(CommandError):
+            call_command('generate_data', *args)
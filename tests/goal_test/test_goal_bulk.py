@@ -0,0 +1,152 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from goals.models import BoardParticipant, Goal
+from goals.stats import reconcile_counters
+from tests.factories import BoardFactory, BoardParticipantFactory, CategoryFactory, GoalFactory
+
+
+@pytest.fixture()
+def category(user):
+    board = BoardFactory()
+    BoardParticipantFactory(board=board, user=user)
+    return CategoryFactory(board=board, user=user)
+
+
+@pytest.fixture()
+def reader_category(user):
+    board = BoardFactory()
+    BoardParticipantFactory(board=board, user=user, role=BoardParticipant.Role.reader)
+    return CategoryFactory(board=board)
+
+
+def statuses(response) -> list[int]:
+    return [result['status'] for result in response.json()['results']]
+
+
+@pytest.mark.django_db
+class TestGoalBulkCreate:
+    url = reverse('goal-bulk-create')
+
+    def test_create(self, auth_client, user, category) -> None:
+        items = [{'category': category.id, 'title': f'Цель {i}', 'priority': Goal.Priority.high} for i in range(3)]
+
+        response = auth_client.post(self.url, items, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        ids = [result['id'] for result in response.json()['results']]
+        goals = Goal.objects.in_bulk(ids)
+        assert [goals[pk].title for pk in ids] == ['Цель 0', 'Цель 1', 'Цель 2']
+        assert {(goal.user_id, goal.priority) for goal in goals.values()} == {(user.id, Goal.Priority.high)}
+        assert all(goal.created and goal.updated for goal in goals.values())
+        assert reconcile_counters(repair=False) == {}
+
+    def test_partial_errors(self, auth_client, category, reader_category) -> None:
+        """ Ошибочные элементы отклоняются по отдельности, остальные создаются """
+        items = [
+            {'category': category.id, 'title': 'ok'},
+            {'category': category.id},
+            {'category': reader_category.id, 'title': 'forbidden'},
+            {'category': 0, 'title': 'missing'},
+        ]
+
+        response = auth_client.post(self.url, items, format='json')
+
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        assert statuses(response) == [201, 400, 403, 400]
+        assert 'title' in response.json()['results'][1]['errors']
+        assert list(Goal.objects.values_list('title', flat=True)) == ['ok']
+
+    def test_all_invalid(self, auth_client, reader_category) -> None:
+        response = auth_client.post(self.url, [{'category': reader_category.id, 'title': 'x'}], format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Goal.objects.exists()
+
+    @pytest.mark.parametrize('body', [[], {'title': 'not a list'}])
+    def test_invalid_body(self, auth_client, body) -> None:
+        assert auth_client.post(self.url, body, format='json').status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_max_items(self, auth_client, settings, category) -> None:
+        settings.GOALS_BULK_MAX_ITEMS = 2
+        items = [{'category': category.id, 'title': 'x'}] * 3
+
+        assert auth_client.post(self.url, items, format='json').status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_constant_queries(self, auth_client, category) -> None:
+        """ Число запросов не зависит от размера пакета """
+        counts = []
+        for size in (2, 20):
+            items = [{'category': category.id, 'title': f'Цель {i}', 'due_date': f'2030-01-{i + 1:02}'}
+                     for i in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                response = auth_client.post(self.url, items, format='json')
+            assert response.status_code == status.HTTP_201_CREATED
+            counts.append(len(queries))
+
+        assert counts[0] == counts[1], counts
+
+
+@pytest.mark.django_db
+class TestGoalBulkUpdate:
+    url = reverse('goal-bulk-update')
+
+    def test_update(self, auth_client, user, category) -> None:
+        goals = GoalFactory.create_batch(3, category=category, user=user)
+        other = CategoryFactory(board=category.board, user=user)
+        items = [
+            {'id': goals[0].id, 'status': Goal.Status.done},
+            {'id': goals[1].id, 'priority': Goal.Priority.critical, 'due_date': '2030-01-01'},
+            {'id': goals[2].id, 'category': other.id},
+        ]
+
+        response = auth_client.patch(self.url, items, format='json')
+
+        assert response.status_code == status.HTTP_200_OK, response.content
+        goals = [Goal.objects.get(pk=goal.pk) for goal in goals]
+        assert goals[0].status == Goal.Status.done and goals[0].priority == Goal.Priority.medium
+        assert goals[1].priority == Goal.Priority.critical and str(goals[1].due_date) == '2030-01-01'
+        assert goals[2].category_id == other.id
+        assert reconcile_counters(repair=False) == {}
+
+    def test_errors(self, auth_client, user, category, reader_category, another_user) -> None:
+        goal = GoalFactory(category=category, user=user)
+        read_only = GoalFactory(category=reader_category)
+        archived = GoalFactory(category=category, status=Goal.Status.archived)
+        foreign = GoalFactory()
+        items = [
+            {'id': goal.id, 'status': Goal.Status.in_progress},
+            {'id': read_only.id, 'status': Goal.Status.done},
+            {'id': archived.id, 'status': Goal.Status.done},
+            {'id': foreign.id, 'status': Goal.Status.done},
+            {'id': goal.id, 'status': Goal.Status.done},
+            {'id': goal.id, 'category': reader_category.id},
+            {'id': goal.id, 'status': 42},
+        ]
+
+        response = auth_client.patch(self.url, items, format='json')
+
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        assert statuses(response) == [200, 403, 404, 404, 400, 403, 400]
+        assert Goal.objects.get(pk=goal.pk).status == Goal.Status.in_progress
+        assert Goal.objects.get(pk=read_only.pk).status == Goal.Status.to_do
+
+
+@pytest.mark.django_db
+class TestGoalBulkArchive:
+    url = reverse('goal-bulk-archive')
+
+    def test_archive(self, auth_client, user, category, reader_category) -> None:
+        goals = GoalFactory.create_batch(2, category=category, user=user)
+        read_only = GoalFactory(category=reader_category)
+
+        response = auth_client.post(self.url, [goals[0].id, goals[1].id, read_only.id, 0, 'x'], format='json')
+
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        assert statuses(response) == [200, 200, 403, 404, 400]
+        assert set(Goal.objects.filter(status=Goal.Status.archived).values_list('pk', flat=True)) == \
+               {goal.pk for goal in goals}
+        assert reconcile_counters(repair=False) == {}
@@ -0,0 +1,104 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from tests.factories import BoardFactory, BoardParticipantFactory, CategoryFactory, GoalFactory, GoalCommentFactory
+
+
+def _collect_pages(client, url: str, params: dict) -> list:
+    """Проходит все страницы по ссылкам next и возвращает результаты подряд"""
+    response = client.get(url, {**params, 'cursor': ''})
+    assert response.status_code == status.HTTP_200_OK
+    results = list(response.json()['results'])
+    while response.json()['next']:
+        response = client.get(response.json()['next'])
+        assert response.status_code == status.HTTP_200_OK
+        results.extend(response.json()['results'])
+    return results
+
+
+@pytest.mark.django_db
+class TestGoalKeysetPagination:
+    """ Тесты курсорной пагинации списка целей """
+    url: str = reverse('goal-list')
+
+    @pytest.fixture()
+    def goals(self, user):
+        board = BoardFactory()
+        BoardParticipantFactory(board=board, user=user)
+        category = CategoryFactory(board=board)
+        # одинаковые заголовки проверяют стабильность сортировки по pk
+        return GoalFactory.create_batch(size=4, category=category, title='Same') + \
+            GoalFactory.create_batch(size=3, category=category)
+
+    def test_cursor_pages_cover_list_once(self, auth_client, goals) -> None:
+        """
+        Проход по всем страницам курсором возвращает каждую цель ровно один раз
+        в порядке (title, id)
+        """
+        goals_list = sorted(auth_client.get(self.url).json(), key=lambda goal: (goal['title'], goal['id']))
+        expected = [goal['id'] for goal in goals_list]
+
+        results = _collect_pages(auth_client, self.url, {'limit': 2})
+
+        assert [goal['id'] for goal in results] == expected
+        assert len(expected) == len(goals)
+
+    def test_cursor_with_ordering_param(self, auth_client, goals) -> None:
+        """ Курсор работает с разрешенными ordering_fields """
+        expected = [goal['id'] for goal in auth_client.get(self.url, {'ordering': '-created'}).json()]
+
+        results = _collect_pages(auth_client, self.url, {'limit': 3, 'ordering': '-created'})
+
+        assert [goal['id'] for goal in results] == expected
+
+    def test_previous_link(self, auth_client, goals) -> None:
+        """ Ссылка previous возвращает предыдущую страницу """
+        first = auth_client.get(self.url, {'limit': 3, 'cursor': ''}).json()
+        second = auth_client.get(first['next']).json()
+
+        previous = auth_client.get(second['previous']).json()
+
+        assert first['previous'] is None
+        assert previous['results'] == first['results']
+
+    def test_invalid_cursor(self, auth_client, goals) -> None:
+        """ Некорректный курсор возвращает 404 """
+        response = auth_client.get(self.url, {'cursor': 'garbage'})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_cursor_from_other_ordering(self, auth_client, goals) -> None:
+        """ Курсор, выданный для другой сортировки, не принимается """
+        page = auth_client.get(self.url, {'limit': 2, 'cursor': ''}).json()
+        cursor = page['next'].split('cursor=')[1].split('&')[0]
+
+        response = auth_client.get(self.url, {'cursor': cursor, 'ordering': 'created'})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_offset_pagination_still_available(self, auth_client, goals) -> None:
+        """ Без параметра cursor используется limit/offset пагинация """
+        response = auth_client.get(self.url, {'limit': 2, 'offset': 2})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['count'] == len(goals)
+        assert len(response.json()['results']) == 2
+
+
+@pytest.mark.django_db
+class TestCommentKeysetPagination:
+    """ Тесты курсорной пагинации комментариев """
+    url: str = reverse('comment-list')
+
+    def test_comment_cursor_pages(self, auth_client, user) -> None:
+        """ Комментарии листаются курсором в порядке -created """
+        board = BoardFactory()
+        BoardParticipantFactory(board=board, user=user)
+        goal = GoalFactory(category=CategoryFactory(board=board))
+        GoalCommentFactory.create_batch(size=5, goal=goal)
+        expected = [comment['id'] for comment in auth_client.get(self.url).json()]
+
+        results = _collect_pages(auth_client, self.url, {'limit': 2, 'goal': goal.id})
+
+        assert [comment['id'] for comment in results] == expected
@@ -0,0 +1,114 @@
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from goals.models import Goal, GoalCategory
+from goals.search import build_search_query
+from tests.factories import BoardFactory, BoardParticipantFactory, CategoryFactory, GoalFactory
+
+postgres_only = pytest.mark.skipif(connection.vendor != 'postgresql', reason='Полнотекстовый поиск только в PostgreSQL')
+
+
+@pytest.fixture()
+def category(user):
+    board = BoardFactory()
+    BoardParticipantFactory(board=board, user=user)
+    return CategoryFactory(board=board, user=user, title='Программирование')
+
+
+def search(auth_client, query: str, url_name: str = 'goal-list', **params) -> list[str]:
+    response = auth_client.get(reverse(url_name), {'search': query, **params})
+    assert response.status_code == status.HTTP_200_OK
+    return [item['title'] for item in response.json()]
+
+
+@pytest.mark.django_db
+class TestGoalSearch:
+
+    def test_search_by_title_and_description(self, auth_client, category) -> None:
+        """ search= находит цели по заголовку и описанию на любой СУБД """
+        GoalFactory(category=category, title='Выучить python', description=None)
+        GoalFactory(category=category, title='Спорт', description='Бегать по утрам и учить python')
+        GoalFactory(category=category, title='Прочее', description=None)
+
+        assert sorted(search(auth_client, 'python')) == ['Выучить python', 'Спорт']
+
+    def test_category_search(self, auth_client, category) -> None:
+        assert search(auth_client, 'Программирование', 'category-list') == ['Программирование']
+
+    @postgres_only
+    def test_morphology_and_prefix(self, auth_client, category) -> None:
+        """ Словоформы (русские и английские) и начало слова находят цель """
+        GoalFactory(category=category, title='Прочитать книги', description=None)
+        GoalFactory(category=category, title='Running every morning', description=None)
+        GoalFactory(category=category, title='Программа тренировок', description=None)
+
+        assert search(auth_client, 'книгу') == ['Прочитать книги']
+        assert search(auth_client, 'run') == ['Running every morning']
+        assert search(auth_client, 'прогр') == ['Программа тренировок']
+        assert search(auth_client, 'книгу тренировок') == [], 'Слова запроса объединяются через AND'
+
+    @postgres_only
+    def test_ranking(self, auth_client, category) -> None:
+        """ Совпадение в заголовке выше совпадения в описании, явный ordering важнее ранга """
+        GoalFactory(category=category, title='А: прочее', description='Купить молоко')
+        GoalFactory(category=category, title='Б: молоко', description=None)
+
+        assert search(auth_client, 'молоко') == ['Б: молоко', 'А: прочее']
+        assert search(auth_client, 'молоко', ordering='title') == ['А: прочее', 'Б: молоко']
+
+    @postgres_only
+    def test_vector_follows_changes(self, auth_client, category) -> None:
+        """ Триггер пересчитывает вектор при изменении текста; массовая смена статуса его не сбрасывает """
+        goal = GoalFactory(category=category, title='Старый заголовок', description=None)
+        goal.title = 'Новый заголовок'
+        goal.save()
+        Goal.objects.filter(pk=goal.pk).update_and_notify(status=Goal.Status.in_progress)
+
+        assert search(auth_client, 'новый') == ['Новый заголовок']
+        assert search(auth_client, 'старый') == []
+
+    @postgres_only
+    @pytest.mark.parametrize('fast', [True, False])
+    def test_keyset_pages_by_rank(self, auth_client, category, fast) -> None:
+        """ Курсорная пагинация проходит ранжированную выдачу без пропусков и повторов """
+        for i in range(7):
+            GoalFactory(category=category, title=f'молоко {i}', description='молоко' if i % 2 else None)
+
+        titles, params = [], {'search': 'молоко', 'limit': 3, 'cursor': ''}
+        with override_settings(GOALS_FAST_LIST_SERIALIZATION=fast):
+            for _ in range(5):
+                data = auth_client.get(reverse('goal-list'), params).json()
+                titles.extend(item['title'] for item in data['results'])
+                if not data['next']:
+                    break
+                params['cursor'] = parse_qs(urlparse(data['next']).query)['cursor'][0]
+
+        assert sorted(titles) == [f'молоко {i}' for i in range(7)]
+        assert titles[:3] == ['молоко 1', 'молоко 3', 'молоко 5'], 'Сначала совпадения и в заголовке, и в описании'
+
+    @postgres_only
+    def test_trigram_fallback(self, auth_client, category, monkeypatch) -> None:
+        """ Вхождение в середине слова ищется для одного слова или когда полнотекстовый поиск пуст """
+        monkeypatch.setattr('goals.search.has_trigram', lambda using: True)
+        GoalFactory(category=category, title='Читать книги', description=None)
+        GoalFactory(category=category, title='Прочитать книги', description=None)
+
+        assert sorted(search(auth_client, 'читать')) == ['Прочитать книги', 'Читать книги']
+        assert search(auth_client, 'читать книги') == ['Читать книги'], 'Полнотекстовых совпадений достаточно'
+        assert search(auth_client, 'очитать книги') == ['Прочитать книги']
+
+    @postgres_only
+    @pytest.mark.parametrize('model', [Goal, GoalCategory])
+    def test_search_uses_gin_index(self, model) -> None:
+        """ Условие поиска обслуживается GIN-индексом по search_vector """
+        queryset = model.objects.filter(search_vector=build_search_query(['python']))
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+        assert f'{model._meta.db_table}_search_idx' in plan, plan
@@ -0,0 +1,61 @@
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.models import User
+from goals.models import Goal, GoalCategory, GoalComment
+from tests.factories import BoardFactory, BoardParticipantFactory
+
+PAGE_SIZES = [10, 100, 1000]
+
+
+@pytest.fixture()
+def board_with_rows(user):
+    """
+    Создает доску пользователя, где у каждой категории, цели и комментария свой автор,
+    чтобы ленивые обращения к user сразу давали N+1
+    """
+    def create(size: int):
+        now = timezone.now()
+        board = BoardFactory()
+        BoardParticipantFactory(board=board, user=user)
+        authors = User.objects.bulk_create([User(username=f'author_{size}_{i}') for i in range(size)])
+        categories = GoalCategory.objects.bulk_create([
+            GoalCategory(board=board, user=author, title=f'category {i}', created=now, updated=now)
+            for i, author in enumerate(authors)
+        ])
+        goals = Goal.objects.bulk_create([
+            Goal(category=category, user=author, title=f'goal {i}', created=now, updated=now)
+            for i, (category, author) in enumerate(zip(categories, authors))
+        ])
+        GoalComment.objects.bulk_create([
+            GoalComment(goal=goal, user=author, text='comment', created=now, updated=now)
+            for goal, author in zip(goals, authors)
+        ])
+    return create
+
+
+def _get_page(client, url: str, size: int) -> None:
+    response = client.get(url, {'limit': size})
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()['results']
+    assert len(results) == size
+    assert len({row['id'] for row in results}) == size, "В списке есть дубликаты"
+
+
+@pytest.mark.django_db
+class TestListQueryCount:
+    """ Число запросов списков не зависит от размера страницы """
+
+    @pytest.mark.parametrize('url_name', ['goal-list', 'category-list', 'comment-list'])
+    def test_constant_queries(self, auth_client, board_with_rows, url_name, django_assert_num_queries) -> None:
+        url = reverse(url_name)
+        board_with_rows(PAGE_SIZES[-1])
+        # первый запрос кладет роли пользователя в кэш
+        _get_page(auth_client, url, 1)
+
+        for size in PAGE_SIZES:
+            # сессия, пользователь, count и страница вместе с авторами
+            with django_assert_num_queries(4):
+                _get_page(auth_client, url, size)
@@ -0,0 +1,125 @@
+import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.models import User
+from goals.models import Board, BoardParticipant, Goal, GoalCategory, GoalComment
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'postgresql', reason='EXPLAIN-проверка индексов только для PostgreSQL'
+)
+
+# Таблицы, которые на реальных объемах нельзя читать целиком
+LARGE_TABLES = ['goals_boardparticipant', 'goals_goalcategory', 'goals_goal', 'goals_goalcomment']
+
+LIST_TABLES = {'goal-list': 'goals_goal', 'category-list': 'goals_goalcategory', 'comment-list': 'goals_goalcomment'}
+
+# (список, ordering, индекс, который должен обслуживать страницу)
+LIST_CASES = [
+    ('goal-list', None, 'goal_active_cat_title_idx'),
+    ('goal-list', 'created', 'goal_active_cat_created_idx'),
+    ('goal-list', '-created', 'goal_active_cat_created_idx'),
+    ('category-list', None, 'category_active_board_idx'),
+    ('comment-list', None, 'comment_goal_created_idx'),
+    ('comment-list', 'created', 'comment_goal_created_idx'),
+]
+
+PAGES = [
+    pytest.param({'cursor': ''}, id='keyset'),
+    pytest.param({'offset': 20}, id='offset'),
+]
+
+
+@pytest.fixture()
+def seeded_board(user):
+    """
+    Доска пользователя с накопленной историей среди чужих досок: много категорий (часть удалена),
+    категория с большей частью целей в архиве и цель с длинной лентой комментариев.
+
+    Объемы и перекосы подобраны так, чтобы после ANALYZE планировщик сам выбирал индексы.
+    """
+    now = timezone.now()
+    others = User.objects.bulk_create([User(username=f'seed_{i}') for i in range(3)])
+    boards = Board.objects.bulk_create([Board(title=f'board {i}', created=now, updated=now) for i in range(1000)])
+    BoardParticipant.objects.bulk_create(
+        [BoardParticipant(board=boards[0], user=user, created=now, updated=now)]
+        + [
+            BoardParticipant(board=board, user=other, role=BoardParticipant.Role.reader, created=now, updated=now)
+            for board in boards for other in others
+        ]
+    )
+    categories = GoalCategory.objects.bulk_create([
+        GoalCategory(board=boards[0], user=user, title=f'category {i}', is_deleted=i % 10 == 9,
+                     created=now - datetime.timedelta(minutes=i), updated=now)
+        for i in range(2000)
+    ] + [
+        GoalCategory(board=board, user=user, title='category', created=now, updated=now)
+        for board in boards[1:200] for _ in range(5)
+    ])
+    goals = Goal.objects.bulk_create([
+        Goal(category=categories[0], user=user, title=f'goal {i}',
+             status=Goal.Status.to_do if i % 4 == 0 else Goal.Status.archived,
+             created=now - datetime.timedelta(minutes=i), updated=now)
+        for i in range(2000)
+    ] + [
+        Goal(category=category, user=user, title='goal', created=now, updated=now) for category in categories[1:]
+    ])
+    GoalComment.objects.bulk_create([
+        GoalComment(goal=goals[0], user=user, text='comment', created=now - datetime.timedelta(minutes=i), updated=now)
+        for i in range(2000)
+    ] + [
+        GoalComment(goal=goal, user=user, text='comment', created=now, updated=now) for goal in goals[1:]
+    ])
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return categories[0], goals[0]
+
+
+def explain(sql: str) -> str:
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN ' + sql)
+        return '\n'.join(row[0] for row in cursor.fetchall())
+
+
+@pytest.mark.django_db
+class TestListQueryPlans:
+    """ Списки обслуживаются своими индексами и в курсорном, и в offset-режиме """
+
+    @pytest.mark.parametrize('page', PAGES)
+    @pytest.mark.parametrize('url_name, ordering, index', LIST_CASES)
+    def test_list_uses_index(self, auth_client, seeded_board, url_name, ordering, index, page) -> None:
+        category, goal = seeded_board
+        params = {'limit': 10, **page}
+        if ordering:
+            params['ordering'] = ordering
+        if url_name == 'goal-list':
+            params['category'] = category.id
+        if url_name == 'comment-list':
+            params['goal'] = goal.id
+
+        with CaptureQueriesContext(connection) as queries:
+            response = auth_client.get(reverse(url_name), params)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results']
+
+        # COUNT/MAX для ETag offset-страницы читает весь список и может законно идти Seq Scan;
+        # проверяются выборка ролей и сама страница
+        table = LIST_TABLES[url_name]
+        roles = [query['sql'] for query in queries if query['sql'].startswith('SELECT "goals_boardparticipant"')]
+        pages = [
+            query['sql'] for query in queries
+            if query['sql'].startswith(f'SELECT "{table}"."id"') and ' LIMIT ' in query['sql']
+            and 'ORDER BY' in query['sql']
+        ]
+        assert roles and len(pages) == 1
+
+        for sql, expected in [*((sql, 'participant_user_role_idx') for sql in roles), (pages[0], index)]:
+            plan = explain(sql)
+            assert expected in plan, f'Запрос не использует {expected}:\n{sql}\n{plan}'
+            for large_table in LARGE_TABLES:
+                assert f'Seq Scan on {large_table} ' not in plan, f'Последовательное сканирование:\n{sql}\n{plan}'
@@ -0,0 +1,152 @@
+import json
+
+import pytest
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.urls import reverse
+from rest_framework import status
+
+from goals.models import BoardParticipant, Goal
+from tests.factories import BoardFactory, BoardParticipantFactory, CategoryFactory, GoalCommentFactory, GoalFactory
+
+
+@pytest.fixture(autouse=True)
+def no_lag(settings):
+    settings.GOALS_SYNC_LAG = 0
+
+
+@pytest.fixture()
+def category(user):
+    board = BoardFactory()
+    BoardParticipantFactory(board=board, user=user, role=BoardParticipant.Role.owner)
+    return CategoryFactory(board=board, user=user)
+
+
+def sync(client, token: str = '') -> dict:
+    response = client.get(reverse('sync'), {'since': token} if token else {})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.streaming, 'Ответ отдается потоком'
+    return json.loads(b''.join(response.streaming_content))
+
+
+def ids(data: dict, name: str) -> list[int]:
+    return [item['id'] for item in data[name]]
+
+
+# В PostgreSQL отдаются строки только завершенных транзакций, поэтому тесты не оборачиваются в одну транзакцию
+@pytest.mark.django_db(transaction=True)
+class TestSync:
+
+    def test_full_then_incremental(self, auth_client, user, category) -> None:
+        """ Первый запрос отдает все, следующий — только изменения после токена """
+        goal = GoalFactory(category=category, user=user)
+        comment = GoalCommentFactory(goal=goal, user=user)
+        GoalFactory(category=CategoryFactory(), user=user)
+
+        data = sync(auth_client)
+
+        assert data['board_ids'] == [category.board_id]
+        assert ids(data, 'boards') == [category.board_id]
+        assert ids(data, 'categories') == [category.id]
+        assert ids(data, 'goals') == [goal.id], 'Цели чужих досок не отдаются'
+        assert ids(data, 'comments') == [comment.id]
+        assert data['goals'][0]['title'] == goal.title and not data['has_more']
+
+        data = sync(auth_client, data['token'])
+        assert [data[name] for name in ('boards', 'categories', 'goals', 'comments')] == [[], [], [], []]
+
+        goal.title = 'renamed'
+        goal.save()
+        new_goal = GoalFactory(category=category, user=user)
+
+        data = sync(auth_client, data['token'])
+        assert ids(data, 'goals') == [goal.id, new_goal.id]
+        assert data['goals'][0]['title'] == 'renamed'
+        assert data['boards'] == [] and data['comments'] == []
+
+    def test_tombstones(self, auth_client, user, category) -> None:
+        goals = GoalFactory.create_batch(2, category=category, user=user)
+        token = sync(auth_client)['token']
+
+        auth_client.delete(reverse('goal', args=[goals[0].id]))
+        auth_client.delete(reverse('board', args=[category.board_id]))
+        data = sync(auth_client, token)
+
+        assert data['deleted'] == {'boards': [category.board_id], 'categories': [], 'goals': [goals[0].id],
+                                   'comments': []}
+        assert data['boards'] == [] and data['goals'] == []
+
+    def test_limit_pages_without_gaps(self, auth_client, settings, user, category) -> None:
+        """ Изменения сверх GOALS_SYNC_MAX_ITEMS отдаются следующими ответами без пропусков и повторов """
+        settings.GOALS_SYNC_MAX_ITEMS = 3
+        goals = Goal.objects.bulk_create_and_notify(
+            [Goal(category=category, user=user, title=f'goal {i}') for i in range(7)]
+        )
+        received, token, responses = [], '', 0
+        while True:
+            data = sync(auth_client, token)
+            responses += 1
+            received.extend(ids(data, 'goals'))
+            assert sum(len(data[name]) for name in ('boards', 'categories', 'goals', 'comments')) <= 3
+            token = data['token']
+            if not data['has_more']:
+                break
+
+        assert sorted(received) == sorted(goal.id for goal in goals), 'Все цели одной отметки updated отданы один раз'
+        assert responses == 3, 'Доска, категория и 7 целей — три ответа'
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql', reason='sync_xid назначает триггер PostgreSQL')
+    def test_open_transaction(self, auth_client, user, category) -> None:
+        """ Изменение транзакции, закоммиченной после выдачи токена, не пропускается, даже если она начата раньше """
+        goal = GoalFactory(category=category, user=user)
+        token = sync(auth_client)['token']
+
+        other = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            other.set_autocommit(False)
+            with other.cursor() as cursor:
+                cursor.execute("UPDATE goals_goal SET title = 'slow' WHERE id = %s", [goal.id])
+            later = GoalFactory(category=category, user=user)
+
+            data = sync(auth_client, token)
+            assert data['goals'] == [], 'Изменения после незавершенной транзакции ждут ее коммита'
+            other.commit()
+        finally:
+            other.close()
+
+        data = sync(auth_client, data['token'])
+        assert ids(data, 'goals') == [goal.id, later.id]
+        assert data['goals'][0]['title'] == 'slow'
+
+    @pytest.mark.skipif(connection.vendor == 'postgresql', reason='GOALS_SYNC_LAG — только без PostgreSQL')
+    def test_lag(self, auth_client, settings, user, category) -> None:
+        """ Изменения моложе GOALS_SYNC_LAG не отдаются и не пропускаются следующим токеном """
+        settings.GOALS_SYNC_LAG = 60
+        GoalFactory(category=category, user=user)
+
+        data = sync(auth_client)
+        assert data['goals'] == [] and data['boards'] == []
+
+        settings.GOALS_SYNC_LAG = 0
+        assert len(sync(auth_client, data['token'])['goals']) == 1
+
+    def test_new_board_resets_token(self, auth_client, user, category) -> None:
+        """ После получения доступа к доске синхронизация начинается заново, с уже существующими целями доски """
+        token = sync(auth_client)['token']
+        other_category = CategoryFactory()
+        goal = GoalFactory(category=other_category)
+
+        BoardParticipantFactory(board=other_category.board, user=user, role=BoardParticipant.Role.reader)
+        data = sync(auth_client, token)
+
+        assert data['board_ids'] == sorted([category.board_id, other_category.board_id])
+        assert ids(data, 'goals') == [goal.id]
+        assert set(ids(data, 'boards')) == {category.board_id, other_category.board_id}
+
+    @pytest.mark.parametrize('token', ['garbage', 'e30', 'eyJwIjp7ImdvYWxzIjpbIngiLDFdfSwiYiI6W119'])
+    def test_invalid_token(self, auth_client, token) -> None:
+        response = auth_client.get(reverse('sync'), {'since': token})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json() == {'since': ['Invalid sync token.']}
+
+    def test_auth_required(self, client) -> None:
+        assert client.get(reverse('sync')).status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,137 @@
+import ast
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework import status
+
+from benchmarks.fake_telegram import FakeTelegramServer
+from bot.management.commands.runbot import Command
+from bot.tg.client import TgClient
+from goals.models import BoardParticipant
+from tests.factories import BoardFactory, BoardParticipantFactory, CategoryFactory, GoalFactory
+
+
+def sample(name: str, **labels: str) -> float:
+    """ Значение метрики процесса; метрики общие для всех тестов, поэтому сравниваются приращения """
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def debug_from_env(value: str):
+    """ DEBUG из todolist.settings при переменной окружения DEBUG=value, в отдельном процессе """
+    output = subprocess.run([sys.executable, '-c', 'from todolist import settings; print(repr(settings.DEBUG))'],
+                            env={**os.environ, 'DEBUG': value}, capture_output=True, text=True, check=True).stdout
+    return ast.literal_eval(output.strip())
+
+
+@pytest.fixture()
+def board(user):
+    board = BoardFactory()
+    BoardParticipantFactory(board=board, user=user, role=BoardParticipant.Role.owner)
+    GoalFactory.create_batch(3, category=CategoryFactory(board=board, user=user), user=user)
+    return board
+
+
+@pytest.mark.django_db
+class TestRequestMetrics:
+
+    def test_view_metrics(self, auth_client, board) -> None:
+        """ Запрос учитывается по имени URL вместе с числом запросов к БД и временем в БД """
+        requests = sample('http_requests_total', view='goal-list', method='GET', status='200')
+        queries = sample('http_request_db_queries_sum', view='goal-list')
+        observed = sample('http_request_duration_seconds_count', view='goal-list', method='GET')
+
+        for _ in range(2):
+            assert auth_client.get(reverse('goal-list')).status_code == status.HTTP_200_OK
+
+        assert sample('http_requests_total', view='goal-list', method='GET', status='200') == requests + 2
+        assert sample('http_request_duration_seconds_count', view='goal-list', method='GET') == observed + 2
+        assert sample('http_request_db_queries_sum', view='goal-list') > queries
+        assert sample('http_request_db_duration_seconds_sum', view='goal-list') > 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_view_metrics_asgi(self, user, board) -> None:
+        """ Под ASGI запросы к БД из потока представления тоже учитываются """
+        client = AsyncClient()
+        client.force_login(user)
+        requests = sample('http_requests_total', view='goal-list', method='GET', status='200')
+        queries = sample('http_request_db_queries_sum', view='goal-list')
+
+        assert async_to_sync(client.get)(reverse('goal-list')).status_code == status.HTTP_200_OK
+
+        assert sample('http_requests_total', view='goal-list', method='GET', status='200') == requests + 1
+        assert sample('http_request_db_queries_sum', view='goal-list') > queries
+
+    def test_status_and_unmatched(self, auth_client, board) -> None:
+        """ У неизвестных URL и методов одно значение метки, чтобы число рядов не росло """
+        not_found = sample('http_requests_total', view='board', method='GET', status='404')
+        unmatched = sample('http_requests_total', view='<unmatched>', method='other', status='404')
+
+        auth_client.get(reverse('board', args=[board.id + 1000]))
+        auth_client.generic('PROPFIND', '/no/such/url/')
+
+        assert sample('http_requests_total', view='board', method='GET', status='404') == not_found + 1
+        assert sample('http_requests_total', view='<unmatched>', method='other', status='404') == unmatched + 1
+
+    def test_metrics_endpoint(self, client, settings, auth_client, board) -> None:
+        auth_client.get(reverse('board', args=[board.id]))
+        settings.METRICS_TOKEN = None
+        settings.DEBUG = True
+
+        response = client.get(reverse('metrics'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'].startswith('text/plain')
+        assert 'http_requests_total{method="GET",status="200",view="board"}' in response.content.decode()
+
+    def test_metrics_token(self, client, settings) -> None:
+        settings.METRICS_TOKEN = 'secret'
+
+        assert client.get(reverse('metrics')).status_code == status.HTTP_403_FORBIDDEN
+        response = client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        assert response.status_code == status.HTTP_200_OK
+
+    @pytest.mark.parametrize('debug', ['0', 'False', ''])
+    def test_metrics_closed_without_token(self, client, settings, debug) -> None:
+        """ Без METRICS_TOKEN метрики закрыты, если DEBUG выключен так, как в docker-compose и CI """
+        settings.METRICS_TOKEN = None
+        settings.DEBUG = debug_from_env(debug)
+
+        assert settings.DEBUG is False
+        assert client.get(reverse('metrics')).status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestBotMetrics:
+
+    @pytest.mark.parametrize('text, command', [('/goals', '/goals'), ('/goals today', '/goals'),
+                                               ('/cancel', '/cancel'), ('Цель', 'text')])
+    def test_command_duration(self, tg_user_factory, user_factory, text, command) -> None:
+        tg_user = tg_user_factory(user=user_factory())
+        handled = sample('bot_command_duration_seconds_count', command=command)
+
+        with patch.object(TgClient, 'send_message'):
+            Command().handle_message(SimpleNamespace(chat=SimpleNamespace(id=tg_user.chat_id), text=text))
+
+        assert sample('bot_command_duration_seconds_count', command=command) == handled + 1
+
+    def test_api_requests(self) -> None:
+        """ Каждая попытка вызова Bot API учитывается со своим статусом, включая повторы """
+        ok = sample('bot_api_requests_total', method='getUpdates', status='200')
+        failed = sample('bot_api_requests_total', method='getUpdates', status='502')
+
+        with FakeTelegramServer() as server:
+            client = TgClient(token='token', api_url=server.url, sleep=lambda delay: None)
+            server.fail_next(502)
+            client.get_updates(offset=0, timeout=0)
+            client.close()
+
+        assert sample('bot_api_requests_total', method='getUpdates', status='200') == ok + 1
+        assert sample('bot_api_requests_total', method='getUpdates', status='502') == failed + 1
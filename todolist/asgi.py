@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todolist.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# События досок по WebSocket/SSE обслуживаются без Django-представлений (goals.realtime)
+from goals.realtime import BoardEventsApplication  # noqa: E402
+
+application = BoardEventsApplication(django_application)
@@ -0,0 +1,29 @@
+"""
+Кэши, которые сбрасываются из другого процесса.
+
+Кэш ролей (goals.access) и страниц бота (bot.goal_pages) сбрасывает процесс, изменивший данные.
+LocMemCache живет в памяти одного процесса: воркеры gunicorn и бот его сброс не увидят
+и будут отдавать устаревшие данные до истечения таймаута. Поэтому такие кэши включаются,
+только если бэкенд общий (Redis, Memcached, БД) или явно задано, что процесс один
+(CACHE_ALLOW_PROCESS_LOCAL=1: runserver без бота, тесты).
+"""
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def is_process_local(cache: BaseCache) -> bool:
+    return isinstance(cache, LocMemCache)
+
+
+def shared_cache(alias: Optional[str]) -> Optional[BaseCache]:
+    """Кэш alias, если его видят все процессы; None — кэш выключен и данные читаются из БД"""
+    if not alias:
+        return None
+    cache = caches[alias]
+    if isinstance(cache, DummyCache) or (is_process_local(cache) and not settings.CACHE_ALLOW_PROCESS_LOCAL):
+        return None
+    return cache
@@ -0,0 +1,163 @@
+"""
+PostgreSQL с пулом соединений в процессе: ENGINE = 'todolist.db.postgresql_pool'.
+
+Закрытие соединения Django (конец запроса, close_old_connections) возвращает его в пул,
+а следующее подключение любого потока процесса берет свободное из пула вместо нового
+handshake с сервером. Это нужно потокам gthread и воркерам ASGI, где соединения
+привязаны к короткоживущим потокам и постоянные соединения (CONN_MAX_AGE) не работают.
+
+Настройки — OPTIONS['pool']:
+
+    max_size  — соединений в пуле не больше (10)
+    timeout   — сколько секунд ждать свободного соединения, затем OperationalError (10)
+    max_idle  — соединение, простоявшее в пуле дольше, закрывается (300)
+
+При CONN_HEALTH_CHECKS соединение из пула проверяется SELECT 1 перед выдачей.
+Соединение, закрытое внутри транзакции или после ошибки, в пул не возвращается.
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from django.db import OperationalError
+from django.db.backends.postgresql import base, creation
+from psycopg2 import extensions
+
+DEFAULT_POOL_OPTIONS = {'max_size': 10, 'timeout': 10, 'max_idle': 300}
+
+
+class ConnectionPool:
+    """Потокобезопасный пул соединений psycopg2 одного процесса"""
+
+    def __init__(self, max_size: int, timeout: float, max_idle: float) -> None:
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.size = 0
+        self._idle: deque = deque()
+        self._condition = threading.Condition()
+
+    def acquire(self, connect: Callable, check: Callable) -> tuple:
+        """(соединение, взято из пула): свободное рабочее соединение или новое от connect()"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            idle = None
+            with self._condition:
+                while not self._idle and self.size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._condition.wait(remaining):
+                        raise OperationalError(f'No database connection available in {self.timeout}s '
+                                               f'(pool max_size={self.max_size})')
+                if self._idle:
+                    idle, released_at = self._idle.pop()
+                else:
+                    self.size += 1
+            if idle is None:
+                break
+            # проверка идет вне блокировки, чтобы не задерживать другие потоки
+            if time.monotonic() - released_at <= self.max_idle and check(idle):
+                return idle, True
+            self.release(idle, reusable=False)
+
+        try:
+            return connect(), False
+        except BaseException:
+            with self._condition:
+                self.size -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, connection, reusable: bool = True) -> None:
+        with self._condition:
+            if reusable and not connection.closed:
+                self._idle.append((connection, time.monotonic()))
+            else:
+                self._discard(connection)
+            self._condition.notify()
+
+    def close(self) -> None:
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+
+    def _discard(self, connection) -> None:
+        self.size -= 1
+        if not connection.closed:
+            connection.close()
+
+
+_pools: dict[tuple, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(conn_params: dict, options: dict) -> ConnectionPool:
+    # После fork (gunicorn --preload) соединения родителя не используются: у процесса свой пул
+    options = {**DEFAULT_POOL_OPTIONS, **options}
+    key = (os.getpid(), tuple(sorted((name, str(value)) for name, value in conn_params.items())),
+           tuple(sorted(options.items())))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(**options)
+        return _pools[key]
+
+
+def close_pools(database: Optional[str] = None) -> None:
+    """Закрывает свободные соединения пулов процесса (всех или к базе database)"""
+    with _pools_lock:
+        pools = [pool for (pid, params, _), pool in _pools.items()
+                 if pid == os.getpid() and (database is None or ('database', database) in params)]
+    for pool in pools:
+        pool.close()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Соединения пула к тестовой базе не дают ее удалить
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('pool', None)
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(conn_params, self.settings_dict['OPTIONS'].get('pool', {}))
+        connection, reused = self.pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(conn_params), self._check_pooled
+        )
+        if reused:
+            # то же, что делает родительский get_new_connection для нового соединения
+            self.isolation_level = self.settings_dict['OPTIONS'].get('isolation_level', connection.isolation_level)
+        return connection
+
+    def _check_pooled(self, connection) -> bool:
+        if connection.closed or connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if not self.settings_dict['CONN_HEALTH_CHECKS']:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except base.Database.Error:
+            return False
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection = self.connection
+        reusable = not self.in_atomic_block and not self.errors_occurred
+        if reusable and connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except base.Database.Error:
+                reusable = False
+        self.pool.release(connection, reusable)
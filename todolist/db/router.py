@@ -0,0 +1,98 @@
+"""
+Чтение из реплик БД (DB_REPLICA_HOSTS) для GET-запросов к спискам и объектам.
+
+ReplicaMiddleware разрешает чтение из реплики только для представлений с атрибутом
+read_from_replica = True и только в безопасных запросах. Запись, блокировки
+(select_for_update) и чтение внутри transaction.atomic всегда идут в основную базу.
+
+После изменяющего запроса клиент получает cookie DB_PRIMARY_COOKIE на DB_REPLICA_PIN_SECONDS:
+пока она действует, его чтения тоже идут в основную базу и он сразу видит свои изменения,
+даже если реплика отстает. Middleware работает и под WSGI, и под ASGI: флаг чтения из реплики
+хранится в ContextVar и виден в потоке, где выполняется представление.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_replica_reads: ContextVar[bool] = ContextVar('replica_reads', default=False)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or not settings.DB_REPLICA_ALIASES:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DB_REPLICA_ALIASES)
+
+    def db_for_write(self, model, **hints):
+        # иначе объект, прочитанный из реплики, сохранялся бы в нее же
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DB_REPLICA_ALIASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DB_REPLICA_ALIASES:
+            return False
+        return None
+
+
+def _pinned(request) -> bool:
+    try:
+        return float(request.COOKIES.get(settings.DB_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _replica_reads.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+        self._pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = _replica_reads.set(False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+        self._pin(request, response)
+        return response
+
+    @staticmethod
+    def _pin(request, response) -> None:
+        if request.method not in SAFE_METHODS and settings.DB_REPLICA_ALIASES:
+            response.set_cookie(settings.DB_PRIMARY_COOKIE, str(time.time() + settings.DB_REPLICA_PIN_SECONDS),
+                                max_age=settings.DB_REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        if request.method in SAFE_METHODS and getattr(view_class, 'read_from_replica', False) \
+                and not _pinned(request):
+            _replica_reads.set(True)
@@ -0,0 +1,83 @@
+"""
+Настройки gunicorn для production: `gunicorn -c todolist/gunicorn.conf.py`.
+
+Профиль выбирается переменной SERVER_PROFILE:
+
+    sync     — todolist.wsgi, процессы по одному потоку
+    gthread  — todolist.wsgi, GUNICORN_THREADS потоков в процессе (по умолчанию)
+    asgi     — todolist.asgi на воркерах uvicorn; нужен для событий досок по WebSocket/SSE (goals.realtime)
+
+Под asgi Django выполняет синхронный код каждого запроса в отдельном потоке (asgiref
+ThreadSensitiveContext): запросы процесса обрабатываются параллельно, число одновременных
+обращений к БД ограничивает пул соединений (DB_POOL_MAX_SIZE); подключения к событиям досок
+потоков не занимают.
+
+Приложение загружается в мастере до fork (GUNICORN_PRELOAD), воркеры перезапускаются
+после GUNICORN_MAX_REQUESTS запросов. kill -HUP мастера плавно заменяет воркеры: новые
+стартуют, старые дообрабатывают запросы в течение graceful_timeout. Код, загруженный
+в мастере при preload, HUP не обновляет — для выкладки контейнер перезапускается.
+"""
+import multiprocessing
+import os
+import shutil
+import sys
+
+PROFILES = {
+    'sync': ('todolist.wsgi:application', 'sync'),
+    'gthread': ('todolist.wsgi:application', 'gthread'),
+    'asgi': ('todolist.asgi:application', 'uvicorn.workers.UvicornWorker'),
+}
+
+profile = os.environ.get('SERVER_PROFILE', 'gthread')
+if profile not in PROFILES:
+    raise RuntimeError(f'Unknown SERVER_PROFILE {profile!r}, expected one of: {", ".join(PROFILES)}')
+wsgi_app, worker_class = PROFILES[profile]
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4)) if profile == 'gthread' else 1
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') not in ('0', 'False', 'false')
+
+# Перезапуск воркеров против утечек памяти; jitter разносит перезапуски во времени
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Heartbeat воркеров в памяти, а не на диске контейнера
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker) -> None:
+    # Соединения с БД, открытые в мастере при preload, не должны делиться между процессами
+    from django.db import connections
+
+    connections.close_all()
+
+
+def worker_exit(server, worker) -> None:
+    # Апдейты webhook бота, принятые воркером: начатые дообрабатываются, ждущие отдаются другим процессам
+    webhook = sys.modules.get('bot.tg.webhook')
+    if webhook is not None:
+        webhook.shutdown_webhook_worker(timeout=graceful_timeout)
+
+
+def on_starting(server) -> None:
+    # Метрики процессов (todolist.metrics) пишутся в файлы; файлы прошлого запуска удаляются
+    metrics_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker) -> None:
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
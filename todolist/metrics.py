@@ -0,0 +1,168 @@
+"""
+Метрики API и бота в формате Prometheus: GET /metrics.
+
+MetricsMiddleware на каждый запрос записывает по имени URL (goal-list, board, create-comment...)
+число запросов, время ответа, число запросов к БД и время в БД. Время считается до отдачи
+заголовков: тело StreamingHttpResponse формируется уже после middleware. События досок
+(goals.realtime) идут мимо Django и не учитываются.
+
+Бот записывает время обработки команды и вызовы Bot API. runbot отдает их на своем
+порту (BOT_METRICS_PORT), webhook — на /metrics веб-сервера.
+
+Middleware работает и под WSGI, и под ASGI. Соединения с БД у каждого потока свои, поэтому
+запросы к БД считает обертка, которая ставится на соединения потока по сигналу request_started
+(под ASGI он отправляется в потоке синхронного кода запроса), а QueryStats запроса передается
+ей через ContextVar.
+
+При нескольких процессах gunicorn задайте PROMETHEUS_MULTIPROC_DIR: процессы пишут метрики
+в файлы этой папки, а /metrics любого процесса суммирует их.
+"""
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.dispatch import receiver
+from django.http import HttpRequest, HttpResponse
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+# Прочие методы и неизвестные URL сводятся к одному значению, чтобы число рядов было ограничено
+METHODS = ('GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE')
+UNMATCHED_VIEW = '<unmatched>'
+
+HTTP_REQUESTS = Counter('http_requests_total', 'HTTP requests', ['view', 'method', 'status'])
+HTTP_REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Time to build the response', ['view', 'method'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10),
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', 'Database queries per request', ['view'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200),
+)
+HTTP_REQUEST_DB_DURATION = Histogram(
+    'http_request_db_duration_seconds', 'Database time per request', ['view'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5),
+)
+
+BOT_COMMAND_DURATION = Histogram(
+    'bot_command_duration_seconds', 'Time to handle a bot message, including replies', ['command'],
+    buckets=(.01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10),
+)
+BOT_API_REQUESTS = Counter(
+    'bot_api_requests_total', 'Telegram Bot API calls, one per attempt', ['method', 'status'],
+)
+
+
+class QueryStats:
+    """execute_wrapper, который считает запросы к БД и время их выполнения"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar('query_stats', default=None)
+
+
+def _count_queries(execute, sql, params, many, context):
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+@receiver(request_started)
+def _install_query_counter(**kwargs) -> None:
+    for alias in connections:
+        execute_wrappers = connections[alias].execute_wrappers
+        if _count_queries not in execute_wrappers:
+            # первой: execute_wrapper() снимает со списка последнюю обертку
+            execute_wrappers.insert(0, _count_queries)
+
+
+def _view_name(request: HttpRequest) -> str:
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None or not resolver_match.url_name:
+        return UNMATCHED_VIEW
+    return resolver_match.view_name
+
+
+def _observe(request: HttpRequest, response: HttpResponse, duration: float, stats: QueryStats) -> None:
+    view = _view_name(request)
+    method = request.method if request.method in METHODS else 'other'
+    HTTP_REQUESTS.labels(view, method, str(response.status_code)).inc()
+    HTTP_REQUEST_DURATION.labels(view, method).observe(duration)
+    HTTP_REQUEST_DB_QUERIES.labels(view).observe(stats.count)
+    HTTP_REQUEST_DB_DURATION.labels(view).observe(stats.duration)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        _observe(request, response, time.perf_counter() - started, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        _observe(request, response, time.perf_counter() - started, stats)
+        return response
+
+
+def get_registry() -> CollectorRegistry:
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+    Метрики процесса или всех процессов (PROMETHEUS_MULTIPROC_DIR) по Bearer-токену METRICS_TOKEN;
+    без токена — только при DEBUG
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        allowed = constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    else:
+        allowed = settings.DEBUG
+    if not allowed:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -23,7 +23,8 @@ if ENV_PATH.is_file():
 
 SECRET_KEY = os.environ.get('SECRET_KEY')
 
-DEBUG = os.environ.get('DEBUG', default=False)
+# '0', 'False' и пустая строка — выключено (строка из окружения сама по себе всегда истинна)
+DEBUG = env.bool('DEBUG', default=False)
 
 ALLOWED_HOSTS = ["*"]
 
@@ -44,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'todolist.metrics.MetricsMiddleware',
+    'todolist.db.router.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,9 +86,87 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD'),
         'HOST': os.environ.get('DB_HOST', default='127.0.0.1'),
         'PORT': os.environ.get('DB_PORT'),
+        # Соединение живет DB_CONN_MAX_AGE секунд и переиспользуется следующими запросами потока
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', default=60)),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', default='1') not in ('0', 'False', 'false'),
     }
 }
 
+# Пул соединений процесса (todolist.db.postgresql_pool) для gthread и ASGI: соединение возвращается
+# в пул после каждого запроса, поэтому CONN_MAX_AGE не используется
+if os.environ.get('DB_POOL', default='0') not in ('0', 'False', 'false'):
+    DATABASES['default'].update({
+        'ENGINE': 'todolist.db.postgresql_pool',
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {'pool': {
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', default=10)),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', default=10)),
+            'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', default=300)),
+        }},
+    })
+
+# Реплики для чтения списков и объектов (todolist.db.router): DB_REPLICA_HOSTS=host[:port],...
+# с теми же базой, пользователем и паролем. В тестах реплики зеркалят основную базу
+DB_REPLICA_ALIASES = []
+for number, address in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', default='').split(',')), start=1):
+    host, _, port = address.strip().partition(':')
+    DB_REPLICA_ALIASES.append(f'replica_{number}')
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['todolist.db.router.ReplicaRouter']
+# Сколько секунд после изменяющего запроса клиент читает из основной базы
+DB_REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', default=10))
+DB_PRIMARY_COOKIE = 'db_primary'
+
+# Кэш, общий для воркеров API и бота: CACHE_BACKEND=django.core.cache.backends.redis.RedisCache,
+# CACHE_LOCATION=redis://redis:6379/0
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', default=''),
+    }
+}
+# Кэши, которые сбрасываются из других процессов (todolist.cache), в LocMemCache включаются, только
+# если процесс один: иначе воркеры, не получившие сброс, отдают устаревшие роли и списки
+CACHE_ALLOW_PROCESS_LOCAL = os.environ.get('CACHE_ALLOW_PROCESS_LOCAL', default='0') not in ('0', 'False', 'false')
+
+# Кэш ролей пользователя на досках (goals.access); пустое значение выключает кэш
+BOARD_ROLES_CACHE = os.environ.get('BOARD_ROLES_CACHE', default='default')
+BOARD_ROLES_CACHE_TIMEOUT = int(os.environ.get('BOARD_ROLES_CACHE_TIMEOUT', default=300))
+
+# Списки целей сериализуются из .values() без создания моделей (goals.fast_serializers)
+GOALS_FAST_LIST_SERIALIZATION = os.environ.get('GOALS_FAST_LIST_SERIALIZATION', default='1') not in ('0', 'False', 'false')
+
+# Максимум целей в одном запросе goal/bulk_create, goal/bulk_update, goal/bulk_archive
+GOALS_BULK_MAX_ITEMS = int(os.environ.get('GOALS_BULK_MAX_ITEMS', default=1000))
+
+# Архивация целей удаленных досок и категорий (goals.archive, команда archive_worker)
+GOALS_ARCHIVE_BATCH_SIZE = int(os.environ.get('GOALS_ARCHIVE_BATCH_SIZE', default=500))
+GOALS_ARCHIVE_POLL_INTERVAL = float(os.environ.get('GOALS_ARCHIVE_POLL_INTERVAL', default=5))
+
+# Инкрементальная синхронизация goals/sync (goals.sync): строк в ответе и, для БД кроме PostgreSQL,
+# отставание от now() в секундах, за которое успевают закоммититься транзакции с уже назначенным updated
+GOALS_SYNC_MAX_ITEMS = int(os.environ.get('GOALS_SYNC_MAX_ITEMS', default=1000))
+GOALS_SYNC_LAG = float(os.environ.get('GOALS_SYNC_LAG', default=5))
+
+# События досок по WebSocket/SSE (goals.events, goals.realtime): брокер (goals.events.LocalBroker —
+# только в пределах процесса, goals.events.PostgresBroker — между процессами), очередь подключения,
+# период ping для SSE в секундах и origin'ы других сайтов, с которых принимается WebSocket
+GOALS_EVENTS_BROKER = os.environ.get('GOALS_EVENTS_BROKER', default='goals.events.LocalBroker')
+GOALS_EVENTS_QUEUE_SIZE = int(os.environ.get('GOALS_EVENTS_QUEUE_SIZE', default=100))
+GOALS_EVENTS_HEARTBEAT = float(os.environ.get('GOALS_EVENTS_HEARTBEAT', default=25))
+GOALS_EVENTS_ALLOWED_ORIGINS = [
+    origin for origin in os.environ.get('GOALS_EVENTS_ALLOWED_ORIGINS', default='').split(',') if origin
+]
+
+# Метрики Prometheus на /metrics (todolist.metrics): по заголовку Authorization: Bearer <METRICS_TOKEN>;
+# без токена доступны только при DEBUG
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -160,3 +241,37 @@ REST_FRAMEWORK = {
 }
 
 BOT_TOKEN = os.environ.get('BOT_TOKEN')
+BOT_API_URL = os.environ.get('BOT_API_URL', default='https://api.telegram.org')
+# Число апдейтов, которые runbot --async обрабатывает одновременно
+BOT_CONCURRENCY = int(os.environ.get('BOT_CONCURRENCY', default=8))
+# Состояние диалога бота: 'cache' — кэш BOT_STATE_CACHE (общий для процессов при общем бэкенде), 'memory' — память процесса
+BOT_STATE_STORE = os.environ.get('BOT_STATE_STORE', default='cache')
+BOT_STATE_CACHE = os.environ.get('BOT_STATE_CACHE', default='default')
+BOT_STATE_TTL = int(os.environ.get('BOT_STATE_TTL', default=3600))
+# HTTP-клиент Telegram: пул соединений, таймауты (секунды) и повторы на 429/5xx
+BOT_HTTP_POOL_SIZE = int(os.environ.get('BOT_HTTP_POOL_SIZE', default=BOT_CONCURRENCY))
+BOT_HTTP_CONNECT_TIMEOUT = float(os.environ.get('BOT_HTTP_CONNECT_TIMEOUT', default=5))
+BOT_HTTP_READ_TIMEOUT = float(os.environ.get('BOT_HTTP_READ_TIMEOUT', default=10))
+BOT_HTTP_MAX_RETRIES = int(os.environ.get('BOT_HTTP_MAX_RETRIES', default=3))
+BOT_HTTP_BACKOFF = float(os.environ.get('BOT_HTTP_BACKOFF', default=0.5))
+BOT_HTTP_MAX_BACKOFF = float(os.environ.get('BOT_HTTP_MAX_BACKOFF', default=30))
+# Лимиты исходящих сообщений бота (сообщений в секунду и запас): в один чат и всего
+BOT_CHAT_RATE = float(os.environ.get('BOT_CHAT_RATE', default=1))
+BOT_CHAT_BURST = float(os.environ.get('BOT_CHAT_BURST', default=3))
+BOT_GLOBAL_RATE = float(os.environ.get('BOT_GLOBAL_RATE', default=30))
+BOT_GLOBAL_BURST = float(os.environ.get('BOT_GLOBAL_BURST', default=30))
+# Webhook бота (/bot/webhook): без секрета выключен. Апдейты пишутся в БД (bot.WebhookUpdate): повторы update_id
+# отбрасываются DEDUP_TTL секунд, а апдейт, который процесс взял и не обработал за CLAIM_TIMEOUT секунд,
+# забирает другой процесс (поиск раз в SWEEP_INTERVAL секунд)
+BOT_WEBHOOK_SECRET = os.environ.get('BOT_WEBHOOK_SECRET')
+BOT_WEBHOOK_DEDUP_TTL = int(os.environ.get('BOT_WEBHOOK_DEDUP_TTL', default=24 * 60 * 60))
+BOT_WEBHOOK_MAX_PENDING = int(os.environ.get('BOT_WEBHOOK_MAX_PENDING', default=1000))
+BOT_WEBHOOK_CLAIM_TIMEOUT = float(os.environ.get('BOT_WEBHOOK_CLAIM_TIMEOUT', default=60))
+BOT_WEBHOOK_SWEEP_INTERVAL = float(os.environ.get('BOT_WEBHOOK_SWEEP_INTERVAL', default=10))
+# Список /goals в боте: размер страницы и кэш готовых страниц (сбрасывается при изменении целей;
+# только общий для процессов, см. todolist.cache; пустое значение выключает кэш)
+BOT_GOALS_PAGE_SIZE = int(os.environ.get('BOT_GOALS_PAGE_SIZE', default=10))
+BOT_GOALS_CACHE = os.environ.get('BOT_GOALS_CACHE', default='default')
+BOT_GOALS_CACHE_TIMEOUT = int(os.environ.get('BOT_GOALS_CACHE_TIMEOUT', default=600))
+# Порт, на котором runbot отдает метрики Prometheus; 0 — не отдавать
+BOT_METRICS_PORT = int(os.environ.get('BOT_METRICS_PORT', default=0))
@@ -1,10 +1,13 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from todolist.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('oauth/', include('social_django.urls', namespace="social")),
     path('core/', include('core.urls')),
     path('goals/', include("goals.urls")),
     path('bot/', include("bot.urls")),
+    path('metrics', metrics_view, name='metrics'),
 ]